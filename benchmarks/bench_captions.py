@@ -0,0 +1,162 @@
+"""
+Speed of the caption converter (engine.captions) against pytube's own conversion.
+
+Converts --tracks generated caption tracks of --lines cues each, offline, with:
+
+    pytube     Caption.xml_caption_to_srt on the whole track, as Caption.download(srt=True)
+               does. Legacy format only, pytube can't read format 3.
+    srt, vtt   engine.captions.convert, fed the track in chunks like a download, writing
+               to a file
+
+Tracks come in YouTube's legacy timed-text format ("legacy") and format 3 ("srv3", with
+every word in its own element like auto-generated captions). Reports per converter:
+
+    tracks/s   caption tracks converted per second
+    cues/s     cues converted per second
+    MB/s       megabytes of XML converted per second
+    peak KB    most memory allocated while converting one track, not counting the XML
+
+Run from the repository root:
+
+    python -m benchmarks.bench_captions
+    python -m benchmarks.bench_captions --tracks 5000 --lines 1000 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pytube import Caption
+
+from benchmarks.fake_youtube import MB, timed_text
+from pytube_gui.engine.captions import CHUNK_SIZE, SRT, VTT, convert
+
+COLUMNS = [  # key, heading, width
+    ("input", "input", 7),
+    ("converter", "converter", 9),
+    ("tracks", "tracks", 7),
+    ("seconds", "seconds", 8),
+    ("tracks_per_s", "tracks/s", 9),
+    ("cues_per_s", "cues/s", 10),
+    ("mb_per_s", "MB/s", 7),
+    ("peak_kb", "peak KB", 8),
+]
+TRACK = {"baseUrl": "", "name": {"simpleText": "English"}, "vssId": ".en"}
+
+
+def chunks(document: bytes) -> Iterator[bytes]:
+    """document in the pieces a download would read"""
+    for offset in range(0, len(document), CHUNK_SIZE):
+        yield document[offset : offset + CHUNK_SIZE]
+
+
+def pytube_converter(document: bytes, out) -> None:
+    # pytube decodes the response, builds the whole SRT as a string, then writes it
+    out.write(Caption(TRACK).xml_caption_to_srt(document.decode("utf-8")))
+
+
+def streaming_converter(caption_format: str) -> Callable[[bytes, Any], None]:
+    def converter(document: bytes, out) -> None:
+        convert(chunks(document), out, caption_format)
+
+    return converter
+
+
+CONVERTERS: Dict[str, Callable[[bytes, Any], None]] = {
+    "pytube": pytube_converter,
+    SRT: streaming_converter(SRT),
+    VTT: streaming_converter(VTT),
+}
+
+
+def peak_memory(converter: Callable[[bytes, Any], None], document: bytes) -> int:
+    """Most bytes allocated at once while converting document once"""
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        tracemalloc.start()
+        try:
+            converter(document, out)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def measure(
+    name: str, srv3: bool, documents: List[bytes], lines: int
+) -> Optional[Dict[str, Any]]:
+    converter = CONVERTERS[name]
+    if srv3 and name == "pytube":
+        return None
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        started = time.perf_counter()
+        for document in documents:
+            converter(document, out)
+        seconds = time.perf_counter() - started
+    size = sum(len(document) for document in documents)
+    return {
+        "input": "srv3" if srv3 else "legacy",
+        "converter": name,
+        "tracks": len(documents),
+        "seconds": round(seconds, 3),
+        "tracks_per_s": round(len(documents) / seconds, 1),
+        "cues_per_s": round(len(documents) * lines / seconds),
+        "mb_per_s": round(size / MB / seconds, 2),
+        "peak_kb": round(peak_memory(converter, documents[0]) / 1024),
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    print(" ".join(heading.rjust(width) for key, heading, width in COLUMNS))
+    for result in results:
+        print(" ".join(str(result[key]).rjust(width) for key, _, width in COLUMNS))
+
+
+def parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_captions",
+        description="Benchmark converting timed-text captions to SRT and WebVTT.",
+    )
+    parser.add_argument(
+        "converters",
+        nargs="*",
+        metavar="CONVERTER",
+        help=f"what to run: {', '.join(CONVERTERS)} (default: all)",
+    )
+    parser.add_argument("--tracks", type=int, default=1000, help="tracks per run")
+    parser.add_argument("--lines", type=int, default=300, help="cues per track")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+    for name in args.converters:
+        if name not in CONVERTERS:
+            parser.error(f"unknown converter {name!r}")
+    if args.tracks < 1 or args.lines < 1:
+        parser.error("--tracks and --lines must be at least 1")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = []
+    for srv3 in (False, True):
+        # tracks differ in their text, like the tracks of different videos
+        documents = [
+            timed_text(f"bench{n:06d}", "en", args.lines, srv3).encode("utf-8")
+            for n in range(args.tracks)
+        ]
+        for name in args.converters or list(CONVERTERS):
+            result = measure(name, srv3, documents, args.lines)
+            if result is None:
+                continue
+            results.append(result)
+            if args.json:
+                print(json.dumps(result), flush=True)
+    if not args.json:
+        print_table(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
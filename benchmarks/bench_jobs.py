@@ -0,0 +1,322 @@
+"""
+Throughput of the download path, measured offline against benchmarks.fake_youtube.
+
+Runs the engine's headless jobs against a local FakeYouTube. These are the same
+jobs the GUI's downloader threads and the batch CLI run. Reports per scenario:
+
+    items/s       videos (or caption tracks) finished per second
+    MB/s          bytes written to disk per second
+    ttfb          median and 95th percentile time to first byte of media requests
+    first byte    time from the start of the scenario to its first media byte
+    peak RSS      highest resident memory of the process running the jobs
+
+With --json, each result also has the job's stage timings (engine.metrics).
+
+Scenarios:
+
+    video      --items VideoJobs, --jobs of them at a time
+    playlist   one PlaylistJob over a playlist of --items videos with --workers
+    captions   --items CaptionsJobs, --jobs of them at a time
+    playlist_captions
+               one CaptionsJob over a playlist of --items videos with --workers
+
+Each scenario runs in a fresh Python process with an empty metadata cache, so peak
+RSS and timings aren't skewed by earlier scenarios; the fake server runs in this
+process. With --warm a scenario runs twice and only the second, cached run is
+measured; the server's request and connection counts still cover both runs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_jobs
+    python -m benchmarks.bench_jobs video playlist --items 50 --size 8 --latency 50
+    python -m benchmarks.bench_jobs --json > results.jsonl
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_youtube import MB, FakeYouTube, reroute
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIOS: List[str] = ["video", "playlist", "captions", "playlist_captions"]
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLUMNS = [  # key, heading, width
+    ("scenario", "scenario", 17),
+    ("items", "items", 6),
+    ("failed", "failed", 6),
+    ("seconds", "seconds", 8),
+    ("items_per_s", "items/s", 8),
+    ("mb_per_s", "MB/s", 8),
+    ("ttfb_ms", "ttfb ms", 8),
+    ("ttfb_p95_ms", "p95 ms", 8),
+    ("first_byte_ms", "first ms", 9),
+    ("connections", "conns", 6),
+    ("peak_rss_mb", "RSS MB", 7),
+]
+
+
+def peak_rss() -> Optional[float]:
+    """Highest resident memory of this process so far, in MB. None if not known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def folder_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def create_jobs(args: argparse.Namespace, output: str, cache) -> List[Any]:
+    from pytube_gui.engine.jobs import CaptionsJob, PlaylistJob, VideoJob
+
+    url = "https://www.youtube.com/playlist?list=" + FakeYouTube.playlist_id(args.items)
+    if args.scenario == "playlist_captions":
+        return [CaptionsJob(url, output, workers=args.workers, cache=cache)]
+    if args.scenario == "playlist":
+        return [
+            PlaylistJob(
+                url,
+                output,
+                False,
+                0,
+                0,
+                workers=args.workers,
+                segments=args.segments,
+                cache=cache,
+                **({} if args.lookahead is None else {"lookahead": args.lookahead}),
+            )
+        ]
+    urls = [
+        "https://www.youtube.com/watch?v=" + FakeYouTube.video_id(n)
+        for n in range(args.items)
+    ]
+    if args.scenario == "captions":
+        return [CaptionsJob(url, output, cache=cache) for url in urls]
+    return [
+        VideoJob(url, output, False, segments=args.segments, cache=cache)
+        for url in urls
+    ]
+
+
+def run_scenario(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    """Runs one scenario in this process against the fake at base_url"""
+    from pytube_gui.engine import transport
+    from pytube_gui.engine.cache import MetadataCache
+    from pytube_gui.engine.jobs import JobFailed
+    from pytube_gui.engine.metrics import default_metrics
+
+    if not args.no_pool:
+        transport.install()
+    timer = reroute(base_url)
+    workdir = tempfile.mkdtemp(prefix="pytube-gui-bench-")
+    cache = MetadataCache(os.path.join(workdir, "metadata.sqlite3"))
+
+    def run(job) -> bool:
+        try:
+            job.run()
+        except JobFailed as jf:
+            print(f"{jf} ({jf.__cause__})", file=sys.stderr)
+            return False
+        return True
+
+    def measure(output: str) -> Dict[str, Any]:
+        os.makedirs(output)
+        jobs = create_jobs(args, output, cache)
+        timer.reset()
+        default_metrics().reset()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(run, jobs))
+        seconds = time.monotonic() - started
+        media_ttfb = timer.ttfb.get("/videoplayback", [])
+        if args.scenario in ("playlist", "playlist_captions"):
+            items = args.items if all(results) else 0
+        else:
+            items = results.count(True)
+        written = folder_size(output)
+        return {
+            "scenario": args.scenario,
+            "items": items,
+            "failed": args.items - items,
+            "seconds": round(seconds, 3),
+            "items_per_s": round(items / seconds, 2),
+            "mb": round(written / MB, 2),
+            "mb_per_s": round(written / MB / seconds, 2),
+            "ttfb_ms": _ms(statistics.median(media_ttfb) if media_ttfb else None),
+            "ttfb_p95_ms": _ms(percentile(media_ttfb, 0.95)),
+            "first_byte_ms": _ms(timer.first_media),
+            "requests": sum(len(times) for times in timer.ttfb.values()),
+            "stages": default_metrics().summary()["stages"],
+        }
+
+    try:
+        if args.warm:
+            measure(os.path.join(workdir, "warmup"))
+        result = measure(os.path.join(workdir, "output"))
+    finally:
+        cache.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    result["peak_rss_mb"] = _round(peak_rss())
+    return result
+
+
+def spawn_scenario(args: argparse.Namespace, scenario: str, base_url: str) -> Dict:
+    """Runs one scenario in a child process and returns its result"""
+    command = [sys.executable, "-m", "benchmarks.bench_jobs", scenario]
+    command += ["--child", base_url] + _scenario_options(args)
+    child = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    if child.returncode != 0:
+        raise RuntimeError(f"{scenario} benchmark exited with {child.returncode}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def _scenario_options(args: argparse.Namespace) -> List[str]:
+    options = ["--items", str(args.items), "--jobs", str(args.jobs)]
+    options += ["--workers", str(args.workers), "--segments", str(args.segments)]
+    options += [] if args.lookahead is None else ["--lookahead", str(args.lookahead)]
+    options += ["--no-pool"] if args.no_pool else []
+    options += ["--warm"] if args.warm else []
+    return options
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+def print_table(results: List[Dict[str, Any]]):
+    print(" ".join(heading.rjust(width) for key, heading, width in COLUMNS))
+    for result in results:
+        cells = []
+        for key, heading, width in COLUMNS:
+            value = result.get(key)
+            cells.append(("-" if value is None else str(value)).rjust(width))
+        print(" ".join(cells))
+
+
+def parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_jobs",
+        description="Benchmark the download path against a local fake YouTube.",
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="SCENARIO",
+        help=f"what to run: {', '.join(SCENARIOS)} (default: all)",
+    )
+    parser.add_argument("--items", type=int, default=20, help="videos per scenario")
+    parser.add_argument("--size", type=float, default=4, help="MB per video")
+    parser.add_argument(
+        "--latency", type=float, default=20, help="ms before every response"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=int,
+        default=0,
+        help="KB/s per connection, 0 for unlimited",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=256, help="KB of watch and playlist pages"
+    )
+    parser.add_argument(
+        "--caption-lines", type=int, default=200, help="lines per caption track"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=4, help="video and captions jobs at a time"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="videos at a time within a playlist"
+    )
+    parser.add_argument("--segments", type=int, default=1, help="connections per video")
+    parser.add_argument(
+        "--lookahead",
+        type=int,
+        help="playlist videos loaded ahead of the workers, 0 for none"
+        " (default: the engine's)",
+    )
+    parser.add_argument(
+        "--no-pool", action="store_true", help="don't share keep-alive connections"
+    )
+    parser.add_argument(
+        "--warm", action="store_true", help="measure a second run with a warm cache"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run every scenario in this process (peak RSS covers all of them)",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    parser.add_argument("--child", metavar="BASE_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.child:
+        args.scenario = args.scenarios[0]
+        print(json.dumps(run_scenario(args, args.child)))
+        return 0
+
+    fake = FakeYouTube(
+        media_size=int(args.size * MB),
+        latency=args.latency / 1000,
+        bandwidth=args.bandwidth * 1024,
+        page_size=args.page_size * 1024,
+        caption_lines=args.caption_lines,
+    )
+    results = []
+    with fake:
+        for scenario in args.scenarios or SCENARIOS:
+            fake.reset_stats()
+            if args.in_process:
+                args.scenario = scenario
+                result = run_scenario(args, fake.base_url)
+            else:
+                result = spawn_scenario(args, scenario, fake.base_url)
+            stats = fake.stats()
+            result["connections"] = stats["connections"]
+            result["server_requests"] = stats["requests"]
+            results.append(result)
+            if args.json:
+                print(json.dumps(result), flush=True)
+    if not args.json:
+        print_table(results)
+    return 1 if any(result["failed"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
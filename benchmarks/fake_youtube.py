@@ -0,0 +1,589 @@
+"""
+A local stand-in for YouTube, for benchmarking the download path offline.
+
+FakeYouTube serves everything a download touches, generated on the fly:
+watch pages, innertube player responses, the player JS, playlist pages and their
+continuations, caption tracks and media streams. Media streams support Range
+requests and pytube's &range= parameter, and stream URLs are signed. A player
+JS is served so that pytube deciphers the signatures the same way it does for
+the real site. A media request with a wrong signature gets a 403.
+
+Every response can be delayed by `latency` seconds, and every response body is
+sent at no more than `bandwidth` bytes per second.
+
+reroute() points pytube's requests for youtube.com at a fake, which may run in
+another process. Stream and caption URLs already point at it. reroute() also
+records the time to first byte of every request.
+"""
+
+import hashlib
+import http.server
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlencode, urlsplit, urlunsplit
+
+from pytube import request
+
+MB: int = 1024 * 1024
+VIDEO_LENGTH: int = 600  # seconds, of every video
+PAGE_SIZE: int = 100  # videos per playlist page, like YouTube
+CHUNK_SIZE: int = 64 * 1024
+JS_PATH: str = "/s/player/f4k3b3nc/player_ias.vflset/en_US/base.js"
+API_KEY: str = "fake-innertube-key"
+
+# transforms for signatures. the fake JS and encipher() must agree
+PLAYER_JS: str = (
+    "var Xy={AJ:function(a){a.reverse()}, VR:function(a,b){a.splice(0,b)}, "
+    "kT:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}};\n"
+    'Kx=function(a){a=a.split("");Xy.AJ(a,15);Xy.VR(a,3);Xy.kT(a,51);'
+    'return a.join("")};\n'
+    "var Nf=[Ma];\n"
+    'Ma=function(a){var b=a.split(""),c=[function(d){d.reverse()},b];'
+    'try{c[0](c[1])}catch(e){return"enhanced_except_"+a}return b.join("")};\n'
+    'g.prototype.T=function(a){a.C&&(b=a.get("n"))&&(b=Nf[0](b),a.set("n",b))};\n'
+)
+
+# itag, mime type, resolution (lines) or 0 for audio, bitrate, share of media_size
+FORMATS: List[Tuple[int, str, int, int, float]] = [
+    (18, 'video/mp4; codecs="avc1.42001E, mp4a.40.2"', 360, 500_000, 1.0),
+]
+ADAPTIVE_FORMATS: List[Tuple[int, str, int, int, float]] = [
+    (137, 'video/mp4; codecs="avc1.640028"', 1080, 4_000_000, 1.0),
+    (248, 'video/webm; codecs="vp9"', 1080, 2_600_000, 0.8),
+    (140, 'audio/mp4; codecs="mp4a.40.2"', 0, 130_000, 0.1),
+    (251, 'audio/webm; codecs="opus"', 0, 160_000, 0.1),
+]
+
+_BLOCK: bytes = bytes(range(256)) * 512  # media bytes repeat every 128KB
+
+
+def signature(video_id: str, itag: int) -> str:
+    """The signature a stream URL needs for the fake to serve it"""
+    return hashlib.sha1(f"{video_id}:{itag}".encode()).hexdigest()
+
+
+def encipher(sig: str) -> str:
+    """The scrambled signature that PLAYER_JS turns back into sig"""
+    chars = list(sig)
+    swap = 51 % len(chars)
+    chars[0], chars[swap] = chars[swap], chars[0]
+    return "".join(reversed(list("xyz") + chars))
+
+
+def media_bytes(offset: int, length: int) -> bytes:
+    """length bytes of every stream, starting at offset"""
+    start = offset % len(_BLOCK)
+    if start + length <= len(_BLOCK):
+        return _BLOCK[start : start + length]
+    return (_BLOCK[start:] + _BLOCK * (length // len(_BLOCK) + 1))[:length]
+
+
+def timed_text(video_id: str, language: str, lines: int, srv3: bool = False) -> str:
+    """
+    A caption track of lines lines in YouTube's legacy timed-text format, or format 3
+    if srv3. Format 3 tracks are split into words the way auto-generated ones are.
+    """
+    cues = []
+    for i in range(lines):
+        start = i * VIDEO_LENGTH / max(lines, 1)
+        # the legacy format escapes entities twice
+        ampersand = "&amp;" if srv3 else "&amp;amp;"
+        text = f"Line {i + 1} of {video_id} {ampersand} more ({language})"
+        if srv3:
+            words = "".join(
+                f'<s t="{n * 300}">{" " if n else ""}{word}</s>'
+                for n, word in enumerate(text.split(" "))
+            )
+            cues.append(f'<p t="{int(start * 1000)}" d="2500">{words}</p>')
+        else:
+            cues.append(f'<text start="{start:.2f}" dur="2.5">{text}</text>')
+    if srv3:
+        body = '<timedtext format="3"><body>' + "".join(cues) + "</body></timedtext>"
+    else:
+        body = "<transcript>" + "".join(cues) + "</transcript>"
+    return '<?xml version="1.0" encoding="utf-8" ?>' + body
+
+
+class FakeYouTube:
+    """
+    The fake site, served from a background thread on 127.0.0.1.
+
+    The playlist with the ID playlist_id(count) has `count` videos. Any
+    11 character video ID is a video.
+    """
+
+    def __init__(
+        self,
+        media_size: int = 4 * MB,  # bytes, of the progressive stream
+        latency: float = 0.0,  # seconds before every response
+        bandwidth: int = 0,  # bytes per second per response, 0 for unlimited
+        page_size: int = 256 * 1024,  # bytes of filler in watch and playlist pages
+        caption_lines: int = VIDEO_LENGTH // 3,
+        caption_languages: Tuple[str, ...] = ("en", "de", "es"),
+        port: int = 0,
+    ):
+        self.media_size: int = media_size
+        self.latency: float = latency
+        self.bandwidth: int = bandwidth
+        self.page_size: int = page_size
+        self.caption_lines: int = caption_lines
+        self.caption_languages: Tuple[str, ...] = caption_languages
+        self.requests: Dict[str, int] = {}  # by kind of request
+        self.bytes_sent: int = 0
+        self.connections: int = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeYouTube":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-youtube", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeYouTube":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "bytes_sent": self.bytes_sent,
+                "connections": self.connections,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = {}
+            self.bytes_sent = 0
+            self.connections = 0
+
+    @staticmethod
+    def video_id(number: int) -> str:
+        return f"bench{number:06d}"
+
+    @staticmethod
+    def playlist_id(count: int) -> str:
+        return f"PLbench_{count}"
+
+    def video_url(self, number: int) -> str:
+        return f"https://www.youtube.com/watch?v={self.video_id(number)}"
+
+    def playlist_url(self, count: int) -> str:
+        return f"https://www.youtube.com/playlist?list={self.playlist_id(count)}"
+
+    def count(self, kind: str, sent: int = 0):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes_sent += sent
+
+    # the documents
+
+    def watch_page(self, video_id: str) -> str:
+        response = {
+            "playabilityStatus": {"status": "OK"},
+            "videoDetails": {"videoId": video_id, "title": _title(video_id)},
+        }
+        return _page(
+            f"var ytInitialPlayerResponse = {json.dumps(response)};",
+            f'<script src="{JS_PATH}"></script>',
+            self.page_size,
+        )
+
+    def player_response(self, video_id: str) -> Dict[str, Any]:
+        expire = int(time.time()) + 6 * 3600
+        return {
+            "playabilityStatus": {"status": "OK"},
+            "videoDetails": {
+                "videoId": video_id,
+                "title": _title(video_id),
+                "lengthSeconds": str(VIDEO_LENGTH),
+                "author": "pytube-gui benchmarks",
+                "viewCount": "0",
+            },
+            "streamingData": {
+                "expiresInSeconds": "21540",
+                "formats": [self._format(video_id, f, expire) for f in FORMATS],
+                "adaptiveFormats": [
+                    self._format(video_id, f, expire) for f in ADAPTIVE_FORMATS
+                ],
+            },
+            "captions": {
+                "playerCaptionsTracklistRenderer": {
+                    "captionTracks": self._caption_tracks(video_id)
+                }
+            },
+        }
+
+    def _format(
+        self, video_id: str, fmt: Tuple[int, str, int, int, float], expire: int
+    ) -> Dict[str, Any]:
+        itag, mime_type, lines, bitrate, share = fmt
+        query = {
+            "expire": expire,
+            "id": video_id,
+            "itag": itag,
+            "n": "bench" + video_id,
+        }
+        url = f"{self.base_url}/videoplayback?{urlencode(query)}"
+        cipher = {"s": encipher(signature(video_id, itag)), "sp": "sig", "url": url}
+        entry: Dict[str, Any] = {
+            "itag": itag,
+            "mimeType": mime_type,
+            "bitrate": bitrate,
+            "contentLength": str(self.stream_size(itag)),
+            "approxDurationMs": str(VIDEO_LENGTH * 1000),
+            "signatureCipher": urlencode(cipher, quote_via=quote),
+        }
+        if lines:
+            entry.update(
+                width=lines * 16 // 9,
+                height=lines,
+                fps=30,
+                quality=f"hd{lines}",
+                qualityLabel=f"{lines}p",
+            )
+        else:
+            entry.update(audioQuality="AUDIO_QUALITY_MEDIUM", audioSampleRate="48000")
+        return entry
+
+    def stream_size(self, itag: int) -> int:
+        for fmt in FORMATS + ADAPTIVE_FORMATS:
+            if fmt[0] == itag:
+                return max(int(self.media_size * fmt[4]), 1)
+        raise KeyError(itag)
+
+    def _caption_tracks(self, video_id: str) -> List[Dict[str, Any]]:
+        tracks = []
+        for language in self.caption_languages:
+            tracks.append(self._caption_track(video_id, language, "", language))
+        if self.caption_languages:  # plus automatic captions in the first language
+            tracks.append(
+                self._caption_track(video_id, self.caption_languages[0], "asr", "a.")
+            )
+        return tracks
+
+    def _caption_track(
+        self, video_id: str, language: str, kind: str, vss_prefix: str
+    ) -> Dict[str, Any]:
+        query = {"v": video_id, "lang": language}
+        if kind:
+            query["kind"] = kind
+        return {
+            "baseUrl": f"{self.base_url}/api/timedtext?{urlencode(query)}",
+            "name": {"simpleText": language + (" (auto-generated)" if kind else "")},
+            "vssId": (vss_prefix if kind else ".") + language,
+            "languageCode": language,
+            "kind": kind,
+        }
+
+    def captions(self, video_id: str, language: str, srv3: bool) -> str:
+        """A caption track in YouTube's legacy format, or format 3 if srv3"""
+        return timed_text(video_id, language, self.caption_lines, srv3)
+
+    def playlist_page(self, playlist_id: str) -> str:
+        videos, continuation = self._playlist_items(playlist_id, 0)
+        data = {
+            "contents": {
+                "twoColumnBrowseResultsRenderer": {
+                    "tabs": [
+                        {
+                            "tabRenderer": {
+                                "content": {
+                                    "sectionListRenderer": {
+                                        "contents": [
+                                            {
+                                                "itemSectionRenderer": {
+                                                    "contents": [
+                                                        {
+                                                            "playlistVideoListRenderer": {
+                                                                "contents": videos
+                                                                + continuation
+                                                            }
+                                                        }
+                                                    ]
+                                                }
+                                            }
+                                        ]
+                                    }
+                                }
+                            }
+                        }
+                    ]
+                }
+            },
+            "sidebar": {
+                "playlistSidebarRenderer": {
+                    "items": [
+                        {
+                            "playlistSidebarPrimaryInfoRenderer": {
+                                "title": {
+                                    "runs": [{"text": f"Benchmark {playlist_id}"}]
+                                },
+                                "description": {"simpleText": ""},
+                            }
+                        }
+                    ]
+                }
+            },
+        }
+        return _page(
+            f"ytcfg.set({json.dumps({'INNERTUBE_API_KEY': API_KEY})});"
+            f"var ytInitialData = {json.dumps(data)};",
+            "",
+            self.page_size,
+        )
+
+    def playlist_continuation(self, token: str) -> Dict[str, Any]:
+        playlist_id, offset = token.rsplit(":", 1)
+        videos, continuation = self._playlist_items(playlist_id, int(offset))
+        return {
+            "onResponseReceivedActions": [
+                {
+                    "appendContinuationItemsAction": {
+                        "continuationItems": videos + continuation
+                    }
+                }
+            ]
+        }
+
+    def _playlist_items(
+        self, playlist_id: str, offset: int
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """One page of videos from offset on, plus the continuation item if there is more"""
+        count = _playlist_count(playlist_id)
+        end = min(offset + PAGE_SIZE, count)
+        videos = [
+            {"playlistVideoRenderer": {"videoId": self.video_id(n)}}
+            for n in range(offset, end)
+        ]
+        continuation = []
+        if end < count:
+            token = f"{playlist_id}:{end}"
+            continuation.append(
+                {
+                    "continuationItemRenderer": {
+                        "continuationEndpoint": {
+                            "continuationCommand": {"token": token}
+                        }
+                    }
+                }
+            )
+        return videos, continuation
+
+
+def _title(video_id: str) -> str:
+    return f"Benchmark video {video_id}"
+
+
+def _playlist_count(playlist_id: str) -> int:
+    match = re.fullmatch(r"PLbench_(\d+)", playlist_id)
+    return int(match.group(1)) if match else 0
+
+
+def _page(script: str, head: str, filler: int) -> str:
+    """An HTML page about filler bytes long that carries script like YouTube's do"""
+    return (
+        f"<!DOCTYPE html><html><head>{head}</head><body>"
+        f"<script>{script}</script>"
+        f"<div hidden>{'x' * filler}</div></body></html>"
+    )
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    fake: FakeYouTube
+
+    def process_request(self, request_socket, client_address):
+        with self.fake._lock:
+            self.fake.connections += 1
+        super().process_request(request_socket, client_address)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real thing
+    server: _Server
+
+    def log_message(self, *args: Any):
+        pass
+
+    def do_GET(self):
+        self._route(send_body=True)
+
+    def do_HEAD(self):
+        self._route(send_body=False)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        fake = self.server.fake
+        path, query = self._split()
+        if fake.latency:
+            time.sleep(fake.latency)
+        if path == "/youtubei/v1/player":
+            document = fake.player_response(query.get("videoId", ""))
+            self._send_json("player", document)
+        elif path == "/youtubei/v1/browse":
+            token = json.loads(body or b"{}").get("continuation", "")
+            self._send_json("browse", fake.playlist_continuation(token))
+        else:
+            self._send("other", 404, b"", "text/plain")
+
+    def _route(self, send_body: bool):
+        fake = self.server.fake
+        path, query = self._split()
+        if fake.latency:
+            time.sleep(fake.latency)
+        if path == "/videoplayback":
+            self._send_media(query, send_body)
+        elif path == "/watch":
+            html = fake.watch_page(query.get("v", ""))
+            self._send("watch", 200, html.encode(), "text/html", send_body)
+        elif path == "/playlist":
+            html = fake.playlist_page(query.get("list", ""))
+            self._send("playlist", 200, html.encode(), "text/html", send_body)
+        elif path == JS_PATH:
+            self._send("js", 200, PLAYER_JS.encode(), "text/javascript", send_body)
+        elif path == "/api/timedtext":
+            xml = fake.captions(
+                query.get("v", ""), query.get("lang", ""), query.get("fmt") == "srv3"
+            )
+            self._send("captions", 200, xml.encode(), "text/xml", send_body)
+        else:
+            self._send("other", 404, b"", "text/plain", send_body)
+
+    def _split(self) -> Tuple[str, Dict[str, str]]:
+        parts = urlsplit(self.path)
+        return parts.path, {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+    def _send_media(self, query: Dict[str, str], send_body: bool):
+        fake = self.server.fake
+        video_id = query.get("id", "")
+        try:
+            itag = int(query.get("itag", ""))
+            size = fake.stream_size(itag)
+        except (KeyError, ValueError):
+            self._send("media", 404, b"", "text/plain", send_body)
+            return
+        if query.get("sig") != signature(video_id, itag):
+            self._send("media", 403, b"", "text/plain", send_body)
+            return
+
+        start, end, status = 0, size - 1, 200
+        match = re.fullmatch(
+            r"bytes=(\d+)-(\d*)", self.headers.get("Range") or ""
+        ) or re.fullmatch(r"(\d+)-(\d*)", query.get("range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            status = 206 if "range" not in query else 200
+            if start >= size:
+                self._send("media", 416, b"", "text/plain", send_body)
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end + 1 - start))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        sent = self._write_body(start, end + 1, send_body)
+        fake.count("media", sent)
+
+    def _write_body(self, start: int, stop: int, send_body: bool) -> int:
+        """Writes media bytes start..stop-1 at most bandwidth bytes per second"""
+        if not send_body:
+            return 0
+        bandwidth = self.server.fake.bandwidth
+        began = time.monotonic()
+        sent = 0
+        while start + sent < stop:
+            chunk = media_bytes(start + sent, min(CHUNK_SIZE, stop - start - sent))
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if bandwidth:
+                ahead = sent / bandwidth - (time.monotonic() - began)
+                if ahead > 0:
+                    time.sleep(ahead)
+        return sent
+
+    def _send_json(self, kind: str, document: Dict[str, Any]):
+        self._send(kind, 200, json.dumps(document).encode(), "application/json")
+
+    def _send(
+        self,
+        kind: str,
+        status: int,
+        body: bytes,
+        content_type: str,
+        send_body: bool = True,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        self.server.fake.count(kind, len(body) if send_body else 0)
+
+
+class RequestTimer:
+    """Time to first byte of every request pytube or the engine sends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started: float = time.monotonic()
+            self.first_media: Optional[float] = None  # seconds after started
+            self.ttfb: Dict[str, List[float]] = {}  # seconds, by path
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self.ttfb.setdefault(path, []).append(seconds)
+            if path == "/videoplayback" and self.first_media is None:
+                self.first_media = time.monotonic() - self.started
+
+
+def reroute(base_url: str) -> RequestTimer:
+    """
+    Sends pytube's requests for youtube.com to the fake at base_url from now on, on
+    top of whatever pytube.request._execute_request currently is (e.g.
+    engine.transport's pool), and times every request.
+    """
+    target = urlsplit(base_url)
+    execute_request = request._execute_request
+    timer = RequestTimer()
+
+    def rerouted(url, *args, **kwargs):
+        parts = urlsplit(url)
+        if (parts.hostname or "").endswith("youtube.com"):
+            url = urlunsplit(
+                (target.scheme, target.netloc, parts.path, parts.query, "")
+            )
+        began = time.monotonic()
+        response = execute_request(url, *args, **kwargs)
+        timer.record(parts.path, time.monotonic() - began)
+        return response
+
+    request._execute_request = rerouted
+    return timer
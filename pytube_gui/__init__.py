@@ -1,2 +1,11 @@
-from .main import main as run
+def run():
+    import sys
 
+    from .startup import start_profiling
+
+    # started first so that it sees every import, Qt included
+    profiler = start_profiling(sys.argv)
+    # imported here so that the batch entry point doesn't need Qt
+    from .main import main
+
+    main(profiler)
@@ -0,0 +1,439 @@
+"""
+Headless entry point (pytube-gui-batch) for unattended downloads.
+
+Runs the same jobs as the GUI (engine.jobs) without Qt. Progress is written to stdout
+as JSON lines, one event per line, e.g.
+
+    {"event": "started", "job": 1, "kind": "video", "url": "..."}
+    {"event": "transfer", "job": 1, "bytes_done": 1048576, "bytes_total": 8388608, ...}
+    {"event": "finished", "job": 1}
+
+URLs are read from the files as jobs start, so lists of any length can be given. Text
+and CSV files both work, duplicates and videos already in the output folder's index
+(engine.index) are skipped with a "skipped" event (job 0). With --enqueue the URLs are
+added to the GUI's download queue instead, which downloads them the next time it runs.
+
+When all jobs are done, a last "stats" event (job 0) reports metadata cache and
+connection pool counters and how long each stage of the downloads took
+(engine.metrics). With --metrics DIR the stage metrics are also written to DIR as a
+Prometheus text file and a JSON summary.
+
+The exit status is 0 if every job finished, 1 if any failed and 2 for bad arguments.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .engine import transport
+from .engine.cache import default_cache
+from .engine.captions import CAPTION_FORMATS, DEFAULT_LANGUAGES, SRT, parse_languages
+from .engine.decipher import default_plans
+from .engine.jobs import CaptionsJob, JobFailed, PlaylistJob, VideoJob
+from .engine.metrics import default_metrics
+from .engine.playlist import is_playlist_url
+from .engine.progress import TransferProgress
+from .engine.queue import CAPTIONS, PLAYLIST, VIDEO, JobQueue
+from .engine.ratelimit import global_bucket
+from .engine.selection import StreamPolicy
+from .engine.transcode import AUDIO_FORMATS, MP3
+from .engine.urlimport import NOT_A_URL, Deduplicator, import_urls, parse_row
+
+_output_lock = threading.Lock()
+
+
+def emit(event: str, job: int, **fields: Any):
+    """Writes one progress event as a line of JSON. Safe to call from any thread."""
+    line = json.dumps({"event": event, "job": job, **fields})
+    with _output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def read_urls(paths: List[str]) -> Iterator[str]:
+    """Yields the lines of the given files ('-' for stdin). Blank lines and # comments are skipped."""
+    for path in paths:
+        # utf-8-sig drops the byte order mark spreadsheet programs put in CSV files
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8-sig")
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def unique_urls(lines: Iterable[str], args: argparse.Namespace) -> Iterator[str]:
+    """
+    The canonical URL of every line (a URL or a row of CSV), reporting the lines that
+    are skipped: duplicates, videos already in the output folder and anything else.
+    """
+    dedupe = Deduplicator(args.output_dir, args.captions, args.audio_only)
+    for line in lines:
+        target = parse_row(line)
+        reason = NOT_A_URL if target is None else dedupe.check(target)
+        if reason is not None:
+            emit("skipped", 0, url=line, reason=reason)
+            continue
+        yield target.url
+
+
+def url_kind(url: str, captions: bool = False) -> str:
+    """VIDEO, PLAYLIST or CAPTIONS. Channels count as playlists, watch URLs with a list don't."""
+    if captions:
+        return CAPTIONS
+    return PLAYLIST if is_playlist_url(url) else VIDEO
+
+
+def create_job(kind: str, url: str, args: argparse.Namespace):
+    if kind == VIDEO:
+        return VideoJob(
+            url,
+            args.output_dir,
+            args.audio_only,
+            segments=args.connections,
+            audio_format=args.audio_format,
+            adaptive=args.adaptive,
+            policy=args.policy,
+            rate_limit=args.job_limit,
+        )
+    elif kind == PLAYLIST:
+        return PlaylistJob(
+            url,
+            args.output_dir,
+            args.audio_only,
+            args.start,
+            args.stop,
+            workers=args.workers,
+            segments=args.connections,
+            audio_format=args.audio_format,
+            adaptive=args.adaptive,
+            policy=args.policy,
+            rate_limit=args.job_limit,
+        )
+    return CaptionsJob(
+        url,
+        args.output_dir,
+        languages=args.languages,
+        start_index=args.start,
+        stop_index=args.stop,
+        workers=args.workers,
+        caption_format=args.caption_format,
+    )
+
+
+def job_options(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """The options of queued jobs by kind, like the GUI stores them (see engine.queue)"""
+    video = {
+        "audio_only": args.audio_only,
+        "segments": args.connections,
+        "audio_format": args.audio_format,
+        "adaptive": args.adaptive,
+        "policy": args.policy.to_dict() if args.policy is not None else None,
+        "rate_limit": args.job_limit,
+    }
+    playlist_range = {
+        "start_index": args.start,
+        "stop_index": args.stop,
+        "workers": args.workers,
+    }
+    return {
+        VIDEO: video,
+        PLAYLIST: {**video, **playlist_range},
+        CAPTIONS: {
+            "languages": args.languages,
+            "caption_format": args.caption_format,
+            **playlist_range,
+        },
+    }
+
+
+def create_policy(args: argparse.Namespace) -> Optional[StreamPolicy]:
+    """The stream policy asked for on the command line, None if no option was given"""
+    policy = StreamPolicy(
+        max_resolution=args.max_resolution,
+        preferred_codec=args.codec,
+        preferred_container=args.container,
+        max_bitrate=args.max_bitrate,
+        max_filesize=args.max_filesize,
+        min_audio_bitrate=args.min_audio_bitrate,
+        smallest=args.smallest,
+    )
+    return policy if policy != StreamPolicy() else None
+
+
+def run_job(job_number: int, url: str, args: argparse.Namespace) -> bool:
+    """Runs one job and reports on it. Returns whether it finished."""
+    kind = url_kind(url, args.captions)
+    emit("started", job_number, kind=kind, url=url)
+    job = create_job(kind, url, args)
+
+    job.on_status = lambda status: emit("status", job_number, status=status)
+    if kind in (VIDEO, PLAYLIST):
+        job.on_transfer = lambda progress: emit(
+            "transfer", job_number, **_transfer_fields(progress)
+        )
+    if kind in (PLAYLIST, CAPTIONS):  # captions can be of a playlist
+        job.on_count = lambda count: emit("videos", job_number, total=count)
+        job.on_progress = lambda done: emit("progress", job_number, videos_done=done)
+
+    try:
+        job.run()
+    except JobFailed as jf:
+        emit("failed", job_number, message=str(jf), error=repr(jf.__cause__))
+        return False
+    except Exception as e:  # keep going with the other jobs
+        emit("failed", job_number, message="Unexpected error", error=repr(e))
+        return False
+    emit("finished", job_number)
+    return True
+
+
+def run_jobs(urls: Iterable[str], args: argparse.Namespace) -> int:
+    """
+    Runs a job for every URL, args.jobs at a time. urls is only read as far as jobs
+    start. Returns how many jobs failed.
+    """
+    failed = 0
+    running: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for job_number, url in enumerate(urls, 1):
+            if len(running) >= args.jobs:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                failed += sum(not future.result() for future in done)
+            running.add(pool.submit(run_job, job_number, url, args))
+        failed += sum(not future.result() for future in running)
+    return failed
+
+
+def enqueue(lines: Iterable[str], args: argparse.Namespace) -> int:
+    """Adds the URLs to the GUI's download queue. Reports the counts after every batch."""
+    queue = JobQueue()
+    try:
+        import_urls(
+            lines,
+            queue,
+            os.path.abspath(args.output_dir),
+            job_options(args),
+            args.captions,
+            args.priority,
+            on_progress=lambda counts: emit("imported", 0, **counts),
+        )
+    finally:
+        queue.close()
+    return 0
+
+
+def _transfer_fields(progress: TransferProgress) -> Dict[str, Any]:
+    return {
+        "bytes_done": progress.bytes_done,
+        "bytes_total": progress.bytes_total,
+        "speed": round(progress.speed),
+        "eta": None if progress.eta is None else round(progress.eta, 1),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="pytube-gui-batch",
+        description="Download YouTube videos, playlists or captions without the GUI. "
+        "Progress is printed as JSON lines.",
+    )
+    parser.add_argument(
+        "urls", nargs="*", metavar="URL", help="video, playlist or channel URLs"
+    )
+    parser.add_argument(
+        "-f",
+        "--file",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="read URLs from a file, one per line ('-' for stdin). Can be repeated.",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="where to save the downloads"
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="add the URLs to the GUI's download queue instead of downloading them",
+    )
+    parser.add_argument(
+        "--priority",
+        type=int,
+        default=0,
+        help="priority of the jobs added with --enqueue (higher runs first)",
+    )
+    parser.add_argument(
+        "-a", "--audio-only", action="store_true", help="download audio only"
+    )
+    parser.add_argument(
+        "--audio-format",
+        choices=AUDIO_FORMATS,
+        default=MP3,
+        help="convert audio to MP3 with ffmpeg, or keep the AAC/Opus YouTube serves",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="download the best separate video and audio streams and mux them "
+        "with ffmpeg (above 720p)",
+    )
+    policy = parser.add_argument_group(
+        "stream selection", "limits and preferences for the streams that get downloaded"
+    )
+    policy.add_argument(
+        "--max-resolution",
+        type=int,
+        default=0,
+        metavar="LINES",
+        help="highest resolution, e.g. 1080",
+    )
+    policy.add_argument(
+        "--codec", default="", help="preferred codec, e.g. avc1, vp9, opus, mp4a"
+    )
+    policy.add_argument("--container", default="", help="preferred container, e.g. mp4")
+    policy.add_argument(
+        "--max-bitrate",
+        type=int,
+        default=0,
+        metavar="KBPS",
+        help="highest bitrate of each stream",
+    )
+    policy.add_argument(
+        "--max-filesize",
+        type=int,
+        default=0,
+        metavar="MB",
+        help="largest download per video",
+    )
+    policy.add_argument(
+        "--min-audio-bitrate",
+        type=int,
+        default=0,
+        metavar="KBPS",
+        help="lowest audio bitrate",
+    )
+    policy.add_argument(
+        "--smallest",
+        action="store_true",
+        help="pick the smallest acceptable streams instead of the best",
+    )
+    parser.add_argument(
+        "--captions",
+        action="store_true",
+        help="download the captions of the videos, playlists or channels instead",
+    )
+    parser.add_argument(
+        "--languages",
+        default=",".join(DEFAULT_LANGUAGES),
+        metavar="CODES",
+        help="caption languages in order of preference, e.g. en,a.en,de "
+        "(a.en is auto-generated English)",
+    )
+    parser.add_argument(
+        "--caption-format",
+        choices=CAPTION_FORMATS,
+        default=SRT,
+        help="save captions as SubRip, WebVTT or the XML YouTube serves",
+    )
+    parser.add_argument(
+        "--start", type=int, default=0, help="first playlist video (1-indexed)"
+    )
+    parser.add_argument(
+        "--stop", type=int, default=0, help="last playlist video (1-indexed)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=2, help="URLs downloaded at the same time"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="videos of a playlist downloaded at the same time",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        metavar="KBPS",
+        help="combined bandwidth limit of all downloads in KB/s",
+    )
+    parser.add_argument(
+        "--job-limit",
+        type=int,
+        default=0,
+        metavar="KBPS",
+        help="bandwidth limit of each URL in KB/s",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=transport.POOL_SIZE,
+        help="idle keep-alive connections kept per host",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=transport.IDLE_TIMEOUT,
+        metavar="SECONDS",
+        help="how long an idle connection is kept",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=4,
+        help="connections each video is split across",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="DIR",
+        help="write per-stage timings to DIR as metrics.prom and metrics.json",
+    )
+    args = parser.parse_args(argv)
+
+    if args.start > 0 and args.stop > 0 and args.start > args.stop:
+        parser.error("--start must not be greater than --stop")
+    if args.jobs < 1 or args.workers < 1 or args.connections < 1:
+        parser.error("--jobs, --workers and --connections must be at least 1")
+    args.policy = create_policy(args)
+    args.languages = parse_languages(args.languages)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.urls and not args.file:
+        print("pytube-gui-batch: no URLs given", file=sys.stderr)
+        return 2
+    lines = itertools.chain(args.urls, read_urls(args.file))
+    if args.enqueue:
+        return enqueue(lines, args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    global_bucket().set_rate(args.limit * 1024)
+    connection_pool = transport.install(args.pool_size, args.idle_timeout)
+    failed = run_jobs(unique_urls(lines, args), args)
+    metrics = default_metrics()
+    if args.metrics:
+        metrics.export(args.metrics)
+    emit(
+        "stats",
+        0,
+        cache=default_cache().stats(),
+        players=default_plans().stats(),
+        connections=connection_pool.stats() if connection_pool else None,
+        stages=metrics.summary()["stages"],
+    )
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
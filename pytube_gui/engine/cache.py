@@ -0,0 +1,178 @@
+"""
+On-disk metadata cache.
+
+Entries are JSON documents in a small SQLite database, each with the time it was stored
+(for the TTL) and the time it was last read (for LRU eviction). When the database grows
+past max_bytes, the least recently read entries are dropped first. Entries that stay
+valid for longer than the cache's TTL, like parsed player JS, are stored with a TTL of
+their own.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .paths import data_dir
+
+DEFAULT_TTL: float = 3 * 60 * 60  # seconds. stream URLs expire after about six hours
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+MAX_VARIABLES: int = 500  # keys per query, SQLite allows 999 parameters
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    ttl REAL
+);
+CREATE INDEX IF NOT EXISTS entries_by_access ON entries (accessed_at);
+"""
+
+
+def default_cache_path() -> str:
+    return os.path.join(data_dir(), "metadata.sqlite3")
+
+
+class MetadataCache:
+    """
+    Thread safe key/value cache with a time to live and a size limit.
+
+    hits, misses and evictions count what happened since the cache was opened.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path: str = path or default_cache_path()
+        self.ttl: float = ttl
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(entries)")]
+            if "ttl" not in columns:  # a database from before entries had their own TTL
+                self._db.execute("ALTER TABLE entries ADD COLUMN ttl REAL")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry for key, None if there is none or it is older than its TTL."""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value, stored_at, ttl FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > (row[2] or self.ttl):
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Same as get() for several keys in one transaction. Keys without an entry are left out."""
+        now = time.time()
+        rows = []
+        with self._lock, self._db:
+            for offset in range(0, len(keys), MAX_VARIABLES):
+                chunk = keys[offset : offset + MAX_VARIABLES]
+                rows += self._db.execute(
+                    "SELECT key, value, stored_at, ttl FROM entries WHERE key IN (%s)"
+                    % ", ".join("?" * len(chunk)),
+                    chunk,
+                ).fetchall()
+            rows = [row for row in rows if now - row[2] <= (row[3] or self.ttl)]
+            self._db.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(now, row[0]) for row in rows],
+            )
+            self.hits += len(rows)
+            self.misses += len(keys) - len(rows)
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def put(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        Stores value under key, valid for ttl seconds instead of the cache's TTL if given.
+        Then evicts least recently used entries if over max_bytes.
+        """
+        text = json.dumps(value)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, stored_at, accessed_at, ttl)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, len(text), now, now, ttl),
+            )
+            self._evict()
+
+    def invalidate(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus the current number and size of entries"""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes. Must hold self._lock."""
+        cursor = self._db.execute(
+            "DELETE FROM entries WHERE stored_at + COALESCE(ttl, ?) < ?",
+            (self.ttl, time.time()),
+        )
+        self.evictions += cursor.rowcount
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ).fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_default_cache: Optional[MetadataCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> MetadataCache:
+    """The cache shared by every downloader of this process"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+        return _default_cache
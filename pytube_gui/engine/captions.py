@@ -0,0 +1,208 @@
+"""
+Choosing, downloading and converting caption tracks.
+
+Languages are asked for as a list of caption codes in order of preference, like
+"en, a.en": English captions the creator made, otherwise English auto-generated ones.
+A code also matches the regional variants of its language, so "en" picks "en-GB" if
+that's all there is.
+
+YouTube serves captions as timed-text XML, either the legacy format
+(<text start="1.5" dur="2">, in seconds) or format 3 (<p t="1500" d="2000">, in
+milliseconds, with the words of auto-generated captions in <s> elements). The track is
+parsed with expat while it downloads and every cue is written out as SRT or WebVTT as
+soon as it is complete, so a track is never held in memory as a string or a tree.
+"""
+
+import html
+import os
+from typing import IO, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from xml.parsers import expat
+
+from pytube import Caption, CaptionQuery, request
+from pytube.helpers import safe_filename
+
+DEFAULT_LANGUAGES: List[str] = ["en", "a.en"]
+
+# caption formats
+SRT: str = "srt"
+VTT: str = "vtt"  # WebVTT
+XML: str = "xml"  # as YouTube serves it
+CAPTION_FORMATS: List[str] = [SRT, VTT, XML]
+
+CHUNK_SIZE: int = 64 * 1024  # bytes parsed at a time
+LAST_CUE_DURATION: float = 2.0  # seconds, for a last cue without a duration
+
+Cue = Tuple[float, float, str]  # start and end in seconds, text
+
+
+def parse_languages(text: str) -> List[str]:
+    """The caption codes in a comma or space separated list, DEFAULT_LANGUAGES if there are none"""
+    languages = [code for code in text.replace(",", " ").split() if code]
+    return languages or list(DEFAULT_LANGUAGES)
+
+
+def pick_caption(captions: CaptionQuery, languages: List[str]) -> Optional[Caption]:
+    """The track of the first of languages the video has captions in, None if it has none of them"""
+    for code in languages:
+        if code in captions:
+            return captions[code]
+        for caption in captions.lang_code_index.values():
+            if caption.code.startswith(code + "-"):  # a regional variant
+                return caption
+    return None
+
+
+class _CueParser:
+    """Collects the cues of a timed-text document fed to it in chunks, with expat"""
+
+    def __init__(self):
+        self.cues: List[Cue] = []  # complete cues not handed out yet
+        self._start: float = 0.0
+        self._end: float = 0.0
+        self._parts: Optional[List[str]] = None  # text of the current cue, if in one
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True  # text in one piece, not split at entities
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+
+    def feed(self, chunk: bytes, last: bool = False):
+        self._parser.Parse(chunk, last)
+
+    def _start_element(self, name: str, attributes: Dict[str, str]):
+        if name == "text":  # legacy format, seconds
+            self._start = float(attributes.get("start", 0))
+            self._end = self._start + float(attributes.get("dur", 0))
+        elif name == "p":  # format 3, milliseconds
+            self._start = int(attributes.get("t", 0)) / 1000
+            self._end = self._start + int(attributes.get("d", 0)) / 1000
+        else:
+            return  # e.g. the <s> words inside of a <p>
+        self._parts = []
+
+    def _end_element(self, name: str):
+        if self._parts is None or (name != "text" and name != "p"):
+            return
+        text = "".join(self._parts)
+        self._parts = None
+        if "&" in text:  # the legacy format escapes entities twice, e.g. &amp;#39;
+            text = html.unescape(text)
+        if "\n" in text:  # a blank line would end the cue early in SRT and WebVTT
+            text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+        else:
+            text = text.strip()
+        if text:
+            self.cues.append((self._start, self._end, text))
+
+    def _character_data(self, data: str):
+        if self._parts is not None:
+            self._parts.append(data)
+
+
+def iter_cues(chunks: Iterable[bytes]) -> Iterator[Cue]:
+    """
+    Yields the cues of a timed-text XML document, given in chunks of any size, as soon
+    as each one is complete. Cues without text are skipped. A cue without a duration
+    lasts until the next one starts.
+
+    Raises xml.parsers.expat.ExpatError for a document that isn't well-formed.
+    """
+    parser = _CueParser()
+    pending: Optional[Cue] = None  # held back until its end is known
+    for chunk in chunks:
+        parser.feed(chunk)
+        for cue in parser.cues:
+            if pending is not None:
+                start, end, text = pending
+                yield start, end if end > start else cue[0], text
+            pending = cue
+        parser.cues.clear()
+    parser.feed(b"", last=True)
+    if parser.cues:  # there can't be any in a well-formed document
+        raise expat.ExpatError("cue after the end of the document")
+    if pending is not None:
+        start, end, text = pending
+        yield start, end if end > start else start + LAST_CUE_DURATION, text
+
+
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """HH:MM:SS,mmm as SRT wants it. WebVTT uses "." as the separator."""
+    milliseconds = round(seconds * 1000)
+    return "%02d:%02d:%02d%s%03d" % (
+        milliseconds // 3600_000,
+        milliseconds // 60_000 % 60,
+        milliseconds // 1000 % 60,
+        separator,
+        milliseconds % 1000,
+    )
+
+
+def write_srt(cues: Iterable[Cue], out: TextIO) -> int:
+    """Writes cues to out as SubRip. Returns how many there were."""
+    count = 0
+    for count, (start, end, text) in enumerate(cues, 1):
+        out.write(
+            f"{count}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n"
+        )
+    return count
+
+
+def write_vtt(cues: Iterable[Cue], out: TextIO) -> int:
+    """Writes cues to out as WebVTT. Returns how many there were."""
+    out.write("WEBVTT\n\n")
+    count = 0
+    for count, (start, end, text) in enumerate(cues, 1):
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        out.write(
+            f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n"
+        )
+    return count
+
+
+def convert(chunks: Iterable[bytes], out: TextIO, caption_format: str) -> int:
+    """Converts timed-text XML to SRT or VTT as it is read. Returns the number of cues."""
+    if caption_format == SRT:
+        return write_srt(iter_cues(chunks), out)
+    elif caption_format == VTT:
+        return write_vtt(iter_cues(chunks), out)
+    raise ValueError(f"Can't convert captions to {caption_format}")
+
+
+def iter_chunks(response: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    chunk = response.read(chunk_size)
+    while chunk:
+        yield chunk
+        chunk = response.read(chunk_size)
+
+
+def caption_filename(title: str, caption: Caption, caption_format: str) -> str:
+    """Same name pytube's Caption.download gives the file"""
+    return f"{safe_filename(title)} ({caption.code}).{caption_format}"
+
+
+def download_caption(
+    caption: Caption, title: str, output_path: str, caption_format: str = SRT
+) -> str:
+    """
+    Downloads a caption track into output_path, converting it while it arrives unless
+    caption_format is XML. Returns the path of the file.
+    """
+    file_path = os.path.join(
+        output_path, caption_filename(title, caption, caption_format)
+    )
+    temp_path = file_path + ".part"  # only a complete file gets the real name
+    try:
+        with request._execute_request(caption.url) as response:
+            if caption_format == XML:
+                with open(temp_path, "wb") as f:
+                    for chunk in iter_chunks(response):
+                        f.write(chunk)
+            else:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    convert(iter_chunks(response), f, caption_format)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, file_path)
+    return file_path
@@ -0,0 +1,245 @@
+"""
+Signature deciphering with the player JS parsed once per player version.
+
+Stream URLs come with a scrambled signature and throttling parameter (n) that the
+player JS unscrambles. pytube downloads the player JS (about 1MB) for every YouTube
+object whose predecessor used another player, and always parses it again with a series
+of regexes to build a Cipher. All videos use the same few player versions, so
+DecipherPlan keeps what pytube's Cipher extracts from a player, keyed by the URL of
+its JS: in memory for the session, and in the metadata cache across runs. A video then
+only needs a fresh Cipher built from the plan, which costs no request and no regex.
+
+Plans only reference functions of pytube.cipher by name, so they can be stored as JSON.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from pytube import cipher as pytube_cipher
+from pytube import request
+from pytube.cipher import Cipher
+from pytube.exceptions import ExtractError, LiveStreamError, RegexMatchError
+
+from .cache import MetadataCache
+
+PLAN_TTL: float = 30 * 24 * 60 * 60  # seconds. a player's JS never changes
+PLAN_VERSION: int = 1  # stored plans of another version are ignored
+
+
+class DecipherPlan:
+    """What pytube's Cipher extracts from one player JS"""
+
+    def __init__(
+        self,
+        transform_plan: List[str],
+        transform_map: Dict[str, str],
+        throttling_plan: List[List[str]],
+        throttling_array: List[Any],
+    ):
+        self.transform_plan: List[str] = transform_plan  # JS calls, e.g. "Xy.AJ(a,15)"
+        self.transform_map: Dict[str, str] = (
+            transform_map  # JS name -> pytube.cipher function
+        )
+        self.throttling_plan: List[List[str]] = (
+            throttling_plan  # indexes into the array
+        )
+        # ints and strings as they are, {"fn": name} for functions, {"self": True} for the array itself
+        self.throttling_array: List[Any] = throttling_array
+
+    @classmethod
+    def from_js(cls, js: str) -> "DecipherPlan":
+        """Parses a player JS. Raises RegexMatchError or ExtractError if pytube can't."""
+        parsed = Cipher(js=js)
+        return cls(
+            parsed.transform_plan,
+            {name: _function_name(fn) for name, fn in parsed.transform_map.items()},
+            [list(step) for step in parsed.throttling_plan],
+            [
+                _encode(element, parsed.throttling_array)
+                for element in parsed.throttling_array
+            ],
+        )
+
+    def cipher(self) -> Cipher:
+        """A new Cipher for one video. A Cipher remembers the n of its video, so it can't be shared."""
+        return PlanCipher(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": PLAN_VERSION,
+            "transform_plan": self.transform_plan,
+            "transform_map": self.transform_map,
+            "throttling_plan": self.throttling_plan,
+            "throttling_array": self.throttling_array,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DecipherPlan":
+        return cls(
+            data["transform_plan"],
+            data["transform_map"],
+            data["throttling_plan"],
+            data["throttling_array"],
+        )
+
+
+class PlanCipher(Cipher):
+    """pytube's Cipher, built from a DecipherPlan instead of the player JS"""
+
+    def __init__(self, plan: DecipherPlan):
+        self.transform_plan: List[str] = plan.transform_plan
+        self.transform_map: Dict[str, Any] = {
+            name: getattr(pytube_cipher, fn) for name, fn in plan.transform_map.items()
+        }
+        self.js_func_patterns: List[str] = [
+            r"\w+\.(\w+)\(\w,(\d+)\)",
+            r"\w+\[(\"\w+\")\]\(\w,(\d+)\)",
+        ]  # the same as Cipher's
+        self.throttling_plan: List[List[str]] = plan.throttling_plan
+        # calculate_n() changes the array in place, so every cipher gets its own
+        self.throttling_array: List[Any] = []
+        for element in plan.throttling_array:
+            if isinstance(element, dict) and "self" in element:
+                element = self.throttling_array
+            elif isinstance(element, dict):
+                element = getattr(pytube_cipher, element["fn"])
+            self.throttling_array.append(element)
+        self.calculated_n: Optional[str] = None
+
+
+def _encode(element: Any, throttling_array: List[Any]) -> Any:
+    """An element of a Cipher's throttling array as JSON"""
+    if element is throttling_array:
+        return {"self": True}  # null in the JS, the array itself in pytube
+    if callable(element):
+        return {"fn": _function_name(element)}
+    return element
+
+
+def _function_name(fn: Any) -> str:
+    """The name of a function of pytube.cipher. ValueError for anything else."""
+    name = getattr(fn, "__name__", "")
+    if getattr(pytube_cipher, name, None) is not fn:
+        raise ValueError(f"{fn!r} is not a function of pytube.cipher")
+    return name
+
+
+class PlanCache:
+    """
+    Thread safe cache of DecipherPlans by player JS URL, in memory and in a
+    MetadataCache. When several threads need the plan of a new player at the same
+    time, only one of them downloads and parses the JS while the others wait for it.
+    """
+
+    def __init__(self):
+        self.parsed: int = 0  # player JS downloaded and parsed
+        self.loaded: int = 0  # plans read from the metadata cache
+        self._plans: Dict[str, DecipherPlan] = {}
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+
+    def get(
+        self, js_url: str, cache: Optional[MetadataCache] = None, refresh: bool = False
+    ) -> DecipherPlan:
+        """
+        The plan of the player at js_url. With refresh, the JS is downloaded and parsed
+        again even if there's a plan for it already.
+        """
+        with self._lock:
+            plan = self._plans.get(js_url)
+            url_lock = self._url_locks.setdefault(js_url, threading.Lock())
+        if plan is not None and not refresh:
+            return plan
+
+        with url_lock:
+            with self._lock:
+                newer = self._plans.get(js_url)
+            if newer is not None and (not refresh or newer is not plan):
+                return newer  # another thread got it while this one waited
+            key = f"player:{js_url}"
+            entry = cache.get(key) if cache is not None and not refresh else None
+            if entry is not None and entry.get("version") == PLAN_VERSION:
+                plan = DecipherPlan.from_dict(entry)
+                self.loaded += 1
+            else:
+                plan = DecipherPlan.from_js(request.get(js_url))
+                self.parsed += 1
+                if cache is not None:
+                    cache.put(key, plan.to_dict(), ttl=PLAN_TTL)
+            with self._lock:
+                self._plans[js_url] = plan
+        return plan
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "players": len(self._plans),
+                "parsed": self.parsed,
+                "loaded": self.loaded,
+            }
+
+
+def apply_signature(
+    stream_manifest: List[Dict[str, Any]], vid_info: Dict[str, Any], cipher: Cipher
+):
+    """
+    Deciphers the URLs of the manifest in place like pytube's extract.apply_signature,
+    with a ready Cipher instead of the player JS.
+    """
+    for stream in stream_manifest:
+        url: Optional[str] = stream.get("url")
+        if url is None:
+            if vid_info.get("playabilityStatus", {}).get("liveStreamability"):
+                raise LiveStreamError("UNKNOWN")
+            continue
+        if "signature" in url or (
+            "s" not in stream and ("&sig=" in url or "&lsig=" in url)
+        ):
+            continue  # already signed
+
+        signature = cipher.get_signature(ciphered_signature=stream["s"])
+        parsed_url = urlparse(url)
+        query = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+        query["sig"] = signature
+        if "ratebypass" not in query:
+            query["n"] = cipher.calculate_n(list(query["n"]))
+        stream["url"] = (
+            f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{urlencode(query)}"
+        )
+
+
+def decipher_manifest(
+    stream_manifest: List[Dict[str, Any]],
+    vid_info: Dict[str, Any],
+    plan: DecipherPlan,
+    js_url: str,
+    cache: Optional[MetadataCache] = None,
+    plans: Optional["PlanCache"] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Returns a copy of the manifest with its URLs deciphered by plan. If the plan can't
+    decipher them, the player JS is fetched and parsed again once, like pytube does
+    when its cached JS fails.
+    """
+    try:
+        deciphered = [dict(stream) for stream in stream_manifest]
+        apply_signature(deciphered, vid_info, plan.cipher())
+    except (ExtractError, RegexMatchError):
+        plan = (plans or default_plans()).get(js_url, cache, refresh=True)
+        deciphered = [dict(stream) for stream in stream_manifest]
+        apply_signature(deciphered, vid_info, plan.cipher())
+    return deciphered
+
+
+_default_plans: Optional[PlanCache] = None
+_default_plans_lock = threading.Lock()
+
+
+def default_plans() -> PlanCache:
+    """The plans shared by every download of this process"""
+    global _default_plans
+    with _default_plans_lock:
+        if _default_plans is None:
+            _default_plans = PlanCache()
+        return _default_plans
@@ -0,0 +1,137 @@
+"""
+Disk space bookkeeping for downloads.
+
+Before a video is downloaded, the bytes its streams (and their post-processing) will
+take are reserved against the free space of the volume they go to. Reservations of
+every download of the process add up, so two videos that each fit on their own don't
+both start when only one of them does. A download gives its reservation back as it
+preallocates its files, since the free space accounts for them from then on, and the
+rest once the video is post-processed.
+
+A reservation that doesn't fit waits while other downloads to the same volume hold
+reservations, and raises NotEnoughSpace before anything is written when nothing else
+could free up room.
+"""
+
+import errno
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+MARGIN: int = 64 * 1024 * 1024  # bytes always left free on a volume
+
+
+class NotEnoughSpace(OSError):
+    """A download doesn't fit on its volume. Subclasses OSError so it counts as a failed download."""
+
+    def __init__(self, path: str, needed: int, available: int):
+        super().__init__(
+            errno.ENOSPC,
+            f"Not enough disk space: needs {format_size(needed)}, "
+            f"{format_size(max(available, 0))} available",
+            path,
+        )
+        self.needed: int = needed
+        self.available: int = available
+
+
+def format_size(byte_count: float) -> str:
+    """Human readable size, e.g. '1.5 GB'"""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if byte_count < 1024 or unit == "TB":
+            break
+        byte_count /= 1024
+    return f"{byte_count:.1f} {unit}"
+
+
+def _existing(path: str) -> str:
+    """path, or its closest parent that exists. A playlist's folder is only created once it starts."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+class Reservation:
+    """Bytes set aside on one volume for one video"""
+
+    def __init__(self, space: "DiskSpace", device: int, size: int):
+        self.space: "DiskSpace" = space
+        self.device: int = device  # st_dev of the volume
+        self.size: int = size  # bytes still set aside
+
+    def use(self, byte_count: int):
+        """byte_count of the reserved bytes were allocated on disk, so they no longer need setting aside"""
+        self.space._give_back(self, byte_count)
+
+    def release(self):
+        """Gives back whatever is left. Safe to call more than once."""
+        self.space._give_back(self, self.size)
+
+
+class DiskSpace:
+    """Thread safe ledger of the bytes reserved on each volume"""
+
+    def __init__(self, margin: int = MARGIN):
+        self.margin: int = margin
+        self._reserved: Dict[int, int] = {}  # bytes by st_dev
+        self._changed = threading.Condition()
+
+    def available(self, path: str) -> int:
+        """Bytes that can still be reserved on the volume of path. Negative when over."""
+        path = _existing(path)
+        with self._changed:
+            reserved = self._reserved.get(os.stat(path).st_dev, 0)
+        return shutil.disk_usage(path).free - reserved - self.margin
+
+    def fits(self, path: str, size: int) -> bool:
+        return size <= self.available(path)
+
+    def reserve(
+        self, path: str, size: int, timeout: Optional[float] = None
+    ) -> Reservation:
+        """
+        Sets aside size bytes on the volume of path, waiting (up to timeout seconds)
+        while other reservations on it are in the way.
+
+        Raises NotEnoughSpace if size doesn't fit even with no other reservations, or
+        still doesn't after timeout.
+        """
+        path = _existing(path)
+        device = os.stat(path).st_dev
+        with self._changed:
+            while True:
+                reserved = self._reserved.get(device, 0)
+                free = shutil.disk_usage(path).free - self.margin
+                if size <= free - reserved:
+                    self._reserved[device] = reserved + size
+                    return Reservation(self, device, size)
+                if reserved == 0:  # nothing that could make room is running
+                    raise NotEnoughSpace(path, size, free - reserved)
+                if not self._changed.wait(timeout):
+                    raise NotEnoughSpace(path, size, free - reserved)
+
+    def _give_back(self, reservation: Reservation, byte_count: int):
+        with self._changed:
+            byte_count = min(byte_count, reservation.size)
+            if byte_count <= 0:
+                return
+            reservation.size -= byte_count
+            self._reserved[reservation.device] -= byte_count
+            if not self._reserved[reservation.device]:
+                del self._reserved[reservation.device]
+            self._changed.notify_all()
+
+
+_default_space: Optional[DiskSpace] = None
+_default_space_lock = threading.Lock()
+
+
+def default_space() -> DiskSpace:
+    """The ledger shared by every download of this process"""
+    global _default_space
+    with _default_space_lock:
+        if _default_space is None:
+            _default_space = DiskSpace()
+        return _default_space
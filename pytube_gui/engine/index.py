@@ -0,0 +1,101 @@
+"""
+Index of what has already been downloaded into a folder.
+
+Each download folder gets a small JSON manifest listing the videos saved there and the
+file each one ended up in. Re-running a playlist into the same folder only downloads
+videos that are not in the manifest, or whose file has since been deleted. Single
+videos are listed too, so importing a list of URLs again (engine.urlimport) skips the
+ones already saved.
+
+Captions are listed separately from the videos, under the languages and format that
+were asked for (see engine.captions).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List
+
+INDEX_FILENAME: str = ".pytube-gui-index.json"
+
+_file_locks: Dict[str, threading.Lock] = {}  # by manifest path
+_file_locks_lock = threading.Lock()
+
+
+def _file_lock(path: str) -> threading.Lock:
+    """The lock of a manifest, shared by every DownloadIndex of it in this process"""
+    with _file_locks_lock:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class DownloadIndex:
+    """
+    The manifest of one folder. Safe to share between the workers of a playlist, and
+    jobs that each open the folder's manifest don't overwrite each other's entries.
+    """
+
+    def __init__(self, folder: str):
+        self.folder: str = folder
+        self.path: str = os.path.join(folder, INDEX_FILENAME)
+        self._lock = _file_lock(self.path)
+        self._entries: Dict[str, Dict] = self._load()
+
+    def contains(
+        self, video_id: str, audio_only: bool = False, captions: str = ""
+    ) -> bool:
+        """Whether the video (or its captions) was downloaded here and its file is still around"""
+        with self._lock:
+            entry = self._entries.get(_key(video_id, audio_only, captions))
+        return entry is not None and os.path.isfile(
+            os.path.join(self.folder, entry["file"])
+        )
+
+    def missing(
+        self, video_ids: Iterable[str], audio_only: bool = False, captions: str = ""
+    ) -> List[str]:
+        """The video IDs that still have to be downloaded, in their original order"""
+        return [
+            video_id
+            for video_id in video_ids
+            if not self.contains(video_id, audio_only, captions)
+        ]
+
+    def add(
+        self,
+        video_id: str,
+        file_path: str,
+        audio_only: bool = False,
+        captions: str = "",
+    ):
+        """Records a finished download and saves the manifest."""
+        with self._lock:
+            # other jobs downloading into the folder may have added to it since
+            self._entries.update(self._load())
+            self._entries[_key(video_id, audio_only, captions)] = {
+                "file": os.path.basename(file_path),
+                "downloaded_at": time.time(),
+            }
+            self._save()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("videos", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        """Writes the manifest next to the old one, then swaps it in. Must hold self._lock."""
+        # the GUI and the batch CLI may both be writing
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"videos": self._entries}, f, indent=1)
+        os.replace(temp_path, self.path)
+
+
+def _key(video_id: str, audio_only: bool, captions: str = "") -> str:
+    # the audio and video versions of a video are different files
+    if captions:  # the languages and format asked for, e.g. "en,a.en:srt"
+        return f"{video_id}/captions/{captions}"
+    return f"{video_id}/audio" if audio_only else video_id
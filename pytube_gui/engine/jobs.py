@@ -0,0 +1,684 @@
+"""
+Download jobs that don't depend on Qt.
+
+A job downloads one video, a playlist, or the captions of a video or playlist. It reports what it is doing
+through plain callbacks (on_status, on_transfer, ...), which the GUI threads in
+form_logic.downloaders connect to Qt signals and the batch entry point prints.
+
+run() first resolves the video/playlist metadata, then downloads. Anything that goes
+wrong is raised as a JobFailed whose message is meant for the user; the original
+exception is its __cause__.
+"""
+
+import http.client
+import os
+import sqlite3
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                as_completed, wait)
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from xml.parsers.expat import ExpatError
+
+from pytube import Caption, Stream, extract
+from pytube import exceptions as pytube_exceptions
+
+from .cache import MetadataCache, default_cache
+from .captions import DEFAULT_LANGUAGES, SRT, download_caption, pick_caption
+from .diskspace import DiskSpace, NotEnoughSpace, Reservation, default_space
+from .index import DownloadIndex
+from .metadata import (VideoInfo, cached_playlist_range, cached_video_infos,
+                       load_playlist_range, load_video_info,
+                       open_playlist_range)
+from .metrics import stage
+from .playlist import is_playlist_url
+from .prefetch import DEFAULT_LOOKAHEAD, Prefetcher
+from .progress import ProgressThrottle, TransferProgress
+from .queue import PLAYLIST, VIDEO
+from .ratelimit import RateLimiter, TokenBucket, global_bucket
+from .records import CONVERTING, DONE, DOWNLOADING, SKIPPED, VideoRecord
+from .selection import StreamPolicy, select_streams
+from .transcode import (MP3, Transcoder, completed, default_transcoder,
+                        find_ffmpeg)
+from .transfer import download_stream, space_needed
+
+# what can go wrong once a download is under way (network, disk, pytube)
+DOWNLOAD_ERRORS = (OSError, http.client.HTTPException, pytube_exceptions.PytubeError)
+# what known_size() can run into (index file, metadata cache, pytube)
+ESTIMATE_ERRORS = (OSError, sqlite3.Error, pytube_exceptions.PytubeError)
+ESTIMATED_VIDEOS: int = 100  # videos of a playlist known_size() looks at
+
+
+class JobFailed(Exception):
+    """A job could not be completed. The message can be shown to the user as is."""
+
+
+def _ignore(*args: Any):
+    pass
+
+
+def _fetch(
+    video: VideoInfo,
+    download_location: str,
+    throttle: ProgressThrottle,
+    segments: int,
+    audio_only: bool,
+    audio_format: str,
+    adaptive: bool,
+    policy: Optional[StreamPolicy],
+    cache: MetadataCache,
+    transcoder: Transcoder,
+    limiter: RateLimiter,
+    space: DiskSpace,
+    record: Optional[VideoRecord] = None,
+) -> Future:
+    """
+    Downloads what a job asked for of one video and starts post-processing it.
+    The returned Future's result is the path of the final file. The streams picked
+    are noted in record, if given.
+
+    The disk space it takes is reserved first, which waits while other downloads hold
+    the space it needs and raises NotEnoughSpace if there is none to be had.
+    """
+    # muxing needs ffmpeg
+    adaptive = adaptive and transcoder.can_mux()
+    with stage("select"):
+        streams = select_streams(video, audio_only, adaptive, policy, cache)
+    if record is not None:
+        record.itag = streams[0].itag
+        record.size = sum(stream.filesize for stream in streams)
+    reservation = space.reserve(
+        download_location,
+        _space_needed(streams, download_location, audio_only, audio_format),
+    )
+    try:
+        if len(streams) == 2:
+            result = _fetch_adaptive(
+                *streams,
+                download_location,
+                throttle,
+                segments,
+                transcoder,
+                limiter,
+                reservation,
+            )
+        else:
+            stream = streams[0]
+            # the total grows as videos start, so the ETA covers the videos in flight
+            throttle.add_total(stream.filesize)
+            file_path = download_stream(
+                stream,
+                download_location,
+                throttle,
+                segments=segments,
+                limiter=limiter,
+                reservation=reservation,
+            )
+            if audio_only:
+                result = transcoder.submit(file_path, audio_format)
+            else:
+                result = completed(file_path)
+    except BaseException:
+        reservation.release()
+        raise
+    # post-processing writes another file, so the rest is held until it is done
+    result.add_done_callback(lambda future: reservation.release())
+    return result
+
+
+def _adaptive_paths(
+    video_stream: Stream, audio_stream: Stream, download_location: str
+) -> Tuple[str, Dict[str, str]]:
+    """Where the muxed file goes, and the file names of the video and audio parts"""
+    base, ext = os.path.splitext(video_stream.default_filename)
+    container = (
+        video_stream.subtype if audio_stream.subtype == video_stream.subtype else "mkv"
+    )
+    return os.path.join(download_location, f"{base}.{container}"), {
+        # both may be .mp4
+        kind: f"{base}.{kind}.{stream.subtype}"
+        for kind, stream in (("video", video_stream), ("audio", audio_stream))
+    }
+
+
+def _space_needed(
+    streams: List[Stream], download_location: str, audio_only: bool, audio_format: str
+) -> int:
+    """Bytes the streams and their post-processing still take on disk"""
+    if len(streams) == 2:
+        output_path, filenames = _adaptive_paths(*streams, download_location)
+        if os.path.isfile(output_path):
+            return 0
+        parts = [
+            space_needed(stream, download_location, filenames[kind])
+            for kind, stream in zip(("video", "audio"), streams)
+        ]
+        # the muxed file is about as large as both parts
+        return sum(parts) + sum(stream.filesize for stream in streams)
+    needed = space_needed(streams[0], download_location)
+    if audio_only and audio_format == MP3:
+        needed += streams[0].filesize  # the MP3, about as large as the stream
+    return needed
+
+
+def _fetch_adaptive(
+    video_stream: Stream,
+    audio_stream: Stream,
+    download_location: str,
+    throttle: ProgressThrottle,
+    segments: int,
+    transcoder: Transcoder,
+    limiter: RateLimiter,
+    reservation: Reservation,
+) -> Future:
+    """Downloads both streams at the same time, then starts muxing them."""
+    output_path, filenames = _adaptive_paths(
+        video_stream, audio_stream, download_location
+    )
+    if os.path.isfile(output_path):
+        return completed(output_path)
+
+    throttle.add_total(video_stream.filesize + audio_stream.filesize)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        parts = [
+            pool.submit(
+                download_stream,
+                stream,
+                download_location,
+                throttle,
+                filenames[kind],
+                segments,
+                limiter,
+                reservation,
+            )
+            for kind, stream in (("video", video_stream), ("audio", audio_stream))
+        ]
+        video_path, audio_path = [part.result() for part in parts]
+    return transcoder.mux(video_path, audio_path, output_path)
+
+
+def known_size(
+    kind: str,
+    url: str,
+    download_location: str,
+    options: Dict[str, Any],
+    cache: Optional[MetadataCache] = None,
+) -> int:
+    """
+    Bytes a queued job will take on disk, as far as the metadata cache knows: what the
+    streams it would pick add up to for the videos that are cached and not downloaded
+    yet. Only the next ESTIMATED_VIDEOS videos of a playlist are looked at, since every
+    video reserves its own space when it starts anyway (see _fetch). Captions count as
+    nothing. Never fetches anything.
+    """
+    cache = cache if cache is not None else default_cache()
+    audio_only: bool = options.get("audio_only", False)
+    audio_format: str = options.get("audio_format", MP3)
+    adaptive: bool = options.get("adaptive", False) and find_ffmpeg() is not None
+    policy = StreamPolicy.from_dict(options.get("policy"))
+    if kind == VIDEO:
+        try:
+            video_ids = [extract.video_id(url)]
+        except pytube_exceptions.RegexMatchError:
+            return 0
+        folder = download_location
+    elif kind == PLAYLIST:
+        cached = cached_playlist_range(
+            url, options.get("start_index", 0), options.get("stop_index", 0), cache
+        )
+        if cached is None:
+            return 0
+        title, video_ids = cached
+        folder = os.path.join(download_location, title)
+        if os.path.isdir(folder):  # an earlier run, whose videos are skipped
+            video_ids = DownloadIndex(folder).missing(video_ids, audio_only)
+    else:
+        return 0
+
+    total = 0
+    for video in cached_video_infos(video_ids[:ESTIMATED_VIDEOS], cache).values():
+        if not video.manifest:
+            continue  # only loaded for its captions, so its size isn't known
+        try:
+            streams = select_streams(video, audio_only, adaptive, policy, cache)
+        except pytube_exceptions.PytubeError:  # e.g. no stream the policy accepts
+            continue
+        if None in streams:
+            continue
+        total += _space_needed(streams, folder, audio_only, audio_format)
+    return total
+
+
+class VideoJob:
+    """Downloads a single video"""
+
+    def __init__(
+        self,
+        url: str,
+        download_location: str,
+        audio_only: bool,
+        segments: int = 1,
+        audio_format: str = MP3,
+        adaptive: bool = False,
+        policy: Optional[StreamPolicy] = None,
+        rate_limit: int = 0,
+        cache: Optional[MetadataCache] = None,
+        transcoder: Optional[Transcoder] = None,
+    ):
+        self.url: str = url
+        self.video: VideoInfo
+        self.download_location: str = download_location
+        self.audio_only: bool = audio_only
+        self.segments: int = segments  # connections the stream is split across
+        self.audio_format: str = audio_format  # see engine.transcode
+        self.adaptive: bool = adaptive  # best video and audio streams, muxed
+        self.policy: Optional[StreamPolicy] = policy  # see engine.selection
+        self.bucket: TokenBucket = TokenBucket(rate_limit * 1024)  # KB/s, 0 for none
+        # every chunk counts against the global limit and this job's
+        self.limiter: RateLimiter = RateLimiter([global_bucket(), self.bucket])
+        self.cache: MetadataCache = cache if cache is not None else default_cache()
+        self.transcoder: Transcoder = (
+            transcoder if transcoder is not None else default_transcoder()
+        )
+        self.space: DiskSpace = default_space()  # reservations of every job
+        self.on_status: Callable[[str], Any] = _ignore  # what is being downloaded
+        self.on_transfer: Callable[[TransferProgress], Any] = _ignore  # bytes so far
+
+    def run(self):
+        with stage("video_job"):
+            self._run()
+
+    def _run(self):
+        try:
+            self.video = load_video_info(self.url, self.cache)
+        except pytube_exceptions.RegexMatchError as rme:
+            raise JobFailed(
+                "Could not find video. Check to make sure the URL is correct."
+            ) from rme
+        except pytube_exceptions.PytubeError as pe:
+            raise JobFailed(
+                "Could not download video. Check to make sure the URL is correct."
+            ) from pe
+        except DOWNLOAD_ERRORS as de:  # e.g. no connection
+            raise JobFailed(f"Download failed: {de}") from de
+
+        try:
+            self._download()
+        except NotEnoughSpace as nes:
+            raise JobFailed(nes.strerror) from nes
+        except DOWNLOAD_ERRORS as de:
+            raise JobFailed(f"Download failed: {de}") from de
+
+    def _download(self):
+        self.on_status(f"Downloading: {self.video.title}")
+        throttle = ProgressThrottle(self.on_transfer)
+        result = _fetch(
+            self.video,
+            self.download_location,
+            throttle,
+            self.segments,
+            self.audio_only,
+            self.audio_format,
+            self.adaptive,
+            self.policy,
+            self.cache,
+            self.transcoder,
+            self.limiter,
+            self.space,
+        )
+        throttle.finish()
+        if not result.done():
+            self.on_status(f"Processing: {self.video.title}")
+        file_path = result.result()
+        # so that importing the same list of URLs again skips the video
+        DownloadIndex(self.download_location).add(
+            self.video.video_id, file_path, self.audio_only
+        )
+
+
+class PlaylistJob:
+    """Downloads the videos of a playlist from start_index to stop_index into their own folder"""
+
+    def __init__(
+        self,
+        url: str,
+        download_base_path: str,
+        audio_only: bool,
+        start_index: int,
+        stop_index: int,
+        workers: int = 1,
+        segments: int = 1,
+        audio_format: str = MP3,
+        adaptive: bool = False,
+        policy: Optional[StreamPolicy] = None,
+        rate_limit: int = 0,
+        cache: Optional[MetadataCache] = None,
+        transcoder: Optional[Transcoder] = None,
+        lookahead: int = DEFAULT_LOOKAHEAD,
+    ):
+        self.url: str = url
+        self.playlist_id: str
+        self.video_ids: List[str]  # only the selected range, as far as it has been walked
+        self.videos: List[VideoRecord] = []  # of video_ids, as far as the job got
+        self.download_base_path: str = download_base_path
+        self.download_location: str
+        self.audio_only: bool = audio_only
+        self.start_index: int = start_index  # 1-indexed
+        self.stop_index: int = stop_index  # 1-indexed
+        self.workers: int = max(1, workers)  # videos downloaded at the same time
+        self.segments: int = segments  # connections each video is split across
+        self.audio_format: str = audio_format  # see engine.transcode
+        self.adaptive: bool = adaptive  # best video and audio streams, muxed
+        self.policy: Optional[StreamPolicy] = policy  # see engine.selection
+        self.bucket: TokenBucket = TokenBucket(rate_limit * 1024)  # KB/s, 0 for none
+        # every chunk counts against the global limit and this job's
+        self.limiter: RateLimiter = RateLimiter([global_bucket(), self.bucket])
+        self.throttle: ProgressThrottle  # shared by all workers
+        self.index: DownloadIndex  # what earlier runs left in download_location
+        self.lookahead: int = lookahead  # videos loaded ahead of the workers
+        self.prefetcher: Prefetcher  # walks the playlist and loads videos ahead
+        self.cache: MetadataCache = cache if cache is not None else default_cache()
+        self.transcoder: Transcoder = (
+            transcoder if transcoder is not None else default_transcoder()
+        )
+        self.space: DiskSpace = default_space()  # reservations of every job
+        self.on_count: Callable[[int], Any] = _ignore  # how many videos there are
+        self.on_status: Callable[[str], Any] = _ignore  # what is being downloaded
+        self.on_progress: Callable[[int], Any] = _ignore  # how many videos are done
+        self.on_transfer: Callable[[TransferProgress], Any] = _ignore  # all workers
+
+    def run(self):
+        with stage("playlist_job"):
+            self._run()
+
+    def _run(self):
+        try:
+            self._resolve()
+        except (pytube_exceptions.RegexMatchError, KeyError) as rme:
+            raise JobFailed(
+                "Could not find playlist. Check to make sure the URL is correct."
+            ) from rme
+        except pytube_exceptions.PytubeError as pe:
+            raise JobFailed(
+                "Could not download video. Check to make sure the URL is correct."
+            ) from pe
+        except DOWNLOAD_ERRORS as de:  # no connection, or the folder can't be created
+            raise JobFailed(f"Download failed: {de}") from de
+        except ValueError as ve:
+            raise JobFailed(str(ve)) from ve
+
+        try:
+            self._download()
+        except NotEnoughSpace as nes:
+            raise JobFailed(nes.strerror) from nes
+        except DOWNLOAD_ERRORS as de:
+            raise JobFailed(f"Download failed: {de}") from de
+        except ValueError as ve:  # the playlist turned out shorter than the range
+            raise JobFailed(str(ve)) from ve
+
+    def _resolve(self):
+        # only the first page is fetched here. the prefetcher walks the rest, up to
+        # stop_index, while the first videos download
+        self.playlist_id, title, video_ids = open_playlist_range(
+            self.url, self.start_index, self.stop_index, self.cache
+        )
+
+        # put all downloaded files into its own directory. it may exist already
+        # from an earlier run, in which case only what's missing is downloaded
+        self.download_location = os.path.join(self.download_base_path, title)
+        with stage("folder"):
+            os.makedirs(self.download_location, exist_ok=True)
+            self.index = DownloadIndex(self.download_location)
+        self.prefetcher = Prefetcher(
+            video_ids,
+            self._load_video,
+            self.lookahead,
+            skip=lambda video_id: self.index.contains(video_id, self.audio_only),
+        )
+        self.video_ids = self.prefetcher.video_ids
+
+    def _download(self):
+        self.throttle = ProgressThrottle(self.on_transfer)
+        self.prefetcher.start()
+        try:
+            self._download_found()
+        finally:
+            self.prefetcher.close()
+        self.throttle.finish()
+
+    def _download_found(self):
+        """
+        Downloads the videos of the range as the prefetcher finds them. Only the videos
+        being downloaded or converted have Futures, the others are VideoRecords until
+        a worker is free.
+        """
+        videos_done: int = 0
+        position: int = 0  # of the next video for a worker
+        complete: bool = False  # whether the prefetcher found them all
+        walk: Optional[Future] = None  # resolved when the prefetcher finds more
+        walk_error: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            downloads: Dict[Future, VideoRecord] = {}
+            conversions: Dict[Future, VideoRecord] = {}
+            while True:
+                if not complete and (walk is None or walk.done()):
+                    found, complete, walk = self.prefetcher.found(len(self.videos))
+                    self.videos.extend(VideoRecord(video_id) for video_id in found)
+                    if found or (complete and not self.videos):
+                        self.on_count(len(self.videos))  # grows as pages come in
+                        self.on_progress(videos_done)
+                    if complete:
+                        # e.g. a range past the end. the videos found are still finished
+                        walk_error = walk.exception()
+
+                skipped: int = 0
+                while position < len(self.videos) and len(downloads) < self.workers:
+                    record = self.videos[position]
+                    position += 1
+                    # videos saved by an earlier run into the same folder are skipped
+                    if self.index.contains(record.video_id, self.audio_only):
+                        record.state = SKIPPED
+                        skipped += 1
+                        continue
+                    record.state = DOWNLOADING
+                    downloads[pool.submit(self._download_video, record)] = record
+                if skipped:
+                    videos_done += skipped
+                    self.on_progress(videos_done)
+
+                pending: Set[Future] = set(downloads) | set(conversions)
+                if not complete:
+                    pending.add(walk)
+                if not pending:
+                    break
+                # a video is done once it is downloaded and converted. the workers
+                # download the next videos while earlier ones are converting, and the
+                # playlist is still being walked, so wait on all three
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future is walk:
+                        continue
+                    # re-raises anything that went wrong in the worker or the conversion
+                    result = future.result()
+                    if future in downloads:
+                        record = downloads.pop(future)
+                        record.state = CONVERTING
+                        conversions[result] = record
+                        continue
+                    record = conversions.pop(future)
+                    self.index.add(record.video_id, result, self.audio_only)
+                    record.state = DONE
+                    videos_done += 1
+                    self.on_progress(videos_done)
+        if walk_error is not None:
+            raise walk_error
+
+    def _load_video(self, video_id: str) -> VideoInfo:
+        return load_video_info(video_id, self.cache, playlist_id=self.playlist_id)
+
+    def _download_video(self, record: VideoRecord) -> Future:
+        """
+        Downloads one video of the playlist and starts converting or muxing it if needed.
+        Runs on a worker of the pool. The returned Future's result is the final file.
+        The VideoInfo is let go once the download is done, only record is kept.
+        """
+        video = self.prefetcher.take(record.video_id)
+        record.title = video.title
+        self.on_status(f"Downloading: {video.title}")
+        return _fetch(
+            video,
+            self.download_location,
+            self.throttle,
+            self.segments,
+            self.audio_only,
+            self.audio_format,
+            self.adaptive,
+            self.policy,
+            self.cache,
+            self.transcoder,
+            self.limiter,
+            self.space,
+            record,
+        )
+
+
+class CaptionsJob:
+    """
+    Downloads the captions of a video, or those of the videos of a playlist or channel
+    from start_index to stop_index into their own folder
+    """
+
+    def __init__(
+        self,
+        url: str,
+        download_location: str,
+        languages: Optional[List[str]] = None,
+        start_index: int = 0,
+        stop_index: int = 0,
+        workers: int = 1,
+        caption_format: str = SRT,
+        cache: Optional[MetadataCache] = None,
+    ):
+        self.url: str = url
+        self.video: VideoInfo  # single videos only
+        self.playlist_id: Optional[str] = None  # None for a single video
+        self.video_ids: List[str]  # only the selected range
+        self.download_base_path: str = download_location
+        self.download_location: str  # the playlist's own folder for playlists
+        # caption codes in order of preference, see engine.captions
+        self.languages: List[str] = languages or list(DEFAULT_LANGUAGES)
+        self.start_index: int = start_index  # 1-indexed, playlists only
+        self.stop_index: int = stop_index  # 1-indexed, playlists only
+        self.workers: int = max(1, workers)  # videos fetched at the same time
+        self.caption_format: str = caption_format  # SRT, VTT or XML, see engine.captions
+        self.index: DownloadIndex  # playlists only
+        self.cache: MetadataCache = cache if cache is not None else default_cache()
+        self.on_count: Callable[[int], Any] = _ignore  # how many videos there are
+        self.on_status: Callable[[str], Any] = _ignore  # what is being downloaded
+        self.on_progress: Callable[[int], Any] = _ignore  # how many videos are done
+
+    def run(self):
+        with stage("captions_job"):
+            self._run()
+
+    def _run(self):
+        try:
+            self._resolve()
+        except (pytube_exceptions.RegexMatchError, KeyError) as rme:
+            raise JobFailed(
+                "Could not find video or playlist. Check to make sure the URL is correct."
+            ) from rme
+        except pytube_exceptions.PytubeError as pe:
+            raise JobFailed(
+                "Could not download captions. Maybe no captions are available?"
+            ) from pe
+        except DOWNLOAD_ERRORS as de:  # e.g. no connection
+            raise JobFailed(f"Download failed: {de}") from de
+        except ValueError as ve:
+            raise JobFailed(str(ve)) from ve
+
+        try:
+            if self.playlist_id is None:
+                caption = pick_caption(self.video.captions, self.languages)
+                self._save(self.video, caption)
+            else:
+                self._download_playlist()
+        except DOWNLOAD_ERRORS as de:
+            raise JobFailed(f"Download failed: {de}") from de
+        except ExpatError as ee:
+            raise JobFailed("YouTube sent captions that could not be read.") from ee
+
+    def _resolve(self):
+        if is_playlist_url(self.url):
+            self.playlist_id, title, self.video_ids = load_playlist_range(
+                self.url, self.start_index, self.stop_index, self.cache
+            )
+            self.download_location = os.path.join(self.download_base_path, title)
+            with stage("folder"):
+                os.makedirs(self.download_location, exist_ok=True)
+                self.index = DownloadIndex(self.download_location)
+            return
+
+        self.download_location = self.download_base_path
+        self.video = load_video_info(self.url, self.cache, captions_only=True)
+        if pick_caption(self.video.captions, self.languages) is None:
+            # the age gate bypass sometimes lists tracks the regular player response doesn't
+            self.video = load_video_info(
+                self.url,
+                self.cache,
+                bypass_age_gate=True,
+                refresh=True,
+                captions_only=True,
+            )
+        if pick_caption(self.video.captions, self.languages) is None:
+            raise pytube_exceptions.PytubeError("No captions exist for video")
+        self.video_ids = [self.video.video_id]
+
+    def _download_playlist(self):
+        languages = f"{','.join(self.languages)}:{self.caption_format}"
+        # captions saved by an earlier run into the same folder are skipped
+        missing: List[str] = self.index.missing(self.video_ids, captions=languages)
+        videos_done: int = len(self.video_ids) - len(missing)
+        self.on_count(len(self.video_ids))
+        self.on_progress(videos_done)
+        without_captions: int = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            downloads: Dict[Future, str] = {
+                pool.submit(self._download_video, video_id): video_id
+                for video_id in missing
+            }
+            for future in as_completed(downloads):
+                # re-raises anything that went wrong in the worker
+                file_path = future.result()
+                if file_path is None:
+                    without_captions += 1
+                else:
+                    self.index.add(downloads[future], file_path, captions=languages)
+                videos_done += 1
+                self.on_progress(videos_done)
+        if missing and without_captions == len(missing):
+            raise JobFailed(
+                f"None of the videos have {', '.join(self.languages)} captions."
+            )
+
+    def _download_video(self, video_id: str) -> Optional[str]:
+        """
+        Downloads the captions of one video of the playlist. Runs on a worker of the
+        pool. Returns the file, or None if the video has none of the languages.
+        """
+        # the caption tracks come with the video's metadata, which is often cached already
+        video = load_video_info(
+            video_id, self.cache, playlist_id=self.playlist_id, captions_only=True
+        )
+        caption = pick_caption(video.captions, self.languages)
+        if caption is None:
+            return None
+        return self._save(video, caption)
+
+    def _save(self, video: VideoInfo, caption: Caption) -> str:
+        self.on_status(f"Downloading: {video.title} ({caption.code} captions)")
+        with stage("captions") as timer:
+            # converted while it downloads
+            file_path = download_caption(
+                caption, video.title, self.download_location, self.caption_format
+            )
+            timer.bytes = os.path.getsize(file_path)
+        return file_path
@@ -0,0 +1,354 @@
+"""
+Video and playlist metadata, served from engine.cache when possible.
+
+A VideoInfo holds what the downloaders need from a video's watch page and player
+response: the title, the stream manifest with deciphered URLs and the caption tracks.
+Building one from the cache skips the watch page, the player response and the player
+JS entirely. Otherwise the stream URLs are deciphered with the plan engine.decipher
+keeps for the video's player, so the player JS is only parsed once per player version. Playlists are cached as their title plus the IDs of their videos.
+
+Captions only need the caption tracks of the player response, so VideoInfos loaded for
+captions skip the player JS and keep using cached entries whose stream URLs expired.
+"""
+
+import re
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from pytube import (Caption, CaptionQuery, Playlist, Stream, StreamQuery,
+                    YouTube, extract, request)
+from pytube.exceptions import RegexMatchError
+from pytube.monostate import Monostate
+
+from .cache import MetadataCache
+from .decipher import decipher_manifest, default_plans
+from .metrics import stage
+from .playlist import (channel_path, iter_video_ids, select_range,
+                       uploads_playlist_id)
+
+URL_MARGIN: float = 15 * 60  # seconds a cached stream URL must stay valid for to be used
+# where a channel's page mentions the channel ID
+CHANNEL_ID_PATTERNS = [
+    r'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[\w-]{22})"',
+    r'"externalId":"(UC[\w-]{22})"',
+    r'"channelId":"(UC[\w-]{22})"',
+]
+
+
+class VideoInfo:
+    """What a download needs to know about one video"""
+
+    def __init__(
+        self,
+        video_id: str,
+        title: str,
+        length: int,
+        manifest: List[Dict[str, Any]],
+        caption_tracks: List[Dict[str, Any]],
+        playlists: List[str],
+    ):
+        self.video_id: str = video_id
+        self.title: str = title
+        self.length: int = length  # seconds
+        self.manifest: List[Dict[str, Any]] = manifest  # raw stream formats, URLs deciphered. empty if only loaded for captions
+        self.caption_tracks: List[Dict[str, Any]] = caption_tracks  # raw caption tracks
+        self.playlists: List[str] = playlists  # IDs of the playlists it was downloaded from
+        self._monostate = Monostate(None, None, title=title, duration=length)
+        self._streams: Optional[StreamQuery] = None
+
+    @property
+    def streams(self) -> StreamQuery:
+        """Same as YouTube.streams"""
+        if self._streams is None:
+            self._streams = StreamQuery(
+                [Stream(fmt, self._monostate) for fmt in self.manifest]
+            )
+        return self._streams
+
+    @property
+    def captions(self) -> CaptionQuery:
+        """Same as YouTube.captions"""
+        return CaptionQuery([Caption(track) for track in self.caption_tracks])
+
+    @property
+    def expires_at(self) -> float:
+        """When the first of the stream URLs stops working (epoch seconds)"""
+        if not self.manifest:
+            return 0.0  # the streams were never loaded
+        return _expiry(fmt.get("url") for fmt in self.manifest)
+
+    @property
+    def captions_expire_at(self) -> float:
+        """When the first of the caption track URLs stops working (epoch seconds)"""
+        return _expiry(track.get("baseUrl") for track in self.caption_tracks)
+
+    @classmethod
+    def from_youtube(
+        cls,
+        video: YouTube,
+        streams: bool = True,
+        cache: Optional[MetadataCache] = None,
+    ) -> "VideoInfo":
+        """
+        Fetches everything from YouTube. This is the expensive path. Without streams,
+        the player JS isn't needed and the manifest is left empty. cache is where the
+        parsed player JS is kept across runs.
+        """
+        with stage("page"):
+            video.check_availability()  # the watch page
+            video.vid_info  # the player response
+        manifest = []
+        if streams:
+            with stage("player_js"):
+                js_url = video.js_url
+                plan = default_plans().get(js_url, cache)
+            with stage("decipher"):
+                # formats and adaptiveFormats, with the URLs still scrambled
+                manifest = extract.apply_descrambler(video.streaming_data) or []
+                manifest = decipher_manifest(
+                    manifest, video.vid_info, plan, js_url, cache
+                )
+        caption_tracks = (
+            video.vid_info.get("captions", {})
+            .get("playerCaptionsTracklistRenderer", {})
+            .get("captionTracks", [])
+        )
+        return cls(
+            video.video_id, video.title, video.length, manifest, caption_tracks, []
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "video_id": self.video_id,
+            "title": self.title,
+            "length": self.length,
+            "manifest": self.manifest,
+            "caption_tracks": self.caption_tracks,
+            "playlists": self.playlists,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VideoInfo":
+        return cls(
+            data["video_id"],
+            data["title"],
+            data["length"],
+            data["manifest"],
+            data["caption_tracks"],
+            data["playlists"],
+        )
+
+
+def _expiry(urls: Iterable[Optional[str]]) -> float:
+    """When the first of urls stops working, from their expire parameter (epoch seconds)"""
+    expiries = [
+        float(parse_qs(urlparse(url).query).get("expire", ["inf"])[0])
+        for url in urls
+        if url
+    ]
+    return min(expiries, default=float("inf"))
+
+
+def load_video_info(
+    url: str,
+    cache: Optional[MetadataCache] = None,
+    playlist_id: Optional[str] = None,
+    bypass_age_gate: bool = False,
+    refresh: bool = False,
+    captions_only: bool = False,
+) -> VideoInfo:
+    """
+    Returns the VideoInfo for a video URL (or bare video ID), from the cache if it has a
+    fresh entry and refresh is False. playlist_id is recorded as a playlist the video
+    belongs to. With captions_only, only the caption tracks have to be usable: a cached
+    entry counts as fresh while its caption URLs are, and a video that isn't cached is
+    loaded without its streams.
+
+    Raises RegexMatchError for something that isn't a video URL, like YouTube(url).
+    """
+    video_id: str = url if len(url) == 11 else extract.video_id(url)
+    key = f"video:{video_id}"
+
+    info: Optional[VideoInfo] = None
+    if cache is not None and not refresh:
+        entry = cache.get(key)
+        if entry is not None:
+            info = VideoInfo.from_dict(entry)
+            expires_at = (
+                info.captions_expire_at if captions_only else info.expires_at
+            )
+            if expires_at < time.time() + URL_MARGIN:
+                info = None  # the URLs are about to stop working
+    changed = info is None
+    if info is None:
+        video = YouTube.from_id(video_id)
+        if bypass_age_gate:
+            video.bypass_age_gate()
+        info = VideoInfo.from_youtube(video, streams=not captions_only, cache=cache)
+
+    if playlist_id is not None and playlist_id not in info.playlists:
+        info.playlists.append(playlist_id)
+        changed = True
+    if cache is not None and changed:
+        cache.put(key, info.to_dict())
+    return info
+
+
+def cached_video_infos(
+    video_ids: List[str], cache: MetadataCache
+) -> Dict[str, VideoInfo]:
+    """The VideoInfos the cache has of video_ids, by ID, whether their URLs expired or not"""
+    entries = cache.get_many([f"video:{video_id}" for video_id in video_ids])
+    return {
+        entry["video_id"]: VideoInfo.from_dict(entry) for entry in entries.values()
+    }
+
+
+def load_channel_id(url: str, cache: Optional[MetadataCache] = None) -> str:
+    """
+    Returns the ID of the channel at a channel URL (see playlist.channel_path). Handles,
+    /c/ and /user/ URLs cost a request for the channel page the first time only.
+
+    Raises RegexMatchError if the page doesn't mention the channel's ID.
+    """
+    path = channel_path(url)
+    if path is None:
+        raise RegexMatchError("load_channel_id", "channel URL")
+    if path.startswith("/channel/"):
+        return path.split("/")[2]
+    key = f"channel:{path.lower()}"  # handles aren't case sensitive
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None:
+        return entry["channel_id"]
+
+    with stage("playlist"):
+        html = request.get("https://www.youtube.com" + path)
+    for pattern in CHANNEL_ID_PATTERNS:
+        match = re.search(pattern, html)
+        if match:
+            break
+    else:
+        raise RegexMatchError("load_channel_id", CHANNEL_ID_PATTERNS[-1])
+    if cache is not None:
+        cache.put(key, {"channel_id": match.group(1)})
+    return match.group(1)
+
+
+def cached_playlist_range(
+    url: str, start_index: int, stop_index: int, cache: MetadataCache
+) -> Optional[Tuple[str, List[str]]]:
+    """
+    The title of a playlist (or channel) and the IDs of the videos from start_index to
+    stop_index, if the cache has all of them. None otherwise. Never fetches anything.
+    """
+    path = channel_path(url)
+    if path is not None:
+        if path.startswith("/channel/"):
+            channel_id = path.split("/")[2]
+        else:
+            entry = cache.get(f"channel:{path.lower()}")
+            if entry is None:
+                return None
+            channel_id = entry["channel_id"]
+        playlist_id = uploads_playlist_id(channel_id)
+    else:
+        try:
+            playlist_id = extract.playlist_id(url)
+        except KeyError:  # no list parameter
+            return None
+    entry = cache.get(f"playlist:{playlist_id}")
+    stop = stop_index if stop_index > 0 else None
+    if entry is None or not (
+        entry["complete"] or (stop is not None and len(entry["video_ids"]) >= stop)
+    ):
+        return None
+    start = start_index - 1 if start_index > 0 else 0
+    return entry["title"], entry["video_ids"][start:stop]
+
+
+def load_playlist_range(
+    url: str,
+    start_index: int,
+    stop_index: int,
+    cache: Optional[MetadataCache] = None,
+) -> Tuple[str, str, List[str]]:
+    """
+    Returns the playlist's ID, title and the IDs of the videos from start_index to
+    stop_index (see playlist.select_range). A channel URL stands for the playlist of
+    the channel's uploads.
+
+    The cache remembers the IDs walked so far, so a later run over the same or an
+    earlier range doesn't page through the playlist again.
+    """
+    playlist_id, title, video_ids = open_playlist_range(
+        url, start_index, stop_index, cache
+    )
+    return playlist_id, title, list(video_ids)
+
+
+def open_playlist_range(
+    url: str,
+    start_index: int,
+    stop_index: int,
+    cache: Optional[MetadataCache] = None,
+) -> Tuple[str, str, Iterator[str]]:
+    """
+    Same as load_playlist_range, except that only the first page is fetched before
+    returning. The IDs are an iterator that walks the rest of the pages as it is
+    consumed, and raises ValueError at the end if the playlist is shorter than the range.
+    """
+    if channel_path(url) is not None:
+        url = "https://www.youtube.com/playlist?list=" + uploads_playlist_id(
+            load_channel_id(url, cache)
+        )
+    playlist = Playlist(url)
+    key = f"playlist:{playlist.playlist_id}"
+    stop = stop_index if stop_index > 0 else None
+
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and (
+        entry["complete"] or (stop is not None and len(entry["video_ids"]) >= stop)
+    ):
+        return playlist.playlist_id, entry["title"], iter(
+            select_range(entry["video_ids"], start_index, stop_index)
+        )
+
+    with stage("playlist"):
+        title = playlist.title  # the first page
+    return playlist.playlist_id, title, _walk_range(
+        playlist, title, start_index, stop_index, cache
+    )
+
+
+def _walk_range(
+    playlist: Playlist,
+    title: str,
+    start_index: int,
+    stop_index: int,
+    cache: Optional[MetadataCache],
+) -> Iterator[str]:
+    """Yields the IDs of the range while paging through the playlist, then caches all IDs walked"""
+    start = start_index - 1 if start_index > 0 else 0
+    stop = stop_index if stop_index > 0 else None
+    video_ids: List[str] = []
+    with stage("playlist"):
+        for video_id in islice(iter_video_ids(playlist), stop):
+            video_ids.append(video_id)
+            if len(video_ids) > start:
+                yield video_id
+    if cache is not None:
+        cache.put(
+            f"playlist:{playlist.playlist_id}",
+            {
+                "title": title,
+                "video_ids": video_ids,
+                # fewer videos than asked for means the walk reached the end
+                "complete": stop is None or len(video_ids) < stop,
+            },
+        )
+    if (stop is not None and len(video_ids) < stop) or (
+        start_index > 0 and len(video_ids) <= start
+    ):
+        raise ValueError("Start or stop value is too large")
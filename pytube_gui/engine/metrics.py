@@ -0,0 +1,207 @@
+"""
+Where the time of a download goes.
+
+Every stage of a job (fetching pages, the player JS, deciphering, transferring the
+stream, converting, ...) is timed with stage() and recorded in a Metrics registry
+as a histogram of durations plus a byte counter and an error counter. Histograms
+have fixed buckets, so a registry stays the same size however many videos it
+has seen.
+
+The stages are: playlist (walking the playlist pages), page (the watch page and player
+response), player_js, decipher (the stream URLs), select (picking streams), transfer
+(one stream), convert (to MP3, or renaming to the real format), mux (adaptive video
+and audio), folder (a playlist's folder and index), captions, and video_job,
+playlist_job and captions_job for whole jobs.
+
+At the end of a run the registry is exported as a Prometheus text file and a JSON
+summary (export()).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# upper bounds of the histogram buckets, in seconds
+BUCKETS: List[float] = [
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300,
+]  # fmt: skip
+PREFIX: str = "pytube_gui"
+PROMETHEUS_FILE: str = "metrics.prom"
+JSON_FILE: str = "metrics.json"
+
+
+class Histogram:
+    """Durations counted into fixed buckets, plus their count, sum, minimum and maximum"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets: List[float] = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.min: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value) if self.count > 1 else value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimate of the fraction quantile, interpolated within its bucket"""
+        if self.count == 0:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                # no value lies outside of min..max, whatever the bucket bounds
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+
+class StageTimer:
+    """What stage() hands out. Add the bytes the stage moved to `bytes`."""
+
+    def __init__(self):
+        self.bytes: int = 0
+
+
+class Metrics:
+    """Thread safe registry of per-stage durations, bytes and errors"""
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets: List[float] = buckets or BUCKETS
+        self.started: float = time.time()  # epoch seconds
+        self._histograms: Dict[str, Histogram] = {}
+        self._bytes: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self, stage: str, seconds: float, byte_count: int = 0, failed: bool = False
+    ):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._bytes[stage] = self._bytes.get(stage, 0) + byte_count
+            if failed:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[StageTimer]:
+        """Times the with block as one run of stage, counting it as an error if it raises."""
+        timer = StageTimer()
+        began = time.perf_counter()
+        failed = True
+        try:
+            yield timer
+            failed = False
+        finally:
+            self.observe(stage, time.perf_counter() - began, timer.bytes, failed)
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._histograms = {}
+            self._bytes = {}
+            self._errors = {}
+
+    def summary(self) -> Dict[str, Any]:
+        """Per stage: count, errors, bytes and seconds (total, mean, p50, p95, max)"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                stages[stage] = {
+                    "count": histogram.count,
+                    "errors": self._errors.get(stage, 0),
+                    "bytes": self._bytes.get(stage, 0),
+                    "seconds": {
+                        "total": round(histogram.sum, 6),
+                        "mean": round(histogram.sum / histogram.count, 6),
+                        "p50": round(histogram.quantile(0.5), 6),
+                        "p95": round(histogram.quantile(0.95), 6),
+                        "max": round(histogram.max, 6),
+                    },
+                }
+            return {"started": self.started, "stages": stages}
+
+    def to_prometheus(self) -> str:
+        """The registry in Prometheus' text exposition format"""
+        name = f"{PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage of a download.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                bounds = [_format(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{stage="{stage}"}} {_format(histogram.sum)}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for metric, help_text, values in (
+                ("stage_bytes_total", "Bytes moved by each stage.", self._bytes),
+                ("stage_errors_total", "Runs of each stage that failed.", self._errors),
+            ):
+                lines.append(f"# HELP {PREFIX}_{metric} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{metric} counter")
+                for stage in sorted(self._histograms):
+                    lines.append(
+                        f'{PREFIX}_{metric}{{stage="{stage}"}} {values.get(stage, 0)}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def export(self, folder: str) -> List[str]:
+        """Writes PROMETHEUS_FILE and JSON_FILE into folder. Returns their paths."""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for file_name, content in (
+            (PROMETHEUS_FILE, self.to_prometheus()),
+            (JSON_FILE, json.dumps(self.summary(), indent=2)),
+        ):
+            path = os.path.join(folder, file_name)
+            with open(path + ".tmp", "w") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)  # never leave a half-written file behind
+            paths.append(path)
+        return paths
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+_default_metrics: Optional[Metrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def default_metrics() -> Metrics:
+    """The registry shared by every download of this process"""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
+
+
+def stage(name: str):
+    """Times a stage into the default registry, see Metrics.time"""
+    return default_metrics().time(name)
@@ -0,0 +1,10 @@
+"""Where the application keeps its own files (queue, caches, ...)."""
+
+import os
+
+
+def data_dir() -> str:
+    """Returns ~/.pytube-gui, creating it if needed."""
+    path = os.path.join(os.path.expanduser("~"), ".pytube-gui")
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,79 @@
+"""
+Lazy enumeration of the videos in a playlist.
+
+pytube's Playlist.videos builds every entry of the playlist before any of them can be
+used. The helpers here walk the playlist one continuation page at a time and stop as
+soon as the requested range has been seen.
+
+Channels are downloaded as the playlist of their uploads, which every channel has.
+"""
+
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from pytube import Playlist, extract
+
+# /channel/UC..., /@handle, /c/name or /user/name, optionally followed by a tab like /videos
+CHANNEL_PATH = re.compile(r"^/(channel/UC[\w-]{22}|@[^/]+|c/[^/]+|user/[^/]+)(/|$)")
+
+
+def channel_path(url: str) -> Optional[str]:
+    """The path identifying the channel of a channel URL, e.g. "/@name". None for other URLs."""
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    if not parsed.netloc.endswith("youtube.com"):
+        return None
+    match = CHANNEL_PATH.match(parsed.path)
+    return "/" + match.group(1) if match else None
+
+
+def is_playlist_url(url: str) -> bool:
+    """
+    Whether url is a playlist or a channel. A watch URL with a list parameter is a
+    video of the playlist, so it doesn't count.
+    """
+    parsed = urlparse(url)
+    if parsed.path.rstrip("/") == "/playlist" and "list" in parse_qs(parsed.query):
+        return True
+    return channel_path(url) is not None
+
+
+def uploads_playlist_id(channel_id: str) -> str:
+    """The ID of the playlist of a channel's uploads: its own ID starting with UU instead of UC"""
+    return "UU" + channel_id[2:]
+
+
+def iter_video_ids(playlist: Playlist) -> Iterator[str]:
+    """Yields the ID of every video in the playlist, fetching continuation pages on demand."""
+    for url in playlist.url_generator():
+        yield extract.video_id(url)
+
+
+def select_range(video_ids: Iterable[str], start_index: int, stop_index: int) -> List[str]:
+    """
+    Returns the IDs from start_index to stop_index (1-indexed, inclusive).
+
+    An index below 1 means "from the first video" or "to the last video" respectively.
+    video_ids is only consumed up to stop_index.
+
+    Raises ValueError if there are fewer videos than the requested range.
+    """
+    # playlist on youtube is 1-indexed, islice is 0-indexed
+    start: int = start_index - 1 if start_index > 0 else 0
+    stop = stop_index if stop_index > 0 else None
+    selected: List[str] = list(islice(video_ids, start, stop))
+
+    if (stop is not None and len(selected) < stop - start) or (
+        start_index > 0 and not selected
+    ):
+        raise ValueError("Start or stop value is too large")
+    return selected
+
+
+def select_video_ids(playlist: Playlist, start_index: int, stop_index: int) -> List[str]:
+    """
+    Returns the IDs of the playlist's videos from start_index to stop_index.
+    Pages past stop_index are never requested. See select_range.
+    """
+    return select_range(iter_video_ids(playlist), start_index, stop_index)
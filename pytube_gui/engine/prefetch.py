@@ -0,0 +1,143 @@
+"""
+Walking a playlist and loading the metadata of its videos ahead of the downloads.
+
+Before a video of a playlist can be downloaded, its watch page and player response
+have to be fetched (engine.metadata), and before that, the playlist page listing it.
+Done by the workers themselves, the network sits idle between one video's transfer and
+the next one's. A Prefetcher does both in the background instead: one thread pages
+through the playlist as fast as YouTube answers, and the metadata of the next few
+videos is loaded while the current ones transfer. The lookahead bounds how many
+videos are loaded but not taken by a worker yet, so a long playlist doesn't load
+metadata (whose stream URLs expire) for videos that won't be downloaded for hours.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from .metadata import VideoInfo
+
+DEFAULT_LOOKAHEAD: int = 3  # videos loaded ahead of the workers
+
+
+class Prefetcher:
+    """
+    Walks video_ids (usually lazy, see metadata.open_playlist_range) on a thread of its
+    own and loads up to lookahead of the videos that skip() doesn't rule out ahead of
+    the workers. A lookahead of 0 only walks the playlist.
+    """
+
+    def __init__(
+        self,
+        video_ids: Iterable[str],
+        load: Callable[[str], VideoInfo],
+        lookahead: int = DEFAULT_LOOKAHEAD,
+        skip: Callable[[str], bool] = lambda video_id: False,
+    ):
+        self.video_ids: List[str] = []  # found so far, in playlist order
+        self.complete: bool = False  # whether the walk is over
+        self.lookahead: int = max(0, lookahead)
+        self._source: Iterable[str] = video_ids
+        self._load: Callable[[str], VideoInfo] = load
+        self._skip: Callable[[str], bool] = skip
+        self._loads: Dict[str, "Future[VideoInfo]"] = {}  # loaded ahead, not taken yet
+        self._taken: Set[str] = set()  # taken before they were loaded ahead
+        self._update: Future = Future()  # resolved when more IDs are found
+        self._closed: bool = False
+        self._changed = threading.Condition()
+        self._slots = threading.Semaphore(self.lookahead)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, self.lookahead), thread_name_prefix="prefetch"
+        )
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._walk, name="prefetch-walk", daemon=True)
+        ]
+        if self.lookahead > 0:
+            self._threads.append(
+                threading.Thread(target=self._load_ahead, name="prefetch", daemon=True)
+            )
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def found(self, start: int = 0) -> Tuple[List[str], bool, Future]:
+        """
+        The IDs found so far from position start on, whether that's all of them, and a
+        Future that is resolved once more are found or the walk is over. Once the walk
+        is over, the Future's result() re-raises anything that went wrong walking.
+        """
+        with self._changed:
+            return self.video_ids[start:], self.complete, self._update
+
+    def take(self, video_id: str) -> VideoInfo:
+        """The VideoInfo of video_id, loaded ahead if it was and loaded now otherwise"""
+        with self._changed:
+            future = self._loads.pop(video_id, None)
+            if future is None:
+                self._taken.add(video_id)  # too late to load it ahead
+        if future is None:
+            return self._load(video_id)
+        self._slots.release()  # the window moves on
+        if future.cancel():  # not started yet, so the worker loads it itself
+            return self._load(video_id)
+        return future.result()
+
+    def close(self):
+        """Stops walking and loading. Videos being loaded are finished, but not waited for."""
+        with self._changed:
+            self._closed = True
+            loads = list(self._loads.values())
+            self._loads.clear()
+            self._changed.notify_all()
+        for future in loads:
+            future.cancel()
+        self._slots.release()  # in case the loading thread waits for a slot
+        self._pool.shutdown(wait=False)
+
+    def _walk(self):
+        try:
+            for video_id in self._source:
+                with self._changed:
+                    if self._closed:
+                        return
+                    self.video_ids.append(video_id)
+                    self._changed.notify_all()
+                    self._update.set_result(None)
+                    self._update = Future()
+            error = None
+        except BaseException as e:  # handed to whoever waits for more IDs
+            error = e
+        with self._changed:
+            self.complete = True
+            self._changed.notify_all()
+            if error is None:
+                self._update.set_result(None)
+            else:
+                self._update.set_exception(error)
+
+    def _load_ahead(self):
+        position = 0
+        while True:
+            with self._changed:
+                while (
+                    position >= len(self.video_ids)
+                    and not self.complete
+                    and not self._closed
+                ):
+                    self._changed.wait()
+                if self._closed or position >= len(self.video_ids):
+                    return
+                video_id = self.video_ids[position]
+            position += 1
+            if self._skip(video_id):
+                continue
+            self._slots.acquire()
+            with self._changed:
+                if self._closed:
+                    return
+                if video_id in self._taken:
+                    self._taken.discard(video_id)  # only ever comes up once
+                    self._slots.release()
+                    continue
+                self._loads[video_id] = self._pool.submit(self._load, video_id)
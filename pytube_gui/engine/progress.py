@@ -0,0 +1,120 @@
+"""
+Byte-level download progress.
+
+A download receives a chunk every few kilobytes. Forwarding each one to the form would
+flood the Qt event loop with cross-thread signals, so a ProgressThrottle sits in between:
+it counts every byte but only passes a snapshot on a few times per second.
+"""
+
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+MAX_UPDATES_PER_SECOND: float = 10.0
+SPEED_SMOOTHING: float = 0.3  # weight of the newest sample in the moving average
+
+
+class TransferProgress(NamedTuple):
+    """Snapshot of a running download"""
+
+    bytes_done: int
+    bytes_total: int  # 0 if not known
+    speed: float  # bytes per second
+    eta: Optional[float]  # seconds left, None if not known
+
+    @property
+    def fraction(self) -> float:
+        if self.bytes_total <= 0:
+            return 0.0
+        return min(self.bytes_done / self.bytes_total, 1.0)
+
+
+class ProgressThrottle:
+    """
+    Counts downloaded bytes and calls `callback` with a TransferProgress
+    at most `max_rate` times per second, plus once more when finished.
+
+    Safe to share between several threads downloading parts of the same job.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[TransferProgress], Any],
+        bytes_total: int = 0,
+        max_rate: float = MAX_UPDATES_PER_SECOND,
+    ):
+        self.callback: Callable[[TransferProgress], Any] = callback
+        self.bytes_total: int = bytes_total
+        self.bytes_done: int = 0
+        self.speed: float = 0.0
+        self._interval: float = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._last_time: float = time.monotonic()
+        self._last_bytes: int = 0
+
+    def add(self, byte_count: int):
+        """Records byte_count more bytes as downloaded."""
+        with self._lock:
+            self.bytes_done += byte_count
+            snapshot = self._snapshot(force=False)
+        if snapshot is not None:
+            self.callback(snapshot)
+
+    def add_resumed(self, byte_count: int):
+        """Records bytes left over from an earlier attempt. They don't count towards the speed."""
+        with self._lock:
+            self.bytes_done += byte_count
+            self._last_bytes += byte_count
+
+    def add_total(self, byte_count: int):
+        """Grows the expected size, e.g. when another video of a playlist starts."""
+        with self._lock:
+            self.bytes_total += byte_count
+
+    def finish(self):
+        """Sends the final state regardless of when the last update went out."""
+        with self._lock:
+            snapshot = self._snapshot(force=True)
+        self.callback(snapshot)
+
+    def on_pytube_progress(self, stream: Any, chunk: bytes, bytes_remaining: int):
+        """Adapter for YouTube.register_on_progress_callback"""
+        self.add(len(chunk))
+
+    def _snapshot(self, force: bool) -> Optional[TransferProgress]:
+        """Returns a TransferProgress if one is due. Must hold self._lock."""
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if not force and elapsed < self._interval:
+            return None
+
+        if elapsed > 0:
+            sample = (self.bytes_done - self._last_bytes) / elapsed
+            self.speed = (
+                sample
+                if self.speed == 0
+                else SPEED_SMOOTHING * sample + (1 - SPEED_SMOOTHING) * self.speed
+            )
+        self._last_time = now
+        self._last_bytes = self.bytes_done
+
+        eta: Optional[float] = None
+        if self.bytes_total > 0 and self.speed > 0:
+            eta = max(self.bytes_total - self.bytes_done, 0) / self.speed
+        return TransferProgress(self.bytes_done, self.bytes_total, self.speed, eta)
+
+
+def describe(progress: TransferProgress) -> str:
+    """Human readable speed and time left, e.g. '3.2 MB/s, 1:05 left'"""
+    speed = progress.speed
+    for unit in ("B/s", "KB/s", "MB/s", "GB/s"):
+        if speed < 1024 or unit == "GB/s":
+            break
+        speed /= 1024
+    text = f"{speed:.1f} {unit}"
+    if progress.eta is not None:
+        minutes, seconds = divmod(int(progress.eta), 60)
+        hours, minutes = divmod(minutes, 60)
+        left = f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+        text += f", {left} left"
+    return text
@@ -0,0 +1,234 @@
+"""
+Persistent download queue.
+
+Jobs are rows of a small SQLite database, so whatever is queued survives closing the
+application. Jobs that were running when the application stopped are put back in line
+the next time the queue is opened, and resume thanks to engine.transfer.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Tuple)
+
+from .paths import data_dir
+
+# job kinds
+VIDEO: str = "video"
+PLAYLIST: str = "playlist"
+CAPTIONS: str = "captions"
+
+# job states
+PENDING: str = "pending"
+RUNNING: str = "running"
+DONE: str = "done"
+FAILED: str = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    download_location TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    message TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+-- in the order claim_next hands jobs out, so it never has to sort them
+CREATE INDEX IF NOT EXISTS jobs_in_line ON jobs (state, priority DESC, id);
+DROP INDEX IF EXISTS jobs_by_state;
+"""
+
+CLAIM_PAGE: int = 20  # pending jobs claim_next reads at a time
+
+
+class Job(NamedTuple):
+    """One row of the queue"""
+
+    id: int
+    kind: str  # VIDEO, PLAYLIST or CAPTIONS
+    url: str
+    download_location: str
+    options: Dict[str, Any]  # keyword arguments for the downloader, e.g. audio_only
+    priority: int  # higher runs first
+    state: str  # PENDING, RUNNING, DONE or FAILED
+    message: str  # why a job failed
+    created_at: float
+
+
+def default_queue_path() -> str:
+    return os.path.join(data_dir(), "queue.sqlite3")
+
+
+class JobQueue:
+    """
+    Thread safe access to the queue database.
+
+    The scheduler decides when to run jobs. This class only stores them and hands out
+    the next one in line: highest priority first, oldest first among equals.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or default_queue_path()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+            # anything still running was cut off when the application closed
+            self._db.execute(
+                "UPDATE jobs SET state = ? WHERE state = ?", (PENDING, RUNNING)
+            )
+
+    def enqueue(
+        self,
+        kind: str,
+        url: str,
+        download_location: str,
+        options: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+    ) -> int:
+        """Adds a job and returns its ID."""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (kind, url, download_location, options, priority, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    url,
+                    download_location,
+                    json.dumps(options or {}),
+                    priority,
+                    time.time(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def enqueue_many(
+        self, jobs: Iterable[Tuple[str, str, str, Optional[Dict[str, Any]], int]]
+    ):
+        """Adds (kind, url, download_location, options, priority) jobs in one transaction."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO jobs (kind, url, download_location, options, priority, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (kind, url, location, json.dumps(options or {}), priority, now)
+                    for kind, url, location, options, priority in jobs
+                ),
+            )
+
+    def claim_next(self, admit: Optional[Callable[[Job], bool]] = None) -> Optional[Job]:
+        """
+        Marks the next pending job as running and returns it, None if there is none.
+        With admit, jobs it turns down are passed over and stay pending.
+        """
+        after: Optional[Tuple[int, int]] = None  # (priority, id) of the last job read
+        while True:
+            rows = self._pending(after)
+            for row in rows:
+                job = _to_job(row)
+                if admit is not None and not admit(job):
+                    continue
+                with self._lock, self._db:
+                    claimed = self._db.execute(
+                        "UPDATE jobs SET state = ? WHERE id = ? AND state = ?",
+                        (RUNNING, job.id, PENDING),
+                    ).rowcount
+                if claimed:
+                    return job._replace(state=RUNNING)
+            if len(rows) < CLAIM_PAGE:
+                return None
+            last = _to_job(rows[-1])
+            after = (last.priority, last.id)
+
+    def _pending(self, after: Optional[Tuple[int, int]]) -> List[tuple]:
+        """
+        The next CLAIM_PAGE pending rows in line after the job of (priority, id), from
+        the first one without. Each query is a range of jobs_in_line.
+        """
+        with self._lock:
+            if after is None:
+                return self._db.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY priority DESC, id LIMIT ?",
+                    (PENDING, CLAIM_PAGE),
+                ).fetchall()
+            priority, job_id = after
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE state = ? AND priority = ? AND id > ?"
+                " ORDER BY id LIMIT ?",
+                (PENDING, priority, job_id, CLAIM_PAGE),
+            ).fetchall()
+            if len(rows) < CLAIM_PAGE:
+                rows += self._db.execute(
+                    "SELECT * FROM jobs WHERE state = ? AND priority < ?"
+                    " ORDER BY priority DESC, id LIMIT ?",
+                    (PENDING, priority, CLAIM_PAGE - len(rows)),
+                ).fetchall()
+            return rows
+
+    def mark(self, job_id: int, state: str, message: str = ""):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, message = ? WHERE id = ?",
+                (state, message, job_id),
+            )
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _to_job(row) if row is not None else None
+
+    def jobs(self) -> List[Job]:
+        """Every job, in the order they'll run (finished ones last)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs ORDER BY state IN (?, ?), priority DESC, id",
+                (DONE, FAILED),
+            ).fetchall()
+        return [_to_job(row) for row in rows]
+
+    def listing(self) -> List[Tuple[int, str, str, int, str, str]]:
+        """
+        (id, kind, url, priority, state, message) of every job, in no particular order.
+        Leaves out the options, which makes it cheap enough to call on every change.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, kind, url, priority, state, message FROM jobs"
+            ).fetchall()
+
+    def urls(self, download_location: str) -> List[Tuple[str, str]]:
+        """(kind, url) of the jobs downloading into download_location, except failed ones"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, url FROM jobs WHERE download_location = ? AND state != ?",
+                (download_location, FAILED),
+            ).fetchall()
+        return [(kind, url) for kind, url in rows]
+
+    def count(self, state: str) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)
+            ).fetchone()[0]
+
+    def clear_finished(self):
+        """Forgets jobs that are done or failed."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE state IN (?, ?)", (DONE, FAILED))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _to_job(row: tuple) -> Job:
+    values = list(row)
+    values[4] = json.loads(values[4])  # options
+    return Job(*values)
@@ -0,0 +1,85 @@
+"""
+Bandwidth limits.
+
+A TokenBucket refills at `rate` bytes per second. Every chunk a download reads takes
+its size out of the bucket, and the download waits whenever the bucket is in debt, so
+everything drawing from one bucket shares its rate. There is one global bucket for the
+whole process plus one per job; a chunk has to get through both (RateLimiter).
+
+Rates can be changed at any time. Waiting downloads pick up the new rate within
+MAX_WAIT seconds.
+"""
+
+import threading
+import time
+from typing import List, Optional
+
+BURST_SECONDS: float = 0.5  # how much unused rate a bucket saves up
+MAX_WAIT: float = 0.25  # seconds slept at a time, so rate changes apply quickly
+
+
+class TokenBucket:
+    """Thread safe token bucket. A rate of 0 means unlimited."""
+
+    def __init__(self, rate: float = 0.0):
+        self.rate: float = max(rate, 0.0)  # bytes per second
+        self._tokens: float = 0.0  # negative when in debt
+        self._last_time: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self.rate = max(rate, 0.0)
+            if self.rate == 0:
+                self._tokens = 0.0  # nothing owed once unlimited
+
+    def consume(self, byte_count: int):
+        """Takes byte_count bytes out of the bucket, waiting until the debt is paid off."""
+        with self._lock:
+            if self.rate == 0:
+                return
+            self._refill()
+            self._tokens -= byte_count
+        while True:
+            with self._lock:
+                if self.rate == 0:
+                    return
+                self._refill()
+                if self._tokens >= 0:
+                    return
+                wait = -self._tokens / self.rate
+            time.sleep(min(wait, MAX_WAIT))
+
+    def _refill(self):
+        """Must hold self._lock."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._last_time) * self.rate,
+            self.rate * BURST_SECONDS,
+        )
+        self._last_time = now
+
+
+class RateLimiter:
+    """The buckets one download draws from, e.g. the global one and its job's"""
+
+    def __init__(self, buckets: List[TokenBucket]):
+        self.buckets: List[TokenBucket] = buckets
+
+    def consume(self, byte_count: int):
+        for bucket in self.buckets:
+            bucket.consume(byte_count)
+
+
+_global_bucket: Optional[TokenBucket] = None
+_global_bucket_lock = threading.Lock()
+
+
+def global_bucket() -> TokenBucket:
+    """The bucket shared by every download of this process"""
+    global _global_bucket
+    with _global_bucket_lock:
+        if _global_bucket is None:
+            _global_bucket = TokenBucket()
+        return _global_bucket
@@ -0,0 +1,35 @@
+"""
+Compact records of the videos of a playlist job.
+
+A playlist job keeps one VideoRecord per video of its range for as long as it runs.
+The heavy objects of a video, its VideoInfo (player response, stream manifest) and
+the Futures of its download and conversion, only exist while a worker downloads it
+or ffmpeg converts it, and are let go as soon as it's done. The record is all that
+is left of it, so a playlist of thousands of videos takes little more memory than
+one of ten.
+"""
+
+from typing import Optional
+
+# states of a video
+PENDING: str = "pending"  # found, waiting for a worker
+DOWNLOADING: str = "downloading"
+CONVERTING: str = "converting"  # downloaded, being converted or muxed
+DONE: str = "done"
+SKIPPED: str = "skipped"  # downloaded by an earlier run
+
+
+class VideoRecord:
+    """What a playlist job keeps of one video"""
+
+    __slots__ = ("video_id", "title", "itag", "size", "state")
+
+    def __init__(self, video_id: str):
+        self.video_id: str = video_id
+        self.title: Optional[str] = None  # once a worker has loaded it
+        self.itag: Optional[int] = None  # of the (video) stream picked
+        self.size: int = 0  # bytes of the streams picked
+        self.state: str = PENDING
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({self.video_id!r}, {self.state})"
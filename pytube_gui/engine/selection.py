@@ -0,0 +1,190 @@
+"""
+Which streams of a video get downloaded.
+
+Without a policy, a video is downloaded like it always was: the first audio stream, or
+the highest resolution progressive stream. A StreamPolicy narrows the manifest down to
+what it allows (resolution, bitrate, size, audio quality) and ranks what's left by
+its preferences, either best first or, for bulk archiving, smallest first.
+
+Policy decisions are remembered per video in the metadata cache, so downloading a
+video again with the same policy doesn't evaluate the manifest again.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from pytube import Stream, StreamQuery
+from pytube.exceptions import PytubeError
+
+from .cache import MetadataCache
+from .metadata import VideoInfo
+
+MB: int = 1024 * 1024
+
+
+class NoAcceptableStream(PytubeError):
+    """No stream of the video satisfies the policy"""
+
+
+class StreamPolicy(NamedTuple):
+    """
+    Limits and preferences for picking streams. 0 or "" means no limit/preference.
+
+    Limits rule streams out, preferences only change the order of the rest.
+    """
+
+    max_resolution: int = 0  # lines, e.g. 1080
+    preferred_codec: str = ""  # prefix of the codec, e.g. "avc1", "vp9", "opus"
+    preferred_container: str = ""  # e.g. "mp4", "webm"
+    max_bitrate: int = 0  # kbit/s, of each stream
+    max_filesize: int = 0  # MB, of everything downloaded for one video
+    min_audio_bitrate: int = 0  # kbit/s
+    smallest: bool = False  # rank smallest first instead of best first
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["StreamPolicy"]:
+        """The policy stored in job options, None for no policy"""
+        return cls(**data) if data else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+    def key(self) -> str:
+        """Identifies the policy in cache keys"""
+        return json.dumps(self, separators=(",", ":"))
+
+    def select(self, streams: StreamQuery, audio_only: bool) -> Stream:
+        """The best (or smallest) acceptable audio or progressive stream"""
+        if audio_only:
+            candidates = self._acceptable_audio(streams.filter(only_audio=True))
+        else:
+            candidates = self._acceptable_video(streams.filter(progressive=True))
+        candidates = self._within_size(candidates, 0)
+        if not candidates:
+            raise NoAcceptableStream("No stream matches the stream policy")
+        return candidates[0]
+
+    def select_adaptive(self, streams: StreamQuery) -> Optional[List[Stream]]:
+        """
+        The best acceptable video-only and audio-only streams whose combined size is
+        within max_filesize, None if there is no such pair.
+        """
+        audio = self._acceptable_audio(streams.filter(adaptive=True, only_audio=True))
+        for video_stream in self._acceptable_video(
+            streams.filter(adaptive=True, only_video=True)
+        ):
+            # audio in the same container can be muxed without changing containers
+            matching = [s for s in audio if s.subtype == video_stream.subtype]
+            remaining = self._within_size(matching or audio, video_stream.filesize)
+            if remaining:
+                return [video_stream, remaining[0]]
+        return None
+
+    def _acceptable_video(self, streams: StreamQuery) -> List[Stream]:
+        candidates = [
+            s
+            for s in streams
+            if self._within_bitrate(s)
+            and (not self.max_resolution or _resolution(s) <= self.max_resolution)
+        ]
+        return self._rank(candidates, _resolution, lambda s: s.video_codec)
+
+    def _acceptable_audio(self, streams: StreamQuery) -> List[Stream]:
+        candidates = [
+            s
+            for s in streams
+            if self._within_bitrate(s)
+            and (s.bitrate or 0) >= self.min_audio_bitrate * 1000
+        ]
+        return self._rank(candidates, lambda s: s.bitrate or 0, lambda s: s.audio_codec)
+
+    def _within_bitrate(self, stream: Stream) -> bool:
+        return not self.max_bitrate or (stream.bitrate or 0) <= self.max_bitrate * 1000
+
+    def _within_size(self, streams: List[Stream], already: int) -> List[Stream]:
+        """
+        The streams that fit into max_filesize next to `already` bytes. Sizes are only
+        looked at with a limit, since a missing size takes a request to find out.
+        """
+        if not self.max_filesize:
+            return streams
+        return [s for s in streams if already + s.filesize <= self.max_filesize * MB]
+
+    def _rank(
+        self,
+        streams: List[Stream],
+        quality: Callable[[Stream], int],
+        codec: Callable[[Stream], Optional[str]],
+    ) -> List[Stream]:
+        """Preferred codec/container first, then by quality (or bitrate if smallest)"""
+
+        def preference(stream: Stream):
+            return (
+                bool(self.preferred_codec)
+                and not (codec(stream) or "").startswith(self.preferred_codec),
+                bool(self.preferred_container)
+                and stream.subtype != self.preferred_container,
+                (stream.bitrate or 0) if self.smallest else -quality(stream),
+            )
+
+        return sorted(streams, key=preference)
+
+
+def _resolution(stream: Stream) -> int:
+    match = re.match(r"\d+", stream.resolution or "")
+    return int(match.group()) if match else 0
+
+
+def default_streams(video: VideoInfo, audio_only: bool, adaptive: bool) -> List[Stream]:
+    """What gets downloaded without a policy"""
+    if audio_only:
+        return [video.streams.filter(only_audio=True).first()]
+    if adaptive:
+        video_stream = (
+            video.streams.filter(adaptive=True, only_video=True)
+            .order_by("resolution")
+            .desc()
+            .first()
+        )
+        audio_streams = video.streams.filter(adaptive=True, only_audio=True)
+        if video_stream is not None and audio_streams:
+            # audio in the same container can be muxed without changing containers
+            matching = audio_streams.filter(subtype=video_stream.subtype)
+            audio_stream = (matching or audio_streams).order_by("abr").desc().first()
+            return [video_stream, audio_stream]
+    return [video.streams.get_highest_resolution()]
+
+
+def select_streams(
+    video: VideoInfo,
+    audio_only: bool,
+    adaptive: bool,
+    policy: Optional[StreamPolicy] = None,
+    cache: Optional[MetadataCache] = None,
+) -> List[Stream]:
+    """
+    The streams to download: one, or a video-only and an audio-only stream to mux
+    when adaptive is True and the video has a suitable pair.
+
+    Raises NoAcceptableStream if the policy rules out every stream.
+    """
+    if policy is None:
+        return default_streams(video, audio_only, adaptive)
+
+    mode = "audio" if audio_only else "adaptive" if adaptive else "progressive"
+    key = f"selection:{video.video_id}:{mode}:{policy.key()}"
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None:
+        streams = [video.streams.get_by_itag(itag) for itag in entry["itags"]]
+        if None not in streams:
+            return streams
+
+    streams = None
+    if adaptive and not audio_only:
+        streams = policy.select_adaptive(video.streams)
+    if streams is None:
+        streams = [policy.select(video.streams, audio_only)]
+    if cache is not None:
+        cache.put(key, {"itags": [stream.itag for stream in streams]})
+    return streams
@@ -0,0 +1,185 @@
+"""
+Post-processing of audio downloads.
+
+YouTube only serves audio as AAC in an MP4 container or Opus in a WebM container.
+With MP3 the stream is transcoded by ffmpeg; with NATIVE it is kept as is and only
+given the extension of what it really is (.m4a for AAC).
+
+Adaptive (DASH) downloads come as a video-only and an audio-only file, which mux()
+combines into one without re-encoding either.
+
+Encoding is CPU-bound, so it runs in ffmpeg processes, at most one per CPU, and never
+on a download thread: submit() and mux() return right away and the download worker
+can move on to the next video while earlier ones are still encoding.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Set
+
+from .metrics import stage
+
+logger = logging.getLogger(__name__)
+
+MP3: str = "mp3"
+NATIVE: str = "native"  # AAC or Opus, whatever YouTube served
+AUDIO_FORMATS: List[str] = [MP3, NATIVE]
+
+MP3_QUALITY: str = "2"  # LAME VBR quality, about 190 kbit/s
+# containers that have a more specific name when they only hold audio
+NATIVE_EXTENSIONS = {".mp4": ".m4a"}
+
+
+class TranscodeError(OSError):
+    """ffmpeg failed. Subclasses OSError so it counts as a failed download."""
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Path of the ffmpeg executable, from $PYTUBE_GUI_FFMPEG or the PATH"""
+    return os.environ.get("PYTUBE_GUI_FFMPEG") or shutil.which("ffmpeg")
+
+
+def completed(result: str) -> Future:
+    """A Future that is already done, for files that need no post-processing"""
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+class Transcoder:
+    """Converts downloaded audio streams, several at a time"""
+
+    def __init__(
+        self, max_processes: Optional[int] = None, ffmpeg: Optional[str] = None
+    ):
+        self.ffmpeg: Optional[str] = ffmpeg or find_ffmpeg()
+        self._warned: Set[str] = set()  # fallbacks warned about. once is enough
+        self._warned_lock = threading.Lock()
+        # each worker thread only waits on its own ffmpeg process
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_processes or os.cpu_count() or 1,
+            thread_name_prefix="transcode",
+        )
+
+    def submit(self, file_path: str, audio_format: str = MP3) -> Future:
+        """
+        Starts converting file_path to audio_format. The returned Future's result is
+        the path of the converted file; the original is removed once it is done.
+
+        Without ffmpeg, MP3 falls back to NATIVE rather than mislabeling the file.
+        """
+        if audio_format == MP3 and self.ffmpeg is None:
+            self._warn_no_ffmpeg("Keeping audio in its original format.")
+            audio_format = NATIVE
+        if audio_format == NATIVE:
+            return completed(keep_native(file_path))
+        return self._pool.submit(self._to_mp3, file_path)
+
+    def can_mux(self) -> bool:
+        """
+        Whether adaptive downloads can be combined. If not, warns once that they fall
+        back to progressive streams, which go up to 720p.
+        """
+        if self.ffmpeg is None:
+            self._warn_no_ffmpeg("Downloading progressive streams of 720p at most.")
+            return False
+        return True
+
+    def mux(self, video_path: str, audio_path: str, output_path: str) -> Future:
+        """
+        Starts combining a video-only and an audio-only file into output_path with
+        stream copy. The Future's result is output_path; both inputs are removed once
+        it is done. Needs ffmpeg.
+        """
+        return self._pool.submit(self._mux, video_path, audio_path, output_path)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def _warn_no_ffmpeg(self, fallback: str):
+        # to stderr through logging, never stdout: the batch entry point writes JSON there
+        with self._warned_lock:
+            if fallback in self._warned:
+                return
+            self._warned.add(fallback)
+        logger.warning("ffmpeg not found. %s", fallback)
+
+    def _to_mp3(self, file_path: str) -> str:
+        base, ext = os.path.splitext(file_path)
+        output_path = base + ".mp3"
+        with stage("convert") as timer:
+            self._run(
+                ["-i", file_path, "-vn", "-codec:a", "libmp3lame", "-q:a", MP3_QUALITY],
+                output_path,
+            )
+            timer.bytes = os.path.getsize(output_path)
+        os.remove(file_path)
+        return output_path
+
+    def _mux(self, video_path: str, audio_path: str, output_path: str) -> str:
+        with stage("mux") as timer:
+            self._run(
+                ["-i", video_path, "-i", audio_path]
+                + ["-map", "0:v:0", "-map", "1:a:0", "-codec", "copy"],
+                output_path,
+            )
+            timer.bytes = os.path.getsize(output_path)
+        os.remove(video_path)
+        os.remove(audio_path)
+        return output_path
+
+    def _run(self, arguments: List[str], output_path: str):
+        """Runs ffmpeg with arguments, writing to output_path only if it succeeds."""
+        if self.ffmpeg is None:
+            raise TranscodeError("ffmpeg not found")
+        base, ext = os.path.splitext(output_path)
+        temp_path = base + ".tmp" + ext  # never leave a half-written file behind
+        result = subprocess.run(
+            [self.ffmpeg, "-nostdin", "-loglevel", "error", "-y"]
+            + arguments
+            + [temp_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode != 0:
+            _remove(temp_path)
+            reason = result.stderr.decode(errors="replace").strip()
+            raise TranscodeError(
+                f"ffmpeg could not write {os.path.basename(output_path)}: "
+                + (reason or f"exit status {result.returncode}")
+            )
+        os.replace(temp_path, output_path)
+
+
+def keep_native(file_path: str) -> str:
+    """Renames an audio stream to the extension of its actual format. Returns the new path."""
+    base, ext = os.path.splitext(file_path)
+    output_path = base + NATIVE_EXTENSIONS.get(ext, ext)
+    with stage("convert"):
+        if output_path != file_path:
+            os.replace(file_path, output_path)
+    return output_path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_default_transcoder: Optional[Transcoder] = None
+_default_transcoder_lock = threading.Lock()
+
+
+def default_transcoder() -> Transcoder:
+    """The transcoder shared by every download of this process"""
+    global _default_transcoder
+    with _default_transcoder_lock:
+        if _default_transcoder is None:
+            _default_transcoder = Transcoder()
+        return _default_transcoder
@@ -0,0 +1,325 @@
+"""
+Resumable, optionally segmented stream downloads.
+
+A stream is written to "<file>.part" next to a small "<file>.part.json" that records
+which stream it belongs to and how far each segment of it got. If the download is
+interrupted, the next attempt asks the server only for the missing bytes with HTTP
+Range requests. The .part file is renamed to its final name once it is complete, so a
+file without the suffix is always whole.
+
+With segments > 1 the stream is split into that many byte ranges that are fetched over
+separate connections at the same time. Every segment writes at its own offset, which
+gets around per-connection throttling.
+
+The .part file is preallocated to the full size before anything is fetched, so it isn't
+fragmented across the disk and a full disk shows up before the download starts rather
+than part way through it.
+"""
+
+import errno
+import http.client
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import BinaryIO, Callable, List, Optional
+from urllib.error import HTTPError, URLError
+
+from pytube import Stream, request
+
+from .diskspace import Reservation
+from .metrics import stage
+from .progress import ProgressThrottle
+from .ratelimit import RateLimiter
+
+PART_SUFFIX: str = ".part"
+META_SUFFIX: str = ".part.json"
+CHUNK_SIZE: int = 64 * 1024  # bytes read from the socket at a time
+RANGE_SIZE: int = request.default_range_size  # bytes asked for per request, like pytube
+MIN_SEGMENT_SIZE: int = 1024 * 1024  # smaller segments cost more in requests than they save
+MAX_RETRIES: int = 3  # attempts per range before giving up
+TIMEOUT: float = 30.0  # seconds
+
+# a segment is [start, end, next]: bytes start..end-1 belong to it, next is the first missing one
+Segment = List[int]
+
+
+def download_stream(
+    stream: Stream,
+    output_path: str,
+    progress: Optional[ProgressThrottle] = None,
+    filename: Optional[str] = None,
+    segments: int = 1,
+    limiter: Optional[RateLimiter] = None,
+    reservation: Optional[Reservation] = None,
+) -> str:
+    """
+    Downloads stream into output_path and returns the path of the finished file.
+
+    segments is the number of connections to split the stream across. Every chunk
+    read goes through limiter, if given. The space_needed() bytes of the stream are
+    handed back to reservation, if given, once the file is preallocated.
+    Picks up where an earlier, interrupted download of the same stream left off,
+    keeping that attempt's segments. An already complete file is left alone,
+    like Stream.download(skip_existing=True).
+    """
+    file_path: str = stream.get_file_path(filename=filename, output_path=output_path)
+    if stream.exists_at_path(file_path):
+        return file_path
+
+    part_path: str = file_path + PART_SUFFIX
+    meta_path: str = file_path + META_SUFFIX
+    filesize: int = stream.filesize
+    needed: int = space_needed(stream, output_path, filename)
+    layout: Optional[List[Segment]] = _resume_segments(
+        part_path, meta_path, stream.itag, filesize
+    )
+    if layout is None:
+        layout = split_segments(filesize, segments)
+        with open(part_path, "wb") as fh:
+            _preallocate(fh, filesize)
+    else:
+        # a .part from before files were preallocated may be short
+        with open(part_path, "r+b") as fh:
+            _preallocate(fh, filesize)
+        if progress is not None:
+            progress.add_resumed(sum(done - start for start, end, done in layout))
+    if reservation is not None:
+        reservation.use(needed)  # the free space accounts for the file now
+
+    def save_layout():
+        _save_segments(meta_path, stream.itag, filesize, layout)
+
+    def bytes_done() -> int:
+        return sum(done - start for start, end, done in layout)
+
+    resumed = bytes_done()
+    with stage("transfer") as timer:
+        try:
+            if len(layout) == 1:
+                _fetch_segment(
+                    stream.url, part_path, layout[0], progress, limiter, save_layout
+                )
+            else:
+                _fetch_segments(
+                    stream.url, part_path, layout, progress, limiter, save_layout
+                )
+        except HTTPError as e:
+            if e.code != 404:
+                raise
+            # some adaptive streams only work with sequence numbers, which can't be resumed
+            _remove_partial(part_path, meta_path)
+            if progress is not None:
+                stream._monostate.on_progress = progress.on_pytube_progress
+            file_path = stream.download(output_path=output_path, filename=filename)
+            timer.bytes = os.path.getsize(file_path)
+            return file_path
+        finally:
+            # whatever reached the disk counts, even if the download failed part way
+            timer.bytes += bytes_done() - resumed
+
+    os.replace(part_path, file_path)  # atomic, so file_path is never half written
+    os.remove(meta_path)
+    return file_path
+
+
+def space_needed(
+    stream: Stream, output_path: str, filename: Optional[str] = None
+) -> int:
+    """Bytes of disk space downloading stream still takes, not counting an earlier attempt's .part"""
+    file_path: str = stream.get_file_path(filename=filename, output_path=output_path)
+    if stream.exists_at_path(file_path):
+        return 0
+    try:
+        on_disk = os.path.getsize(file_path + PART_SUFFIX)
+    except OSError:
+        on_disk = 0
+    return max(stream.filesize - on_disk, 0)
+
+
+def _preallocate(fh: BinaryIO, size: int):
+    """Allocates size bytes on disk for fh, keeping what's already written."""
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fh.fileno(), 0, size)
+            return
+        except OSError as e:
+            # e.g. a file system that can't. a full disk is raised as it is
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOSYS):
+                raise
+    if os.fstat(fh.fileno()).st_size < size:
+        fh.truncate(size)  # allocates on Windows, sparse on most other systems
+
+
+def split_segments(filesize: int, segments: int) -> List[Segment]:
+    """Splits filesize bytes into at most `segments` ranges of roughly the same size."""
+    count: int = max(1, min(segments, filesize // MIN_SEGMENT_SIZE))
+    bounds = [filesize * i // count for i in range(count + 1)]
+    return [[bounds[i], bounds[i + 1], bounds[i]] for i in range(count)]
+
+
+def _fetch_segments(
+    url: str,
+    part_path: str,
+    layout: List[Segment],
+    progress: Optional[ProgressThrottle],
+    limiter: Optional[RateLimiter],
+    save_layout: Callable[[], None],
+):
+    """Fetches every unfinished segment on its own connection."""
+    lock = threading.Lock()
+    abort = threading.Event()  # set when one segment fails, so the others wind down
+
+    def locked_save():
+        with lock:
+            save_layout()
+
+    pending = [segment for segment in layout if segment[2] < segment[1]]
+    with ThreadPoolExecutor(max_workers=len(pending) or 1) as pool:
+        futures = [
+            pool.submit(
+                _fetch_segment,
+                url,
+                part_path,
+                segment,
+                progress,
+                limiter,
+                locked_save,
+                abort,
+            )
+            for segment in pending
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            abort.set()
+            raise
+
+
+def _fetch_segment(
+    url: str,
+    part_path: str,
+    segment: Segment,
+    progress: Optional[ProgressThrottle],
+    limiter: Optional[RateLimiter],
+    save_layout: Callable[[], None],
+    abort: Optional[threading.Event] = None,
+):
+    """Fills in one segment of part_path, recording its progress after every range."""
+    with open(part_path, "r+b") as fh:
+        fh.seek(segment[2])
+        while segment[2] < segment[1] and not (abort and abort.is_set()):
+            try:
+                _fetch_range(url, fh, segment[2], segment[1], progress, limiter)
+            finally:
+                # record what reached the disk, even if the range failed part way
+                fh.flush()
+                segment[2] = fh.tell()
+                save_layout()
+
+
+def _fetch_range(
+    url: str,
+    fh: BinaryIO,
+    offset: int,
+    end: int,
+    progress: Optional[ProgressThrottle],
+    limiter: Optional[RateLimiter] = None,
+):
+    """Writes up to RANGE_SIZE bytes of offset..end-1 at the current position of fh."""
+    stop_pos: int = min(offset + RANGE_SIZE, end) - 1
+    tries = 0
+    while True:
+        start = offset
+        try:
+            response = request._execute_request(
+                url,
+                method="GET",
+                headers={"Range": f"bytes={offset}-{stop_pos}"},
+                timeout=TIMEOUT,
+            )
+            skip, limit = 0, stop_pos + 1 - offset
+            if response.status != 206:
+                # server ignored the range and sent the whole file.
+                # throw away what comes before offset and keep the rest of the segment
+                skip, limit = offset, end - offset
+            while limit > 0:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if limiter is not None:
+                    limiter.consume(len(chunk))
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk, skip = chunk[dropped:], skip - dropped
+                chunk = chunk[:limit]
+                fh.write(chunk)
+                offset += len(chunk)
+                limit -= len(chunk)
+                if progress is not None:
+                    progress.add(len(chunk))
+            response.close()
+            if offset == start:
+                # ended before a byte of the range. asking for the same again forever
+                # would spin, so it counts as a failed try like a dropped connection
+                raise http.client.IncompleteRead(b"", limit)
+            return
+        except HTTPError:
+            raise  # the server answered. asking again won't change its mind
+        except (URLError, http.client.IncompleteRead, ConnectionError, socket.timeout):
+            # flaky link. ask again for whatever is still missing
+            tries += 1
+            if tries >= MAX_RETRIES:
+                raise
+            fh.flush()
+            stop_pos = min(offset + RANGE_SIZE, end) - 1
+
+
+def _resume_segments(
+    part_path: str, meta_path: str, itag: int, filesize: int
+) -> Optional[List[Segment]]:
+    """Returns the segments of an earlier attempt at this stream, None if there's nothing to resume."""
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        on_disk = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return None
+    if meta.get("itag") != itag or meta.get("filesize") != filesize:
+        return None
+
+    if "offset" in meta:  # written before downloads could be segmented
+        layout = [[0, filesize, int(meta["offset"])]]
+    else:
+        layout = [[int(n) for n in segment] for segment in meta.get("segments", [])]
+    if not layout:
+        return None
+    if len(layout) == 1:
+        # written front to back, so only what is actually on disk counts
+        layout[0][2] = min(layout[0][2], on_disk)
+    elif on_disk != filesize:
+        return None  # preallocated file was tampered with
+    return layout
+
+
+def _save_segments(meta_path: str, itag: int, filesize: int, layout: List[Segment]):
+    """Records how far the download got. Written next to the file, then swapped in."""
+    temp_path = meta_path + ".tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump({"itag": itag, "filesize": filesize, "segments": layout}, f)
+        os.replace(temp_path, meta_path)
+    except OSError:
+        pass  # worst case, the next attempt starts from byte zero
+
+
+def _remove_partial(part_path: str, meta_path: str):
+    for path in (part_path, meta_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
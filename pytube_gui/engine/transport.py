@@ -0,0 +1,327 @@
+"""
+Keep-alive HTTP connections shared by every download.
+
+pytube opens a new connection with urllib for every request, so each watch page,
+player response, playlist page and media range pays for DNS, TCP and TLS again.
+install() replaces pytube.request._execute_request, which every pytube request and
+engine.transfer go through, with one backed by a ConnectionPool: finished connections
+are kept per host and handed to the next request for the same host.
+
+Responses behave like urllib's: they have read(), status, info() and close(), and
+status codes of 400 and up raise HTTPError. A connection goes back to the pool once
+its response has been read to the end; one closed early is thrown away.
+"""
+
+import http.client
+import io
+import json
+import socket
+import ssl
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+from pytube import request
+
+POOL_SIZE: int = 8  # idle connections kept per host
+IDLE_TIMEOUT: float = 60.0  # seconds before an idle connection is closed
+MAX_REDIRECTS: int = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+BASE_HEADERS: Dict[str, str] = {  # same as pytube's
+    "User-Agent": "Mozilla/5.0",
+    "accept-language": "en-US,en",
+}
+
+HostKey = Tuple[str, str, int]  # scheme, host, port
+
+
+class PooledResponse:
+    """An HTTP response that returns its connection to the pool once it's read to the end"""
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        key: HostKey,
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+    ):
+        self.status: int = response.status
+        self.reason: str = response.reason
+        self.headers = response.headers
+        self.url: str = url
+        self._pool = pool
+        self._key = key
+        self._connection: Optional[http.client.HTTPConnection] = connection
+        self._response = response
+        if response.length == 0:  # e.g. HEAD. nothing to read, so done already
+            response.read()
+            self._release()
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def info(self):
+        return self.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def geturl(self) -> str:
+        return self.url
+
+    def close(self):
+        """Gives the connection back if everything was read, otherwise closes it."""
+        if self._connection is None:
+            return
+        if self._response.isclosed():
+            self._release()
+        else:
+            self._response.close()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+    def _release(self):
+        if self._connection is not None:
+            self._pool.release(self._key, self._connection, self._response)
+            self._connection = None
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of keep-alive connections, at most pool_size idle ones per host.
+
+    opened, reused and discarded count connections since the pool was created.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, idle_timeout: float = IDLE_TIMEOUT):
+        self.pool_size: int = pool_size
+        self.idle_timeout: float = idle_timeout
+        self.requests: int = 0
+        self.opened: int = 0
+        self.reused: int = 0
+        self.discarded: int = 0  # went stale or didn't fit into the pool
+        self._idle: Dict[HostKey, List[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def request(
+        self,
+        url: str,
+        method: str = "GET",
+        headers: Optional[Dict[str, str]] = None,
+        data: Optional[bytes] = None,
+        timeout: Any = socket._GLOBAL_DEFAULT_TIMEOUT,
+    ) -> PooledResponse:
+        """Sends a request, following redirects like urlopen. Raises HTTPError for 4xx/5xx."""
+        for redirect in range(MAX_REDIRECTS + 1):
+            key, path = _split(url)
+            connection, response = self._send(key, path, method, headers, data, timeout)
+            location = response.getheader("Location")
+            if response.status in REDIRECT_CODES and location:
+                response.read()
+                self.release(key, connection, response)
+                url = urljoin(url, location)
+                if response.status == 303 or (
+                    response.status in (301, 302) and method == "POST"
+                ):
+                    method, data = "GET", None
+                continue
+            if response.status >= 400:
+                body = response.read()
+                self.release(key, connection, response)
+                raise HTTPError(
+                    url,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(body),
+                )
+            return PooledResponse(self, key, connection, response, url)
+        raise HTTPError(url, 310, "Too many redirects", None, None)
+
+    def release(
+        self,
+        key: HostKey,
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ):
+        """Puts a connection whose response was read to the end back into the pool."""
+        if response.will_close or (response.length or 0) > 0:
+            # the server won't take another request on it, or the body was cut short
+            connection.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append((connection, time.monotonic()))
+                return
+            self.discarded += 1
+        connection.close()
+
+    def close(self):
+        """Closes every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, last_used in connections:
+                connection.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Request and connection counters plus the number of idle connections"""
+        with self._lock:
+            idle = sum(len(connections) for connections in self._idle.values())
+            return {
+                "requests": self.requests,
+                "connections_opened": self.opened,
+                "connections_reused": self.reused,
+                "connections_discarded": self.discarded,
+                "connections_idle": idle,
+            }
+
+    def _send(
+        self,
+        key: HostKey,
+        path: str,
+        method: str,
+        headers: Optional[Dict[str, str]],
+        data: Optional[bytes],
+        timeout: Any,
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        connection = self._acquire(key, timeout)
+        reused = connection is not None
+        while True:
+            if connection is None:
+                connection = self._connect(key, timeout)
+            try:
+                connection.request(method, path, body=data, headers=headers or {})
+                return connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError) as e:
+                connection.close()
+                connection = None
+                if not reused:
+                    raise URLError(e)
+                # the server closed it while it was idle. try once more on a new one
+                with self._lock:
+                    self.discarded += 1
+                reused = False
+            except OSError as e:
+                connection.close()
+                if isinstance(e, socket.timeout):
+                    raise
+                raise URLError(e)
+
+    def _acquire(
+        self, key: HostKey, timeout: Any
+    ) -> Optional[http.client.HTTPConnection]:
+        """The most recently used idle connection to the host, None if there is none"""
+        now = time.monotonic()
+        stale: List[http.client.HTTPConnection] = []
+        connection = None
+        with self._lock:
+            self.requests += 1
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    stale.append(candidate)
+                    continue
+                connection = candidate
+                self.reused += 1
+                break
+            self.discarded += len(stale)
+        for candidate in stale:
+            candidate.close()
+        if connection is not None:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(_seconds(timeout))
+        return connection
+
+    def _connect(self, key: HostKey, timeout: Any) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        with self._lock:
+            self.opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def _split(url: str) -> Tuple[HostKey, str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        raise ValueError("Invalid URL")
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return (scheme, parts.hostname, port), path
+
+
+def _seconds(timeout: Any) -> Optional[float]:
+    if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+        return socket.getdefaulttimeout()
+    return timeout
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> ConnectionPool:
+    """The pool shared by every download of this process, once installed"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+
+def install(
+    pool_size: int = POOL_SIZE, idle_timeout: float = IDLE_TIMEOUT
+) -> Optional[ConnectionPool]:
+    """
+    Sends every pytube request through the default pool, configured with pool_size
+    and idle_timeout. Returns the pool, or None if a proxy is configured, in which
+    case urllib keeps handling requests since the pool doesn't speak to proxies.
+    """
+    if urllib.request.getproxies():
+        return None
+    pool = default_pool()
+    pool.pool_size = pool_size
+    pool.idle_timeout = idle_timeout
+
+    def execute_request(
+        url,
+        method=None,
+        headers=None,
+        data=None,
+        timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    ):
+        """Same as pytube.request._execute_request, on a pooled connection"""
+        all_headers = dict(BASE_HEADERS)
+        if headers:
+            all_headers.update(headers)
+        if data and not isinstance(data, bytes):
+            data = bytes(json.dumps(data), encoding="utf-8")
+        return pool.request(
+            url, method or ("POST" if data else "GET"), all_headers, data, timeout
+        )
+
+    request._execute_request = execute_request
+    return pool
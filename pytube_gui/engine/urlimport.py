@@ -0,0 +1,207 @@
+"""
+Bulk import of URLs from text and CSV files.
+
+Files are read a line at a time, so a list of tens of thousands of URLs is never held
+in memory as a whole. Every URL is normalized to the canonical URL of its video,
+playlist or channel: the same video as a youtu.be link, a Shorts link and a watch URL
+with a playlist and a timestamp is one video. A CSV row counts by its first field that
+is a YouTube URL, so exports with titles or dates next to the URL work as they are.
+
+Duplicates are skipped: URLs seen earlier in the input, URLs the queue already has for
+the same folder (unless they failed), and videos the folder's index (engine.index)
+lists as downloaded. What's left is added to the queue in batches, one transaction
+each.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from .index import DownloadIndex
+from .playlist import CHANNEL_PATH
+from .queue import CAPTIONS, PLAYLIST, VIDEO, JobQueue
+
+BATCH_SIZE: int = 500  # jobs added to the queue per transaction
+
+VIDEO_ID = re.compile(r"^[\w-]{11}$")
+PLAYLIST_ID = re.compile(r"^(PL|UU|LL|FL|OL|RD)[\w-]{10,}$")
+# /shorts/ID, /embed/ID, /live/ID and /v/ID are videos too
+VIDEO_PATH = re.compile(r"^/(shorts|embed|live|v)/([\w-]{11})(/|$)")
+FIELD_SEPARATORS = re.compile(r"[,;\t]")
+
+# reasons a URL is skipped
+DUPLICATE: str = "duplicate"  # earlier in the input or already queued
+DOWNLOADED: str = "downloaded"  # in the index of the folder
+NOT_A_URL: str = "not a YouTube URL"
+
+
+class Target(NamedTuple):
+    """What a URL points to"""
+
+    kind: str  # VIDEO or PLAYLIST. Channels are playlists
+    id: str  # video ID, playlist ID or channel path like "/@name"
+    url: str  # canonical URL
+
+
+def normalize_url(text: str) -> Optional[Target]:
+    """The video, playlist or channel text points to, None if it isn't a YouTube URL"""
+    text = text.strip().strip("\"'<>")
+    if "://" not in text:
+        if VIDEO_ID.match(text):
+            return _video(text)
+        if PLAYLIST_ID.match(text):
+            return _playlist(text)
+        text = "https://" + text  # e.g. "youtu.be/..."
+    parsed = urlparse(text)
+    host = (parsed.hostname or "").lower()
+    if host == "youtu.be":
+        video_id = parsed.path.strip("/")
+        return _video(video_id) if VIDEO_ID.match(video_id) else None
+    if not (host == "youtube.com" or host.endswith(".youtube.com")):
+        return None
+
+    path = parsed.path.rstrip("/")
+    if path == "/watch":
+        # a watch URL with a list is a video of the playlist, like is_playlist_url says
+        video_id = parse_qs(parsed.query).get("v", [""])[0]
+        return _video(video_id) if VIDEO_ID.match(video_id) else None
+    if path == "/playlist":
+        playlist_id = parse_qs(parsed.query).get("list", [""])[0]
+        return _playlist(playlist_id) if playlist_id else None
+    match = CHANNEL_PATH.match(parsed.path)  # like playlist.channel_path
+    if match:
+        channel = "/" + match.group(1)
+        return Target(PLAYLIST, channel, "https://www.youtube.com" + channel)
+    match = VIDEO_PATH.match(parsed.path)
+    return _video(match.group(2)) if match else None
+
+
+def _video(video_id: str) -> Target:
+    return Target(VIDEO, video_id, "https://www.youtube.com/watch?v=" + video_id)
+
+
+def _playlist(playlist_id: str) -> Target:
+    return Target(
+        PLAYLIST, playlist_id, "https://www.youtube.com/playlist?list=" + playlist_id
+    )
+
+
+def parse_row(line: str) -> Optional[Target]:
+    """
+    The first YouTube URL of a line of text or CSV (comma, semicolon or tab separated).
+    A bare video or playlist ID only counts as the first field.
+    """
+    for position, field in enumerate(FIELD_SEPARATORS.split(line)):
+        field = field.strip().strip("\"'")
+        if not field or (position > 0 and "." not in field):
+            continue
+        target = normalize_url(field)
+        if target is not None:
+            return target
+    return None
+
+
+class Deduplicator:
+    """
+    Remembers the URLs that were let through, so each is only downloaded once into
+    download_location. Videos already in the folder's index are turned down as well.
+    """
+
+    def __init__(
+        self, download_location: str, captions: bool = False, audio_only: bool = False
+    ):
+        self.captions: bool = captions  # captions of every URL instead of the videos
+        self.audio_only: bool = audio_only  # looked up in the index for videos
+        # single captions aren't indexed, only those of playlists
+        self.index: Optional[DownloadIndex] = (
+            None if captions else DownloadIndex(download_location)
+        )
+        self._seen: Set[str] = set()  # "kind canonical URL"
+
+    def kind(self, target: Target) -> str:
+        """The kind of job that downloads target"""
+        return CAPTIONS if self.captions else target.kind
+
+    def add_known(self, kind: str, url: str):
+        """Counts a URL downloaded some other way, e.g. a job already in the queue."""
+        target = normalize_url(url)
+        if target is not None:
+            self._seen.add(f"{kind} {target.url}")
+
+    def check(self, target: Target) -> Optional[str]:
+        """Why target should be skipped, None if it should be downloaded (and is remembered)"""
+        key = f"{self.kind(target)} {target.url}"
+        if key in self._seen:
+            return DUPLICATE
+        self._seen.add(key)
+        if (
+            self.index is not None
+            and target.kind == VIDEO
+            and self.index.contains(target.id, self.audio_only)
+        ):
+            return DOWNLOADED
+        return None
+
+
+def _ignore(*args: Any):
+    pass
+
+
+def import_urls(
+    lines: Iterable[str],
+    queue: JobQueue,
+    download_location: str,
+    options: Dict[str, Dict[str, Any]],
+    captions: bool = False,
+    priority: int = 0,
+    batch_size: int = BATCH_SIZE,
+    on_progress: Callable[[Dict[str, int]], Any] = _ignore,
+) -> Dict[str, int]:
+    """
+    Adds a job for every new URL in lines to queue and returns how many were added,
+    skipped as duplicates or as downloaded, and how many lines weren't URLs.
+
+    options are the job options by kind (VIDEO, PLAYLIST, CAPTIONS). With captions,
+    every URL gets a CAPTIONS job. on_progress is called with the counts so far after
+    every batch.
+    """
+    dedupe = Deduplicator(
+        download_location, captions, options.get(VIDEO, {}).get("audio_only", False)
+    )
+    for kind, url in queue.urls(download_location):
+        dedupe.add_known(kind, url)
+
+    counts: Dict[str, int] = {
+        "added": 0,
+        DUPLICATE: 0,
+        DOWNLOADED: 0,
+        "invalid": 0,
+    }
+    batch: List[tuple] = []
+
+    def flush():
+        queue.enqueue_many(batch)
+        counts["added"] += len(batch)
+        batch.clear()
+        on_progress(dict(counts))
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        target = parse_row(line)
+        if target is None:
+            counts["invalid"] += 1  # e.g. a CSV header
+            continue
+        reason = dedupe.check(target)
+        if reason is not None:
+            counts[reason] += 1
+            continue
+        kind = dedupe.kind(target)
+        batch.append(
+            (kind, target.url, download_location, options.get(kind, {}), priority)
+        )
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return counts
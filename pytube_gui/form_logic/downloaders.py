@@ -2,55 +2,95 @@
 This module is an internal helper module that contains classes to download YouTube content.
 It should not contain anything else.
 
-Each class inherits from the PyQt6.QtCore.QThread class. The QThread should tell the form
-what is currently being downloaded and the current progress of the download. 
+Each class inherits from the PyQt6.QtCore.QThread class, through _JobThread. The QThread
+should tell the form what is currently being downloaded and the current progress of the
+download.
+
+The downloading itself is done by the Qt-free jobs in engine.jobs, which the batch
+entry point uses as well. Each thread turns its job's callbacks into signals, and
+_JobThread runs the job.
+
+Nothing network-bound happens in a constructor. If the job fails, the thread emits
+`failed` with a message for the user instead of raising, so every thread ends with
+either `finished` or `failed`, whatever goes wrong.
 """
 
-import os
+import logging
+from typing import Any, Dict, List, Optional
 
 from PyQt6 import QtCore
 from PyQt6.QtCore import QThread
-from pytube import Playlist, YouTube
-from pytube import exceptions as pytube_exceptions
 
+from ..engine.cache import MetadataCache
+from ..engine.captions import SRT
+from ..engine.jobs import CaptionsJob, JobFailed, PlaylistJob, VideoJob
+from ..engine.selection import StreamPolicy
+from ..engine.transcode import MP3
+
+logger = logging.getLogger(__name__)
+
+
+class _JobThread(QThread):
+    """Runs the job of a downloader thread and ends with `finished` or `failed`"""
 
-class VideoDownloaderThread(QThread):
+    failed = QtCore.pyqtSignal(str)  # tells form why the download failed
+    finished = QtCore.pyqtSignal()  # tells form download is done
+
+    job: Any  # a job of engine.jobs, set by the subclass
+
+    def run(self):
+        try:
+            self.job.run()
+        except JobFailed as jf:
+            logger.error("%s", jf, exc_info=jf.__cause__)
+            self.failed.emit(str(jf))
+            return
+        except Exception as e:  # a bug must not keep the scheduler's slot taken
+            logger.exception("%s failed", type(self.job).__name__)
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        self.finished.emit()
+
+
+class VideoDownloaderThread(_JobThread):
     """Downloads a single video"""
 
     initialized = QtCore.pyqtSignal(
         str
     )  # tells form what is currently being downloaded
-    finished = QtCore.pyqtSignal()  # tells form download is done
+    transfer_progress = QtCore.pyqtSignal(
+        object
+    )  # tells form how many bytes have been downloaded (engine.progress.TransferProgress)
 
-    def __init__(self, url: str, download_location: str, audio_only: bool):
+    def __init__(
+        self,
+        url: str,
+        download_location: str,
+        audio_only: bool,
+        segments: int = 1,
+        audio_format: str = MP3,
+        adaptive: bool = False,
+        policy: Optional[Dict[str, Any]] = None,  # engine.selection.StreamPolicy fields
+        rate_limit: int = 0,  # KB/s, 0 for none
+        cache: Optional[MetadataCache] = None,
+    ):
         super().__init__()
-        self.video: YouTube = YouTube(url)
-        self.download_location: str = download_location
-        self.audio_only: bool = audio_only
-
-    def run(self):
-        self.initialized.emit(f"Downloading: {self.video.title}")
-        if self.audio_only:
-            audio = (
-                self.video.streams.filter(only_audio=True)
-                .first()
-                .download(output_path=self.download_location)
-            )
-            # rename to .mp3
-            base, ext = os.path.splitext(audio)
-            try:
-                os.remove(
-                    base + ".mp3"
-                )  # this file might exist already. if it does, can't perform rename
-            except OSError:
-                pass
-            os.rename(audio, base + ".mp3")
-        else:
-            self.video.streams.get_highest_resolution().download(self.download_location)
-        self.finished.emit()
+        self.job: VideoJob = VideoJob(
+            url,
+            download_location,
+            audio_only,
+            segments=segments,
+            audio_format=audio_format,
+            adaptive=adaptive,
+            policy=StreamPolicy.from_dict(policy),
+            rate_limit=rate_limit,
+            cache=cache,
+        )
+        self.job.on_status = self.initialized.emit
+        self.job.on_transfer = self.transfer_progress.emit
 
 
-class PlaylistDownloaderThread(QThread):
+class PlaylistDownloaderThread(_JobThread):
     """Downloads a single playlist of videos"""
 
     initialized = QtCore.pyqtSignal(int)  # tells form how many videos there are
@@ -60,7 +100,9 @@ class PlaylistDownloaderThread(QThread):
     progress = QtCore.pyqtSignal(
         int
     )  # tells form how many videos have been downloaded so far
-    finished = QtCore.pyqtSignal()  # tells form download is done
+    transfer_progress = QtCore.pyqtSignal(
+        object
+    )  # tells form how many bytes have been downloaded across all workers
 
     def __init__(
         self,
@@ -69,71 +111,66 @@ class PlaylistDownloaderThread(QThread):
         audio_only: bool,
         start_index: int,
         stop_index: int,
+        workers: int = 1,
+        segments: int = 1,
+        audio_format: str = MP3,
+        adaptive: bool = False,
+        policy: Optional[Dict[str, Any]] = None,  # engine.selection.StreamPolicy fields
+        rate_limit: int = 0,  # KB/s, 0 for none
+        cache: Optional[MetadataCache] = None,
     ):
         super().__init__()
-        self.playlist: Playlist = Playlist(url)
-        self.audio_only: bool = audio_only
-        self.start_index: int = start_index  # 1-indexed
-        self.stop_index: int = stop_index  # 1-indexed
-
-        if (
-            len(self.playlist.videos) < start_index
-            or len(self.playlist.videos) < stop_index
-        ):
-            raise ValueError("Start or stop value is too large")
-
-        # put all downloaded files into its own directory
-        self.download_location: str = os.path.join(
-            download_base_path, self.playlist.title
+        self.job: PlaylistJob = PlaylistJob(
+            url,
+            download_base_path,
+            audio_only,
+            start_index,
+            stop_index,
+            workers=workers,
+            segments=segments,
+            audio_format=audio_format,
+            adaptive=adaptive,
+            policy=StreamPolicy.from_dict(policy),
+            rate_limit=rate_limit,
+            cache=cache,
         )
-        os.mkdir(self.download_location)
+        self.job.on_count = self.initialized.emit
+        self.job.on_status = self.next_video_title.emit
+        self.job.on_progress = self.progress.emit
+        self.job.on_transfer = self.transfer_progress.emit
 
-    def run(self):
-        # playlist on youtube is 1-indexed, enumeration is 0-indexed.
-        # to account for this, start and stop will subtract 1 from the start_index and stop_index
-        start: int = self.start_index - 1 if self.start_index > 0 else 0
-        stop: int = (
-            self.stop_index if self.stop_index > 0 else len(self.playlist.videos)
-        )
-        self.initialized.emit(stop - start)
-        for i, video in enumerate(self.playlist.videos[start:stop]):
-            self.next_video_title.emit(f"Downloading: {video.title}")
-            if self.audio_only:
-                audio = (
-                    video.streams.filter(only_audio=True)
-                    .first()
-                    .download(output_path=self.download_location)
-                )
-                # rename to .mp3
-                base, ext = os.path.splitext(audio)
-                os.rename(audio, base + ".mp3")
-            else:
-                video.streams.get_highest_resolution().download(self.download_location)
-            self.progress.emit(i + 1)  # i+1 videos downloaded so far
-        self.finished.emit()
 
+class CaptionsDownloaderThread(_JobThread):
+    """Downloads the captions of a video, or of a playlist or channel"""
 
-class CaptionsDownloaderThread(QThread):
     initialized = QtCore.pyqtSignal(str)  # tells form what is being downloaded
-    finished = QtCore.pyqtSignal()  # tells form download is done
+    video_count = QtCore.pyqtSignal(int)  # tells form how many videos there are (playlists)
+    progress = QtCore.pyqtSignal(
+        int
+    )  # tells form how many videos have been done so far (playlists)
 
-    def __init__(self, url: str, download_location: str):
+    def __init__(
+        self,
+        url: str,
+        download_location: str,
+        languages: Optional[List[str]] = None,  # caption codes, see engine.captions
+        start_index: int = 0,
+        stop_index: int = 0,
+        workers: int = 1,
+        caption_format: str = SRT,  # see engine.captions
+        cache: Optional[MetadataCache] = None,
+    ):
         super().__init__()
-        self.video: YouTube = YouTube(url)
-        self.download_location: str = download_location
-
-        self.video.bypass_age_gate()
-        if not self.video.captions:
-            raise pytube_exceptions.PytubeError("No captions exist for video")
-
-    def run(self):
-        self.initialized.emit(f"Downloading: {self.video.title} (captions)")
-        caption = (
-            self.video.captions["en"]
-            if "en" in self.video.captions
-            else self.video.captions["a.en"]
-        )  # attempt downloading captions that the creator made. if doesn't exist, use autogenerated captions
-        caption.download(
-            self.video.title, srt=False, output_path=self.download_location
-        )  # download to XML
-        self.finished.emit()
+        self.job: CaptionsJob = CaptionsJob(
+            url,
+            download_location,
+            languages=languages,
+            start_index=start_index,
+            stop_index=stop_index,
+            workers=workers,
+            caption_format=caption_format,
+            cache=cache,
+        )
+        self.job.on_status = self.initialized.emit
+        self.job.on_count = self.video_count.emit
+        self.job.on_progress = self.progress.emit
@@ -0,0 +1,60 @@
+"""
+Imports the URLs of a text or CSV file into the download queue in the background.
+
+The file is read and added to the queue in batches by engine.urlimport, so a list of
+thousands of URLs neither sits in memory nor blocks the window. Like the downloader
+threads, the thread ends with either `finished` or `failed`.
+"""
+
+from typing import Any, Dict
+
+from PyQt6 import QtCore
+from PyQt6.QtCore import QThread
+
+from ..engine.queue import JobQueue
+from ..engine.urlimport import import_urls
+
+
+class UrlImportThread(QThread):
+    """Adds a job for every new URL of a file"""
+
+    progress = QtCore.pyqtSignal(
+        object
+    )  # tells form how many URLs were added or skipped so far (a dict of counts)
+    failed = QtCore.pyqtSignal(str)  # tells form why the file couldn't be imported
+    finished = QtCore.pyqtSignal(object)  # tells form the import is done (the counts)
+
+    def __init__(
+        self,
+        path: str,
+        queue: JobQueue,
+        download_location: str,
+        options: Dict[str, Dict[str, Any]],  # job options by kind
+        captions: bool = False,  # captions of every URL instead of the videos
+        priority: int = 0,
+    ):
+        super().__init__()
+        self.path: str = path
+        self.queue: JobQueue = queue
+        self.download_location: str = download_location
+        self.options: Dict[str, Dict[str, Any]] = options
+        self.captions: bool = captions
+        self.priority: int = priority
+
+    def run(self):
+        try:
+            # utf-8-sig drops the byte order mark spreadsheet programs put in CSV files
+            with open(self.path, "r", encoding="utf-8-sig", errors="replace") as f:
+                counts = import_urls(
+                    f,
+                    self.queue,
+                    self.download_location,
+                    self.options,
+                    self.captions,
+                    self.priority,
+                    on_progress=self.progress.emit,
+                )
+        except OSError as e:
+            self.failed.emit(f"Could not read {self.path}: {e.strerror}")
+            return
+        self.finished.emit(counts)
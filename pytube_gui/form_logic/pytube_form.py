@@ -1,14 +1,16 @@
 import os
 import platform
 
-from PyQt6 import QtCore, QtWidgets
-from PyQt6.QtCore import QThread
+from typing import Any, Dict, Optional, Tuple
+
+from PyQt6 import QtWidgets
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from pytube import exceptions as pytube_exceptions
 
+from ..engine.queue import CAPTIONS, PLAYLIST, VIDEO, JobQueue
 from ..form_ui.pytube_form import \
     Ui_pythonYTDownloaderForm as MainFormUi  # created from pyuic
-from .downloaders import *
+from .queue_list import QueueList
+from .scheduler import DownloadScheduler
 
 
 class PyTubeForm(MainFormUi):
@@ -16,10 +18,14 @@ class PyTubeForm(MainFormUi):
     def __init__(self, current_dialog: QtWidgets.QDialog):
         """Form Constructor"""
         super().__init__()
-        self.thread: QThread
+        # jobs left over from the last session start right away
+        self.scheduler: DownloadScheduler = DownloadScheduler(JobQueue())
+        self.current_job: Optional[int] = None  # job shown in the status label/progress bar
+        self.ffmpeg_found: bool = True  # "Best quality" needs it to combine the streams
         # setup UI before defining logic
         self.dialog_window: QtWidgets.QDialog = current_dialog
         self.setupUi(self.dialog_window)
+        self.queue_list: QueueList = QueueList(self.queueListWidget)
         # define UI logic here
         self._on_form_load()
         self.cancelButton.clicked.connect(QtWidgets.QApplication.quit)
@@ -27,12 +33,31 @@ class PyTubeForm(MainFormUi):
         self.downloadFolderBrowseButton.clicked.connect(
             self.downloadFolderBrowseButton_clicked
         )
+        self.importButton.clicked.connect(self.importButton_clicked)
         self.videoPlaylistSelectCombobox.currentIndexChanged.connect(
             self.videoPlaylistSelectCombobox_changed
         )
         self.downloadAllAvailableCheckbox.stateChanged.connect(
             self.downloadAllAvailableCheckbox_changed
         )
+        self.audioOnlyCheckbox.stateChanged.connect(self.audioOnlyCheckbox_changed)
+        self.clearFinishedButton.clicked.connect(self.scheduler.clear_finished)
+        self.totalLimitSpinBox.valueChanged.connect(
+            self.scheduler.set_global_rate_limit
+        )
+        self.jobLimitSpinBox.valueChanged.connect(self.jobLimitSpinBox_changed)
+        self.queueListWidget.currentItemChanged.connect(
+            self.queueListWidget_selection_changed
+        )
+        self.scheduler.queue_changed.connect(self._refresh_queue)
+        self.scheduler.job_started.connect(self._job_started)
+        self.scheduler.job_status.connect(self._job_status)
+        self.scheduler.job_progress.connect(self._job_progress)
+        self.scheduler.import_progress.connect(self._import_progress)
+        self.scheduler.import_finished.connect(self._import_finished)
+        self.scheduler.import_failed.connect(self._import_failed)
+        # leftover jobs are started by main once the window is up
+        self._refresh_queue()
 
     def _on_form_load(self):
         """When the form loads, do various chores."""
@@ -47,11 +72,22 @@ class PyTubeForm(MainFormUi):
         self.downloadFolderTextbox.setText(home_download_directory)
         self.downloadStatusLabel.setText("")
 
+        from ..engine.transcode import find_ffmpeg
+
+        self.ffmpeg_found = find_ffmpeg() is not None
+        if not self.ffmpeg_found:
+            self.adaptiveCheckbox.setChecked(False)
+            self.adaptiveCheckbox.setEnabled(False)
+            self.adaptiveCheckbox.setToolTip(
+                "Needs ffmpeg, which wasn't found. Install it or set PYTUBE_GUI_FFMPEG"
+                " to its path. Without it videos are 720p at most"
+            )
+
     def startButton_clicked(self):
         """
         Handler for clicking startButton.
 
-        Downloads a video or playlist depending on user's inputs.
+        Queues a video, playlist or captions download depending on user's inputs.
         """
         user_selection: str = self.videoPlaylistSelectCombobox.currentText()
         if user_selection == "Video":
@@ -82,211 +118,210 @@ class PyTubeForm(MainFormUi):
         self.downloadFolderTextbox.setText(download_location_transformed)
 
     def _download_video(self):
-        """Downloads a single video and saves it to the destination directory."""
-        audio_only: bool = self.audioOnlyCheckbox.isChecked()
+        """Queues a single video to be saved to the destination directory."""
         download_location: str = self.downloadFolderTextbox.text()
         url: str = self.urlTextbox.text()
 
-        self.progressBar.setMinimum(0)
-        self.progressBar.setMaximum(1)
-        self.progressBar.setValue(0)
-        # prevent user from initiating download while current download is running
-        self.startButton.setEnabled(False)
-        self.downloadFolderBrowseButton.setEnabled(False)
-
-        # attempt download
-        try:
-            # create new thread to download videos to prevent UI from freezing
-            self.thread = VideoDownloaderThread(url, download_location, audio_only)
-            # update UI when download starts and ends
-            self.thread.initialized.connect(self.downloadStatusLabel.setText)
-            self.thread.finished.connect(self._video_download_completed)
-
-            # start the thread
-            self.thread.start()
-
-        except pytube_exceptions.RegexMatchError as rme:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not find video. Check to make sure the URL is correct.",
-            )
-            print(rme)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except pytube_exceptions.PytubeError as pe:
+        self.scheduler.enqueue(
+            VIDEO,
+            url,
+            download_location,
+            self._video_options(),
+            self.prioritySpinBox.value(),
+        )
+        self.urlTextbox.clear()  # ready for the next URL
+
+    def _download_playlist(self):
+        """
+        Queues an entire playlist or part of a playlist.
+        The download creates a new directory to contain all videos from the playlist.
+        """
+        download_base_path: str = self.downloadFolderTextbox.text()
+        url: str = self.urlTextbox.text()
+
+        if url is None or url == "":
             QMessageBox.critical(
                 self.dialog_window,
                 "Something went wrong",
-                "Could not download video. Check to make sure the URL is correct.",
+                "Could not find playlist. Check to make sure the URL is correct.",
             )
-            print(pe)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
+            return
 
-    def _download_playlist(self):
+        if not self._check_playlist_range():
+            return
+
+        self.scheduler.enqueue(
+            PLAYLIST,
+            url,
+            download_base_path,
+            self._playlist_options(),
+            self.prioritySpinBox.value(),
+        )
+        self.urlTextbox.clear()  # ready for the next URL
+
+    def _download_captions(self):
         """
-        Downloads an entire playlist or part of a playlist,
-        creating a new directory to contain all videos from the playlist.
+        Queues the captions of a video, or of a playlist or channel. The captions of a
+        playlist go into a new directory, like its videos would.
         """
-        audio_only: bool = self.audioOnlyCheckbox.isChecked()
-        download_base_path: str = self.downloadFolderTextbox.text()
+        download_location: str = self.downloadFolderTextbox.text()
         url: str = self.urlTextbox.text()
-        # indexes are 1-based on YouTube, so these are also 1-based for the user
-        start_index = (
-            self.startRangeSpinBox.value()
-            if not self.downloadAllAvailableCheckbox.isChecked()
-            else -1
+
+        if not self._check_playlist_range():  # ignored for a single video
+            return
+
+        self.scheduler.enqueue(
+            CAPTIONS,
+            url,
+            download_location,
+            self._captions_options(),
+            self.prioritySpinBox.value(),
         )
-        stop_index = (
-            self.stopRangeSpinBox.value()
-            if not self.downloadAllAvailableCheckbox.isChecked()
-            else -1
+        self.urlTextbox.clear()  # ready for the next URL
+
+    def importButton_clicked(self):
+        """
+        Handler for clicking importButton.
+
+        Queues every URL of a text or CSV file with the options picked. Videos and
+        playlists (or their captions, with "Captions" selected) that are already queued
+        or downloaded into the folder are skipped.
+        """
+        path, _ = QFileDialog.getOpenFileName(
+            self.dialog_window,
+            "Import URLs",
+            "",
+            "Lists of URLs (*.txt *.csv);;All files (*)",
         )
+        if not path or not self._check_playlist_range():
+            return
 
+        captions: bool = self.videoPlaylistSelectCombobox.currentText() == "Captions"
+        if captions:
+            options = {CAPTIONS: self._captions_options()}
+        else:
+            options = {VIDEO: self._video_options(), PLAYLIST: self._playlist_options()}
+        self.scheduler.import_file(
+            path,
+            self.downloadFolderTextbox.text(),
+            options,
+            captions,
+            self.prioritySpinBox.value(),
+        )
+        self.downloadStatusLabel.setText("Importing URLs...")
+
+    def _video_options(self) -> Dict[str, Any]:
+        """Job options of videos, from the fields of the form"""
+        return {
+            "audio_only": self.audioOnlyCheckbox.isChecked(),
+            "segments": self.connectionsSpinBox.value(),
+            "audio_format": self._audio_format(),
+            "adaptive": self.adaptiveCheckbox.isChecked(),
+            "policy": self._stream_policy(),
+            "rate_limit": self.jobLimitSpinBox.value(),
+        }
+
+    def _playlist_options(self) -> Dict[str, Any]:
+        """Job options of playlists, from the fields of the form"""
+        start_index, stop_index = self._playlist_range()
+        return {
+            **self._video_options(),
+            "start_index": start_index,
+            "stop_index": stop_index,
+            "workers": self.workersSpinBox.value(),
+        }
+
+    def _captions_options(self) -> Dict[str, Any]:
+        """Job options of captions, from the fields of the form"""
+        start_index, stop_index = self._playlist_range()  # ignored for a single video
+        # the engine is only imported once there's something to download
+        from ..engine.captions import CAPTION_FORMATS, parse_languages
+
+        return {
+            "languages": parse_languages(self.captionLanguagesTextbox.text()),
+            "start_index": start_index,
+            "stop_index": stop_index,
+            "workers": self.workersSpinBox.value(),
+            # in the same order as captionFormatCombobox
+            "caption_format": CAPTION_FORMATS[
+                self.captionFormatCombobox.currentIndex()
+            ],
+        }
+
+    def _check_playlist_range(self) -> bool:
+        """Whether the playlist range makes sense. Tells the user if it doesn't."""
+        start_index, stop_index = self._playlist_range()
         if start_index > stop_index:
             QMessageBox.critical(
                 self.dialog_window,
                 "Something went wrong",
                 "Start value is greater than stop value",
             )
-            return
+            return False
+        return True
 
-        self.progressBar.setValue(0)
-        self.progressBar.repaint()
-        # prevent user from initiating download while current download is running
-        self.startButton.setEnabled(False)
-        self.downloadFolderBrowseButton.setEnabled(False)
-
-        # attempt to download videos
-        try:
-            assert url is not None and url != ""
-            # create new thread to download videos to prevent UI from freezing
-            self.thread = PlaylistDownloaderThread(
-                url, download_base_path, audio_only, start_index, stop_index
-            )
-            # tell the main thread to update UI when progress is made
-            self.thread.initialized.connect(self.progressBar.setMaximum)
-            self.thread.next_video_title.connect(self.downloadStatusLabel.setText)
-            self.thread.progress.connect(self.progressBar.setValue)
-            self.thread.finished.connect(self._playlist_download_completed)
+    def _playlist_range(self) -> Tuple[int, int]:
+        """Start and stop index picked for playlists, both -1 for the whole playlist"""
+        if self.downloadAllAvailableCheckbox.isChecked():
+            return -1, -1
+        # indexes are 1-based on YouTube, so these are also 1-based for the user
+        return self.startRangeSpinBox.value(), self.stopRangeSpinBox.value()
 
-            # begin the download
-            self.thread.start()
+    def _audio_format(self) -> str:
+        """engine.transcode format picked in audioFormatCombobox, in the same order"""
+        # the engine is only imported once there's something to download
+        from ..engine.transcode import AUDIO_FORMATS
 
-        except FileExistsError as fee:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "A folder already exists for the playlist",
-            )
-            print(fee)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except pytube_exceptions.RegexMatchError as rme:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not find playlist. Check to make sure the URL is correct.",
-            )
-            print(rme)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except pytube_exceptions.PytubeError as pe:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not download video. Check to make sure the URL is correct.",
-            )
-            print(pe)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except AssertionError as ae:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not find playlist. Check to make sure the URL is correct.",
-            )
-            print(ae)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except ValueError as ve:
-            QMessageBox.critical(self.dialog_window, "Something went wrong", str(ve))
-            print(ve)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
+        return AUDIO_FORMATS[self.audioFormatCombobox.currentIndex()]
 
-    def _download_captions(self):
-        download_location: str = self.downloadFolderTextbox.text()
-        url: str = self.urlTextbox.text()
+    def _stream_policy(self) -> Optional[Dict[str, Any]]:
+        """StreamPolicy fields for the job options, None for the default streams"""
+        if self.maxResolutionCombobox.currentIndex() == 0:  # any resolution
+            return None
+        max_resolution = int(self.maxResolutionCombobox.currentText().rstrip("p"))
+        from ..engine.selection import StreamPolicy
+
+        return StreamPolicy(max_resolution=max_resolution).to_dict()
 
-        self.progressBar.setMinimum(0)
+    def _refresh_queue(self):
+        """Lists every job of the queue with its state"""
+        self.queue_list.refresh(self.scheduler.queue.listing(), self.scheduler.status)
+        if self.current_job not in self.scheduler.threads:
+            self.downloadStatusLabel.setText("")
+
+    def _job_started(self, job_id: int):
+        """The status label and progress bar follow the job that started last"""
+        self.current_job = job_id
         self.progressBar.setMaximum(1)
         self.progressBar.setValue(0)
-        # prevent user from initiating download while current download is running
-        self.startButton.setEnabled(False)
-        self.downloadFolderBrowseButton.setEnabled(False)
-        # attempt download
-        try:
-            # create new thread to download videos to prevent UI from freezing
-            self.thread = CaptionsDownloaderThread(url, download_location)
-            # update UI when download starts and ends
-            self.thread.initialized.connect(self.downloadStatusLabel.setText)
-            self.thread.finished.connect(self._captions_download_completed)
-
-            # start the thread
-            self.thread.start()
-
-        except pytube_exceptions.RegexMatchError as rme:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not find video. Check to make sure the URL is correct.",
-            )
-            print(rme)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
-        except pytube_exceptions.PytubeError as pe:
-            QMessageBox.critical(
-                self.dialog_window,
-                "Something went wrong",
-                "Could not download captions. Maybe no captions are available?",
-            )
-            print(pe)
-            self.startButton.setEnabled(True)
-            self.downloadFolderBrowseButton.setEnabled(True)
 
-    def _video_download_completed(self):
-        """Performs chores when the video download is complete"""
-        self.progressBar.setValue(1)  # do this first
-        QMessageBox.information(
-            self.dialog_window, "Success!", "Video download complete"
-        )  # this second
-        self.downloadStatusLabel.setText("")  # this third
-        self.downloadFolderBrowseButton.setEnabled(True)
-        self.startButton.setEnabled(True)
-        del self.thread
-
-    def _playlist_download_completed(self):
-        """Performs chores when the playlist download is complete"""
-        QMessageBox.information(
-            self.dialog_window, "Success!", "Playlist download complete"
-        )  # do this first
-        self.downloadStatusLabel.setText("")  # this second
-        self.downloadFolderBrowseButton.setEnabled(True)
-        self.startButton.setEnabled(True)
-        del self.thread
-
-    def _captions_download_completed(self):
-        """Performs chores when the captions download is complete"""
-        self.progressBar.setValue(1)  # do this first
+    def _job_status(self, job_id: int, status: str):
+        if job_id == self.current_job:
+            self.downloadStatusLabel.setText(status)
+        self.queue_list.set_details(job_id, status)
+
+    def _job_progress(self, job_id: int, value: int, maximum: int):
+        if job_id == self.current_job:
+            self.progressBar.setMaximum(maximum)
+            self.progressBar.setValue(value)
+
+    def _import_progress(self, counts: Dict[str, int]):
+        self.downloadStatusLabel.setText(f"Importing URLs: {counts['added']} added")
+
+    def _import_finished(self, counts: Dict[str, int]):
+        self.downloadStatusLabel.setText("")
         QMessageBox.information(
-            self.dialog_window, "Success!", "Caption download complete"
-        )  # this second
-        self.downloadStatusLabel.setText("")  # this third
-        self.downloadFolderBrowseButton.setEnabled(True)
-        self.startButton.setEnabled(True)
-        del self.thread
+            self.dialog_window,
+            "Import finished",
+            f"Added {counts['added']} downloads to the queue.\n\n"
+            f"Already queued: {counts['duplicate']}\n"
+            f"Already downloaded: {counts['downloaded']}\n"
+            f"Lines without a YouTube URL: {counts['invalid']}",
+        )
+
+    def _import_failed(self, message: str):
+        self.downloadStatusLabel.setText("")
+        QMessageBox.critical(self.dialog_window, "Something went wrong", message)
 
     def videoPlaylistSelectCombobox_changed(self):
         """
@@ -294,6 +329,7 @@ class PyTubeForm(MainFormUi):
 
         Enables/disables the playlist range fields depending
         on whether or not a video or playlist is being downloaded.
+        Captions can be of a playlist too, so they keep the range fields.
         """
         user_selection: str = self.videoPlaylistSelectCombobox.currentText()
 
@@ -301,21 +337,23 @@ class PyTubeForm(MainFormUi):
             self.downloadAllAvailableCheckbox.setEnabled(False)
             self.startRangeSpinBox.setEnabled(False)
             self.stopRangeSpinBox.setEnabled(False)
+            self.workersSpinBox.setEnabled(False)
+            self.connectionsSpinBox.setEnabled(True)
             self.audioOnlyCheckbox.setEnabled(True)
-        elif user_selection == "Playlist":
+        elif user_selection in ("Playlist", "Captions"):
             self.downloadAllAvailableCheckbox.setEnabled(True)
-            self.audioOnlyCheckbox.setEnabled(True)
+            self.workersSpinBox.setEnabled(True)
+            self.connectionsSpinBox.setEnabled(user_selection == "Playlist")
+            self.audioOnlyCheckbox.setEnabled(user_selection == "Playlist")
             if self.downloadAllAvailableCheckbox.isChecked():
                 self.startRangeSpinBox.setEnabled(False)
                 self.stopRangeSpinBox.setEnabled(False)
             else:
                 self.startRangeSpinBox.setEnabled(True)
                 self.stopRangeSpinBox.setEnabled(True)
-        elif user_selection == "Captions":
-            self.downloadAllAvailableCheckbox.setEnabled(False)
-            self.startRangeSpinBox.setEnabled(False)
-            self.stopRangeSpinBox.setEnabled(False)
-            self.audioOnlyCheckbox.setEnabled(False)
+        self.captionLanguagesTextbox.setEnabled(user_selection == "Captions")
+        self.captionFormatCombobox.setEnabled(user_selection == "Captions")
+        self.audioOnlyCheckbox_changed()
 
     def downloadAllAvailableCheckbox_changed(self):
         if self.downloadAllAvailableCheckbox.isChecked():
@@ -324,3 +362,28 @@ class PyTubeForm(MainFormUi):
         else:
             self.startRangeSpinBox.setEnabled(True)
             self.stopRangeSpinBox.setEnabled(True)
+
+    def audioOnlyCheckbox_changed(self):
+        """The audio format is for audio only downloads, best quality for the rest"""
+        audio_enabled: bool = self.audioOnlyCheckbox.isEnabled()
+        audio_only: bool = self.audioOnlyCheckbox.isChecked()
+        self.audioFormatCombobox.setEnabled(audio_enabled and audio_only)
+        self.adaptiveCheckbox.setEnabled(
+            audio_enabled and not audio_only and self.ffmpeg_found
+        )
+        self.maxResolutionCombobox.setEnabled(audio_enabled and not audio_only)
+
+    def queueListWidget_selection_changed(self):
+        """Shows the limit of the selected job, if it's running"""
+        job_id = self.queue_list.selected()
+        rate_limit = self.scheduler.rate_limit(job_id) if job_id is not None else None
+        if rate_limit is not None:
+            self.jobLimitSpinBox.blockSignals(True)  # showing it isn't changing it
+            self.jobLimitSpinBox.setValue(rate_limit)
+            self.jobLimitSpinBox.blockSignals(False)
+
+    def jobLimitSpinBox_changed(self):
+        """Applies to new jobs and right away to the selected job, if it's running"""
+        job_id = self.queue_list.selected()
+        if job_id is not None:
+            self.scheduler.set_rate_limit(job_id, self.jobLimitSpinBox.value())
@@ -0,0 +1,97 @@
+"""
+Keeps the list of queued jobs in the window in step with the queue.
+
+The queue changes every time a job is added, starts or ends, and an import adds
+hundreds of jobs at a time. Rebuilding the list on every change freezes the window
+once tens of thousands of jobs are queued, so refresh() only touches the rows of jobs
+that were added, changed, moved or removed since the last time.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PyQt6 import QtCore, QtWidgets
+
+from ..engine.queue import DONE, FAILED, RUNNING
+
+JOB_ID_ROLE = QtCore.Qt.ItemDataRole.UserRole  # the data of an item is its job ID
+
+# where a job goes in the list: finished ones last, then by priority, then oldest first
+SortKey = Tuple[bool, int, int]
+
+
+class QueueList:
+    """
+    The rows of a QListWidget, one per job of the queue, in the order of
+    JobQueue.jobs()
+    """
+
+    def __init__(self, widget: QtWidgets.QListWidget):
+        self.widget: QtWidgets.QListWidget = widget
+        self._items: Dict[int, QtWidgets.QListWidgetItem] = {}  # by job ID
+        self._keys: Dict[int, SortKey] = {}  # by job ID
+        self._order: List[SortKey] = []  # keys of the rows, top to bottom
+        self._labels: Dict[int, str] = {}  # state, kind and URL of each job
+        self._texts: Dict[int, str] = {}  # label and details, as shown
+
+    def refresh(
+        self,
+        listing: Iterable[Tuple[int, str, str, int, str, str]],  # JobQueue.listing()
+        status: Dict[int, str],  # what running jobs are doing, by job ID
+    ):
+        """Updates the rows to listing. The selected job stays selected."""
+        selected = self.selected()
+        self.widget.blockSignals(True)  # moving rows isn't changing the selection
+        listed = set()
+        for job_id, kind, url, priority, state, message in listing:
+            listed.add(job_id)
+            key = (state in (DONE, FAILED), -priority, job_id)
+            if job_id not in self._items:
+                item = QtWidgets.QListWidgetItem()
+                item.setData(JOB_ID_ROLE, job_id)
+                self._items[job_id] = item
+                self._insert(job_id, key)
+            elif self._keys[job_id] != key:
+                self._take(job_id)
+                self._insert(job_id, key)
+            self._labels[job_id] = f"[{state}] {kind.capitalize()}: {url}"
+            self.set_details(
+                job_id, status.get(job_id, "") if state == RUNNING else message
+            )
+        # bottom up, so rows above don't have to move
+        gone = sorted(self._items.keys() - listed, key=self._keys.get, reverse=True)
+        for job_id in gone:
+            self._take(job_id)
+            del self._items[job_id], self._labels[job_id], self._texts[job_id]
+        if (
+            selected in self._items
+            and self.widget.currentItem() is not self._items[selected]
+        ):
+            self.widget.setCurrentItem(self._items[selected])
+        self.widget.blockSignals(False)
+
+    def set_details(self, job_id: int, details: str):
+        """Shows details, e.g. the status of a running job, next to the job"""
+        if job_id not in self._items:
+            return
+        label = self._labels[job_id]
+        text = f"{label} - {details}" if details else label
+        if self._texts.get(job_id) != text:
+            self._texts[job_id] = text
+            self._items[job_id].setText(text)
+
+    def selected(self) -> Optional[int]:
+        """ID of the selected job, None if there's none"""
+        item = self.widget.currentItem()
+        return item.data(JOB_ID_ROLE) if item is not None else None
+
+    def _insert(self, job_id: int, key: SortKey):
+        row = bisect_left(self._order, key)
+        self._order.insert(row, key)
+        self._keys[job_id] = key
+        self.widget.insertItem(row, self._items[job_id])
+
+    def _take(self, job_id: int):
+        row = bisect_left(self._order, self._keys.pop(job_id))
+        del self._order[row]
+        self.widget.takeItem(row)
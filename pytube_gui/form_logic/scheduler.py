@@ -0,0 +1,261 @@
+"""
+Runs the jobs of the download queue (engine.queue) in the background, a few at a time.
+
+The scheduler owns the downloader threads. The form only adds jobs and listens to the
+scheduler's signals to show what each job is doing. Files of URLs are imported on a
+thread of their own (form_logic.importer), and their jobs start batch by batch.
+
+Before a job starts, what the metadata cache knows of its size is compared with the
+free space on the volume it downloads to, minus what running downloads have reserved
+(engine.diskspace). A job that doesn't fit waits for running jobs to finish, or fails
+right away if nothing is running.
+
+pytube and the download engine are only imported when the first job starts, so that
+the window doesn't wait for them.
+"""
+
+import logging
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from PyQt6 import QtCore
+from PyQt6.QtCore import QThread
+
+from ..engine.diskspace import NotEnoughSpace, default_space
+from ..engine.progress import TransferProgress, describe
+from ..engine.queue import CAPTIONS, DONE, FAILED, PLAYLIST, VIDEO, Job, JobQueue
+from ..engine.ratelimit import global_bucket
+
+MAX_CONCURRENT_JOBS: int = 2
+PROGRESS_STEPS: int = 1000  # resolution of byte progress for single videos
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadScheduler(QtCore.QObject):
+    """Starts queued jobs whenever fewer than max_concurrent are running"""
+
+    queue_changed = QtCore.pyqtSignal()  # a job was added, started or finished
+    job_started = QtCore.pyqtSignal(int)  # ID of the job that just started
+    job_status = QtCore.pyqtSignal(int, str)  # job ID, what the job is doing
+    job_progress = QtCore.pyqtSignal(int, int, int)  # job ID, value, maximum
+    import_progress = QtCore.pyqtSignal(object)  # counts so far of a running import
+    import_finished = QtCore.pyqtSignal(object)  # counts of a finished import
+    import_failed = QtCore.pyqtSignal(str)  # why an import failed
+
+    def __init__(self, queue: JobQueue, max_concurrent: int = MAX_CONCURRENT_JOBS):
+        super().__init__()
+        self.queue: JobQueue = queue
+        self.max_concurrent: int = max(1, max_concurrent)
+        self.threads: Dict[int, QThread] = {}  # running jobs by ID
+        self.status: Dict[int, str] = {}  # last thing each running job reported
+        self._titles: Dict[int, str] = {}
+        self._speeds: Dict[int, str] = {}
+        self._video_counts: Dict[int, int] = {}  # playlist jobs and captions of playlists
+        self._rate_limits: Dict[int, int] = {}  # KB/s, video and playlist jobs only
+        self._known_sizes: Dict[int, int] = {}  # bytes, of pending jobs looked at
+        self.imports: List[QThread] = []  # running imports of URL files
+        self.engine_loaded: bool = False
+        self.connection_pool: Optional[Any] = None  # engine.transport.ConnectionPool
+
+    def enqueue(
+        self,
+        kind: str,
+        url: str,
+        download_location: str,
+        options: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+    ) -> int:
+        """Adds a job to the queue and starts it if there's room. Returns the job ID."""
+        job_id = self.queue.enqueue(kind, url, download_location, options, priority)
+        self.schedule()
+        return job_id
+
+    def import_file(
+        self,
+        path: str,
+        download_location: str,
+        options: Dict[str, Dict[str, Any]],
+        captions: bool = False,
+        priority: int = 0,
+    ):
+        """
+        Queues every new URL of a text or CSV file in the background. options are the
+        job options by kind. Jobs start as their batch is added.
+        """
+        from .importer import UrlImportThread
+
+        thread = UrlImportThread(
+            path, self.queue, download_location, options, captions, priority
+        )
+        thread.progress.connect(self._import_progress)
+        thread.failed.connect(partial(self._import_ended, thread, self.import_failed))
+        thread.finished.connect(
+            partial(self._import_ended, thread, self.import_finished)
+        )
+        self.imports.append(thread)
+        thread.start()
+
+    def schedule(self):
+        """Starts pending jobs that fit on disk until max_concurrent are running."""
+        while len(self.threads) < self.max_concurrent:
+            # with nothing running, nothing is going to make room, so don't wait
+            job = self.queue.claim_next(lambda job: not self.threads or self._fits(job))
+            if job is None:
+                break
+            fits = self._fits(job)
+            needed = self._known_sizes.pop(job.id, 0)
+            if not fits:
+                available = default_space().available(job.download_location)
+                error = NotEnoughSpace(job.download_location, needed, available)
+                self.queue.mark(job.id, FAILED, error.strerror)
+                continue
+            self._start(job)
+        self.queue_changed.emit()
+
+    def set_global_rate_limit(self, rate_limit: int):
+        """Limits the combined bandwidth of all jobs, in KB/s. 0 for no limit."""
+        global_bucket().set_rate(rate_limit * 1024)
+
+    def set_rate_limit(self, job_id: int, rate_limit: int):
+        """Limits the bandwidth of a running job, in KB/s. 0 for no limit."""
+        thread = self.threads.get(job_id)
+        if thread is not None and job_id in self._rate_limits:
+            thread.job.bucket.set_rate(rate_limit * 1024)
+            self._rate_limits[job_id] = rate_limit
+
+    def rate_limit(self, job_id: int) -> Optional[int]:
+        """The current limit of a running job in KB/s, None if it can't be limited"""
+        return self._rate_limits.get(job_id)
+
+    def clear_finished(self):
+        self.queue.clear_finished()
+        self.queue_changed.emit()
+
+    def _fits(self, job: Job) -> bool:
+        """Whether what is known of the job's size fits next to what running jobs reserved"""
+        from ..engine.jobs import ESTIMATE_ERRORS
+
+        try:
+            return default_space().fits(job.download_location, self._known_size(job))
+        except ESTIMATE_ERRORS:  # an estimate must never keep a job from starting
+            logger.exception("could not estimate the size of %s", job)
+            return True  # the job reports the problem itself
+
+    def _known_size(self, job: Job) -> int:
+        if job.id not in self._known_sizes:
+            from ..engine.jobs import known_size
+
+            self._known_sizes[job.id] = known_size(
+                job.kind, job.url, job.download_location, job.options
+            )
+        return self._known_sizes[job.id]
+
+    def _import_progress(self, counts: Dict[str, int]):
+        self.schedule()
+        self.import_progress.emit(counts)
+
+    def _import_ended(self, thread: QThread, signal: Any, result: Any):
+        thread.wait()  # the thread emits its last signal right before returning
+        self.imports.remove(thread)
+        signal.emit(result)
+
+    def _load_engine(self):
+        """Sets up what every download shares. Runs before the first job starts."""
+        from ..engine import transport
+
+        # keep-alive connections for every download
+        self.connection_pool = transport.install()
+        self.engine_loaded = True
+
+    def _start(self, job: Job):
+        if not self.engine_loaded:
+            self._load_engine()
+        thread = self._create_thread(job)
+        self.threads[job.id] = thread
+        self._titles[job.id] = "Looking up..."
+        self._speeds[job.id] = ""
+        self.status[job.id] = self._titles[job.id]
+
+        if job.kind == PLAYLIST:
+            thread.initialized.connect(partial(self._playlist_initialized, job.id))
+            thread.next_video_title.connect(partial(self._set_title, job.id))
+            thread.progress.connect(partial(self._playlist_progress, job.id))
+            thread.transfer_progress.connect(partial(self._set_speed, job.id))
+        else:
+            thread.initialized.connect(partial(self._set_title, job.id))
+        if job.kind == CAPTIONS:  # counts videos like a playlist if it is one
+            thread.video_count.connect(partial(self._playlist_initialized, job.id))
+            thread.progress.connect(partial(self._playlist_progress, job.id))
+        if job.kind == VIDEO:
+            thread.transfer_progress.connect(partial(self._video_progress, job.id))
+        if job.kind in (VIDEO, PLAYLIST):
+            self._rate_limits[job.id] = job.options.get("rate_limit", 0)
+        thread.failed.connect(partial(self._job_failed, job.id))
+        thread.finished.connect(partial(self._job_finished, job.id))
+
+        thread.start()
+        self.job_started.emit(job.id)
+
+    @staticmethod
+    def _create_thread(job: Job) -> QThread:
+        from .downloaders import (CaptionsDownloaderThread,
+                                  PlaylistDownloaderThread,
+                                  VideoDownloaderThread)
+
+        if job.kind == VIDEO:
+            return VideoDownloaderThread(job.url, job.download_location, **job.options)
+        elif job.kind == PLAYLIST:
+            return PlaylistDownloaderThread(
+                job.url, job.download_location, **job.options
+            )
+        elif job.kind == CAPTIONS:
+            return CaptionsDownloaderThread(
+                job.url, job.download_location, **job.options
+            )
+        raise ValueError(f"Unknown job kind: {job.kind}")
+
+    def _set_title(self, job_id: int, title: str):
+        self._titles[job_id] = title
+        self._update_status(job_id)
+
+    def _set_speed(self, job_id: int, progress: TransferProgress):
+        self._speeds[job_id] = describe(progress)
+        self._update_status(job_id)
+
+    def _update_status(self, job_id: int):
+        speed = self._speeds.get(job_id)
+        status = self._titles.get(job_id, "")
+        self.status[job_id] = f"{status} ({speed})" if speed else status
+        self.job_status.emit(job_id, self.status[job_id])
+
+    def _video_progress(self, job_id: int, progress: TransferProgress):
+        self.job_progress.emit(
+            job_id, int(progress.fraction * PROGRESS_STEPS), PROGRESS_STEPS
+        )
+        self._set_speed(job_id, progress)
+
+    def _playlist_initialized(self, job_id: int, video_count: int):
+        self._video_counts[job_id] = video_count
+        self.job_progress.emit(job_id, 0, video_count)
+
+    def _playlist_progress(self, job_id: int, videos_done: int):
+        self.job_progress.emit(job_id, videos_done, self._video_counts[job_id])
+
+    def _job_finished(self, job_id: int):
+        self.job_progress.emit(job_id, 1, 1)
+        self._end(job_id, DONE)
+
+    def _job_failed(self, job_id: int, message: str):
+        self._end(job_id, FAILED, message)
+
+    def _end(self, job_id: int, state: str, message: str = ""):
+        thread = self.threads.pop(job_id)
+        thread.wait()  # the thread emits its last signal right before returning
+        self.queue.mark(job_id, state, message)
+        self.status.pop(job_id, None)
+        self._titles.pop(job_id, None)
+        self._speeds.pop(job_id, None)
+        self._video_counts.pop(job_id, None)
+        self._rate_limits.pop(job_id, None)
+        self.schedule()
@@ -12,7 +12,7 @@ from PyQt6 import QtCore, QtGui, QtWidgets
 class Ui_pythonYTDownloaderForm(object):
 	def setupUi(self, pythonYTDownloaderForm):
 		pythonYTDownloaderForm.setObjectName("pythonYTDownloaderForm")
-		pythonYTDownloaderForm.resize(739, 436)
+		pythonYTDownloaderForm.resize(739, 546)
 		self.horizontalLayoutWidget = QtWidgets.QWidget(parent=pythonYTDownloaderForm)
 		self.horizontalLayoutWidget.setGeometry(QtCore.QRect(50, 10, 631, 80))
 		self.horizontalLayoutWidget.setObjectName("horizontalLayoutWidget")
@@ -62,19 +62,92 @@ class Ui_pythonYTDownloaderForm(object):
 		self.stopRangeLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
 		self.stopRangeLabel.setGeometry(QtCore.QRect(190, 230, 41, 17))
 		self.stopRangeLabel.setObjectName("stopRangeLabel")
+		self.workersLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.workersLabel.setGeometry(QtCore.QRect(170, 260, 61, 17))
+		self.workersLabel.setObjectName("workersLabel")
+		self.workersSpinBox = QtWidgets.QSpinBox(parent=pythonYTDownloaderForm)
+		self.workersSpinBox.setEnabled(False)
+		self.workersSpinBox.setGeometry(QtCore.QRect(230, 260, 42, 26))
+		self.workersSpinBox.setMinimum(1)
+		self.workersSpinBox.setMaximum(16)
+		self.workersSpinBox.setProperty("value", 4)
+		self.workersSpinBox.setObjectName("workersSpinBox")
+		self.connectionsLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.connectionsLabel.setGeometry(QtCore.QRect(290, 260, 81, 17))
+		self.connectionsLabel.setObjectName("connectionsLabel")
+		self.connectionsSpinBox = QtWidgets.QSpinBox(parent=pythonYTDownloaderForm)
+		self.connectionsSpinBox.setGeometry(QtCore.QRect(370, 260, 42, 26))
+		self.connectionsSpinBox.setMinimum(1)
+		self.connectionsSpinBox.setMaximum(16)
+		self.connectionsSpinBox.setProperty("value", 4)
+		self.connectionsSpinBox.setObjectName("connectionsSpinBox")
+		self.priorityLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.priorityLabel.setGeometry(QtCore.QRect(430, 260, 51, 17))
+		self.priorityLabel.setObjectName("priorityLabel")
+		self.prioritySpinBox = QtWidgets.QSpinBox(parent=pythonYTDownloaderForm)
+		self.prioritySpinBox.setGeometry(QtCore.QRect(490, 260, 42, 26))
+		self.prioritySpinBox.setMinimum(0)
+		self.prioritySpinBox.setMaximum(9)
+		self.prioritySpinBox.setObjectName("prioritySpinBox")
+		self.queueLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.queueLabel.setGeometry(QtCore.QRect(40, 360, 51, 17))
+		self.queueLabel.setObjectName("queueLabel")
+		self.queueListWidget = QtWidgets.QListWidget(parent=pythonYTDownloaderForm)
+		self.queueListWidget.setGeometry(QtCore.QRect(90, 360, 591, 131))
+		self.queueListWidget.setObjectName("queueListWidget")
+		self.clearFinishedButton = QtWidgets.QPushButton(parent=pythonYTDownloaderForm)
+		self.clearFinishedButton.setGeometry(QtCore.QRect(90, 510, 111, 25))
+		self.clearFinishedButton.setAutoDefault(True)
+		self.clearFinishedButton.setObjectName("clearFinishedButton")
+		self.audioFormatCombobox = QtWidgets.QComboBox(parent=pythonYTDownloaderForm)
+		self.audioFormatCombobox.setGeometry(QtCore.QRect(550, 260, 141, 25))
+		self.audioFormatCombobox.setEnabled(False)
+		self.audioFormatCombobox.setObjectName("audioFormatCombobox")
+		self.audioFormatCombobox.addItem("")
+		self.audioFormatCombobox.addItem("")
+		self.adaptiveCheckbox = QtWidgets.QCheckBox(parent=pythonYTDownloaderForm)
+		self.adaptiveCheckbox.setGeometry(QtCore.QRect(460, 230, 121, 23))
+		self.adaptiveCheckbox.setChecked(False)
+		self.adaptiveCheckbox.setObjectName("adaptiveCheckbox")
+		self.maxResolutionCombobox = QtWidgets.QComboBox(parent=pythonYTDownloaderForm)
+		self.maxResolutionCombobox.setGeometry(QtCore.QRect(590, 230, 111, 25))
+		self.maxResolutionCombobox.setObjectName("maxResolutionCombobox")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.maxResolutionCombobox.addItem("")
+		self.totalLimitLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.totalLimitLabel.setGeometry(QtCore.QRect(210, 514, 41, 17))
+		self.totalLimitLabel.setObjectName("totalLimitLabel")
+		self.totalLimitSpinBox = QtWidgets.QSpinBox(parent=pythonYTDownloaderForm)
+		self.totalLimitSpinBox.setGeometry(QtCore.QRect(250, 510, 111, 26))
+		self.totalLimitSpinBox.setMaximum(1000000)
+		self.totalLimitSpinBox.setSingleStep(100)
+		self.totalLimitSpinBox.setObjectName("totalLimitSpinBox")
+		self.jobLimitLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.jobLimitLabel.setGeometry(QtCore.QRect(370, 514, 31, 17))
+		self.jobLimitLabel.setObjectName("jobLimitLabel")
+		self.jobLimitSpinBox = QtWidgets.QSpinBox(parent=pythonYTDownloaderForm)
+		self.jobLimitSpinBox.setGeometry(QtCore.QRect(400, 510, 111, 26))
+		self.jobLimitSpinBox.setMaximum(1000000)
+		self.jobLimitSpinBox.setSingleStep(100)
+		self.jobLimitSpinBox.setObjectName("jobLimitSpinBox")
 		self.startButton = QtWidgets.QPushButton(parent=pythonYTDownloaderForm)
-		self.startButton.setGeometry(QtCore.QRect(550, 400, 80, 25))
+		self.startButton.setGeometry(QtCore.QRect(530, 510, 101, 25))
 		self.startButton.setDefault(True)
 		self.startButton.setObjectName("startButton")
 		self.cancelButton = QtWidgets.QPushButton(parent=pythonYTDownloaderForm)
-		self.cancelButton.setGeometry(QtCore.QRect(640, 400, 80, 25))
+		self.cancelButton.setGeometry(QtCore.QRect(640, 510, 80, 25))
 		self.cancelButton.setAutoDefault(True)
 		self.cancelButton.setObjectName("cancelButton")
 		self.videoPlaylistLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
 		self.videoPlaylistLabel.setGeometry(QtCore.QRect(40, 120, 81, 17))
 		self.videoPlaylistLabel.setObjectName("videoPlaylistLabel")
 		self.progressBar = QtWidgets.QProgressBar(parent=pythonYTDownloaderForm)
-		self.progressBar.setGeometry(QtCore.QRect(90, 340, 591, 23))
+		self.progressBar.setGeometry(QtCore.QRect(90, 320, 591, 23))
 		self.progressBar.setProperty("value", 0)
 		self.progressBar.setTextVisible(True)
 		self.progressBar.setObjectName("progressBar")
@@ -89,7 +162,7 @@ class Ui_pythonYTDownloaderForm(object):
 		self.titleLabel.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
 		self.titleLabel.setObjectName("titleLabel")
 		self.downloadStatusLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
-		self.downloadStatusLabel.setGeometry(QtCore.QRect(90, 320, 591, 17))
+		self.downloadStatusLabel.setGeometry(QtCore.QRect(90, 300, 591, 17))
 		self.downloadStatusLabel.setObjectName("downloadStatusLabel")
 		self.downloadFolderTextbox = QtWidgets.QLineEdit(parent=pythonYTDownloaderForm)
 		self.downloadFolderTextbox.setEnabled(True)
@@ -99,22 +172,53 @@ class Ui_pythonYTDownloaderForm(object):
 		self.urlTextbox = QtWidgets.QLineEdit(parent=pythonYTDownloaderForm)
 		self.urlTextbox.setGeometry(QtCore.QRect(130, 150, 511, 25))
 		self.urlTextbox.setObjectName("urlTextbox")
+		self.importButton = QtWidgets.QPushButton(parent=pythonYTDownloaderForm)
+		self.importButton.setGeometry(QtCore.QRect(650, 150, 80, 25))
+		self.importButton.setAutoDefault(True)
+		self.importButton.setObjectName("importButton")
 		self.downloadAllAvailableCheckbox = QtWidgets.QCheckBox(parent=pythonYTDownloaderForm)
 		self.downloadAllAvailableCheckbox.setEnabled(False)
 		self.downloadAllAvailableCheckbox.setGeometry(QtCore.QRect(290, 230, 151, 23))
 		self.downloadAllAvailableCheckbox.setChecked(True)
 		self.downloadAllAvailableCheckbox.setObjectName("downloadAllAvailableCheckbox")
+		self.captionLanguagesLabel = QtWidgets.QLabel(parent=pythonYTDownloaderForm)
+		self.captionLanguagesLabel.setGeometry(QtCore.QRect(250, 124, 71, 17))
+		self.captionLanguagesLabel.setObjectName("captionLanguagesLabel")
+		self.captionLanguagesTextbox = QtWidgets.QLineEdit(parent=pythonYTDownloaderForm)
+		self.captionLanguagesTextbox.setEnabled(False)
+		self.captionLanguagesTextbox.setGeometry(QtCore.QRect(330, 120, 151, 25))
+		self.captionLanguagesTextbox.setObjectName("captionLanguagesTextbox")
+		self.captionFormatCombobox = QtWidgets.QComboBox(parent=pythonYTDownloaderForm)
+		self.captionFormatCombobox.setEnabled(False)
+		self.captionFormatCombobox.setGeometry(QtCore.QRect(490, 120, 101, 25))
+		self.captionFormatCombobox.setObjectName("captionFormatCombobox")
+		self.captionFormatCombobox.addItem("")
+		self.captionFormatCombobox.addItem("")
+		self.captionFormatCombobox.addItem("")
 
 		self.retranslateUi(pythonYTDownloaderForm)
 		self.videoPlaylistSelectCombobox.setCurrentIndex(0)
 		QtCore.QMetaObject.connectSlotsByName(pythonYTDownloaderForm)
-		pythonYTDownloaderForm.setTabOrder(self.videoPlaylistSelectCombobox, self.urlTextbox)
-		pythonYTDownloaderForm.setTabOrder(self.urlTextbox, self.downloadFolderTextbox)
+		pythonYTDownloaderForm.setTabOrder(self.videoPlaylistSelectCombobox, self.captionLanguagesTextbox)
+		pythonYTDownloaderForm.setTabOrder(self.captionLanguagesTextbox, self.captionFormatCombobox)
+		pythonYTDownloaderForm.setTabOrder(self.captionFormatCombobox, self.urlTextbox)
+		pythonYTDownloaderForm.setTabOrder(self.urlTextbox, self.importButton)
+		pythonYTDownloaderForm.setTabOrder(self.importButton, self.downloadFolderTextbox)
 		pythonYTDownloaderForm.setTabOrder(self.downloadFolderTextbox, self.downloadFolderBrowseButton)
 		pythonYTDownloaderForm.setTabOrder(self.downloadFolderBrowseButton, self.startRangeSpinBox)
 		pythonYTDownloaderForm.setTabOrder(self.startRangeSpinBox, self.stopRangeSpinBox)
-		pythonYTDownloaderForm.setTabOrder(self.stopRangeSpinBox, self.audioOnlyCheckbox)
-		pythonYTDownloaderForm.setTabOrder(self.audioOnlyCheckbox, self.cancelButton)
+		pythonYTDownloaderForm.setTabOrder(self.stopRangeSpinBox, self.adaptiveCheckbox)
+		pythonYTDownloaderForm.setTabOrder(self.adaptiveCheckbox, self.maxResolutionCombobox)
+		pythonYTDownloaderForm.setTabOrder(self.maxResolutionCombobox, self.audioOnlyCheckbox)
+		pythonYTDownloaderForm.setTabOrder(self.audioOnlyCheckbox, self.audioFormatCombobox)
+		pythonYTDownloaderForm.setTabOrder(self.audioFormatCombobox, self.workersSpinBox)
+		pythonYTDownloaderForm.setTabOrder(self.workersSpinBox, self.connectionsSpinBox)
+		pythonYTDownloaderForm.setTabOrder(self.connectionsSpinBox, self.prioritySpinBox)
+		pythonYTDownloaderForm.setTabOrder(self.prioritySpinBox, self.queueListWidget)
+		pythonYTDownloaderForm.setTabOrder(self.queueListWidget, self.clearFinishedButton)
+		pythonYTDownloaderForm.setTabOrder(self.clearFinishedButton, self.totalLimitSpinBox)
+		pythonYTDownloaderForm.setTabOrder(self.totalLimitSpinBox, self.jobLimitSpinBox)
+		pythonYTDownloaderForm.setTabOrder(self.jobLimitSpinBox, self.cancelButton)
 		pythonYTDownloaderForm.setTabOrder(self.cancelButton, self.startButton)
 
 	def retranslateUi(self, pythonYTDownloaderForm):
@@ -131,7 +235,36 @@ class Ui_pythonYTDownloaderForm(object):
 		self.audioOnlyCheckbox.setText(_translate("pythonYTDownloaderForm", "Audio only"))
 		self.startRangeLabel.setText(_translate("pythonYTDownloaderForm", "Start:"))
 		self.stopRangeLabel.setText(_translate("pythonYTDownloaderForm", "Stop:"))
-		self.startButton.setText(_translate("pythonYTDownloaderForm", "Start"))
+		self.workersLabel.setText(_translate("pythonYTDownloaderForm", "Workers:"))
+		self.workersSpinBox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Number of playlist videos to download at the same time</p></body></html>"))
+		self.connectionsLabel.setText(_translate("pythonYTDownloaderForm", "Connections:"))
+		self.connectionsSpinBox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Number of connections each video is split across</p></body></html>"))
+		self.priorityLabel.setText(_translate("pythonYTDownloaderForm", "Priority:"))
+		self.prioritySpinBox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Jobs with a higher priority are downloaded first</p></body></html>"))
+		self.queueLabel.setText(_translate("pythonYTDownloaderForm", "Queue:"))
+		self.clearFinishedButton.setText(_translate("pythonYTDownloaderForm", "Clear finished"))
+		self.audioFormatCombobox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Audio only: convert to MP3 with ffmpeg, or keep the format YouTube serves</p></body></html>"))
+		self.audioFormatCombobox.setItemText(0, _translate("pythonYTDownloaderForm", "MP3"))
+		self.audioFormatCombobox.setItemText(1, _translate("pythonYTDownloaderForm", "Original (AAC/Opus)"))
+		self.adaptiveCheckbox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Download the best video and audio separately and combine them with ffmpeg. Allows more than 720p</p></body></html>"))
+		self.adaptiveCheckbox.setText(_translate("pythonYTDownloaderForm", "Best quality"))
+		self.maxResolutionCombobox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Highest resolution to download. Lower resolutions save bandwidth and disk space</p></body></html>"))
+		self.maxResolutionCombobox.setItemText(0, _translate("pythonYTDownloaderForm", "Any resolution"))
+		self.maxResolutionCombobox.setItemText(1, _translate("pythonYTDownloaderForm", "2160p"))
+		self.maxResolutionCombobox.setItemText(2, _translate("pythonYTDownloaderForm", "1440p"))
+		self.maxResolutionCombobox.setItemText(3, _translate("pythonYTDownloaderForm", "1080p"))
+		self.maxResolutionCombobox.setItemText(4, _translate("pythonYTDownloaderForm", "720p"))
+		self.maxResolutionCombobox.setItemText(5, _translate("pythonYTDownloaderForm", "480p"))
+		self.maxResolutionCombobox.setItemText(6, _translate("pythonYTDownloaderForm", "360p"))
+		self.totalLimitLabel.setText(_translate("pythonYTDownloaderForm", "Limit"))
+		self.totalLimitSpinBox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Combined bandwidth of all downloads. Changes apply right away</p></body></html>"))
+		self.totalLimitSpinBox.setSpecialValueText(_translate("pythonYTDownloaderForm", "No limit"))
+		self.totalLimitSpinBox.setSuffix(_translate("pythonYTDownloaderForm", " KB/s"))
+		self.jobLimitLabel.setText(_translate("pythonYTDownloaderForm", "Job"))
+		self.jobLimitSpinBox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Bandwidth of each new job, and of the selected job in the queue if it is running</p></body></html>"))
+		self.jobLimitSpinBox.setSpecialValueText(_translate("pythonYTDownloaderForm", "No limit"))
+		self.jobLimitSpinBox.setSuffix(_translate("pythonYTDownloaderForm", " KB/s"))
+		self.startButton.setText(_translate("pythonYTDownloaderForm", "Add to queue"))
 		self.cancelButton.setText(_translate("pythonYTDownloaderForm", "Cancel"))
 		self.videoPlaylistLabel.setText(_translate("pythonYTDownloaderForm", "Video/Playlist:"))
 		self.titleLabel.setText(_translate("pythonYTDownloaderForm", "YouTube Downloader"))
@@ -139,4 +272,13 @@ class Ui_pythonYTDownloaderForm(object):
 		self.downloadFolderTextbox.setText(_translate("pythonYTDownloaderForm", "this text is to be changed on form load"))
 		self.downloadFolderTextbox.setPlaceholderText(_translate("pythonYTDownloaderForm", "Video/audio save folder"))
 		self.urlTextbox.setPlaceholderText(_translate("pythonYTDownloaderForm", "YouTube URL"))
+		self.importButton.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Add every URL of a text or CSV file to the queue with the options below</p></body></html>"))
+		self.importButton.setText(_translate("pythonYTDownloaderForm", "Import..."))
 		self.downloadAllAvailableCheckbox.setText(_translate("pythonYTDownloaderForm", "Download all available"))
+		self.captionLanguagesLabel.setText(_translate("pythonYTDownloaderForm", "Languages:"))
+		self.captionLanguagesTextbox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Caption languages in order of preference, e.g. \"en, a.en, de\". a.en is auto-generated English</p></body></html>"))
+		self.captionLanguagesTextbox.setText(_translate("pythonYTDownloaderForm", "en, a.en"))
+		self.captionFormatCombobox.setToolTip(_translate("pythonYTDownloaderForm", "<html><head/><body><p>Format of the caption files. XML is what YouTube serves</p></body></html>"))
+		self.captionFormatCombobox.setItemText(0, _translate("pythonYTDownloaderForm", "SRT"))
+		self.captionFormatCombobox.setItemText(1, _translate("pythonYTDownloaderForm", "WebVTT"))
+		self.captionFormatCombobox.setItemText(2, _translate("pythonYTDownloaderForm", "XML"))
@@ -1,21 +1,52 @@
 import sys
+import logging
 import platform
+from typing import Optional
 from PyQt6 import QtWidgets, QtGui
-from .form_logic.pytube_form import PyTubeForm 
-from .form_ui import resources
+from .form_logic.pytube_form import PyTubeForm
+from .startup import ImportProfiler
 
-def main():
+logger = logging.getLogger(__name__)
+
+def main(profiler: Optional[ImportProfiler] = None):
     if platform.system() == "Windows":
         import ctypes
         app_id = "pytube-gui"
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
     app = QtWidgets.QApplication(sys.argv)
     pythonYTDownloaderDialog = QtWidgets.QDialog()
-    pythonYTDownloaderDialog.setWindowIcon(QtGui.QIcon(":/icons/application-icon.ico"))
     ui = PyTubeForm(pythonYTDownloaderDialog)
+    app.aboutToQuit.connect(lambda: save_stats(ui))
     pythonYTDownloaderDialog.show()
+    app.processEvents()  # paint the window before anything slow happens
+    if profiler is not None:
+        profiler.mark("window shown")
+        profiler.stop()
+        profiler.report()
+    # the icons are compiled into a large module, so they are only loaded now
+    from .form_ui import resources
+    pythonYTDownloaderDialog.setWindowIcon(QtGui.QIcon(":/icons/application-icon.ico"))
+    ui.scheduler.schedule()  # jobs left over from the last session
     sys.exit(app.exec())
 
 
+def save_stats(ui: PyTubeForm):
+    """Exports the stage metrics and logs the engine's counters, if any download ran this session"""
+    if not ui.scheduler.engine_loaded:
+        return
+    from .engine.cache import default_cache
+    from .engine.decipher import default_plans
+    from .engine.metrics import default_metrics
+    from .engine.paths import data_dir
+    logger.debug("metadata cache: %s", default_cache().stats())
+    logger.debug("player plans: %s", default_plans().stats())
+    if ui.scheduler.connection_pool is not None:
+        logger.debug("connections: %s", ui.scheduler.connection_pool.stats())
+    try:
+        default_metrics().export(data_dir())
+    except OSError:
+        logger.exception("could not export the stage metrics")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,126 @@
+"""
+Cold start profiling for the GUI (pytube-gui --profile-startup).
+
+The GUI shows its window before it imports pytube and the download engine, which
+only load once the first download starts. To keep it that way, --profile-startup
+times every module imported until the window is on screen and prints the slowest
+ones, like `python -X importtime` but also in the PyInstaller build.
+
+Times are measured from when profiling starts, so interpreter start up (and in the
+onefile build, unpacking) is not included.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from typing import Any, List, Optional, TextIO, Tuple
+
+from .engine.paths import data_dir
+
+PROFILE_FLAG: str = "--profile-startup"
+REPORT_FILE: str = "startup-profile.txt"  # used when there's no console to print to
+TOP_IMPORTS: int = 25
+
+
+class ImportProfiler:
+    """Times the imports of the thread that started it. Only first imports count."""
+
+    def __init__(self):
+        self.started: float = time.perf_counter()
+        # module, seconds including the modules it imported, seconds on its own, depth
+        self.imports: List[Tuple[str, float, float, int]] = []
+        self.marks: List[Tuple[str, float]] = []  # milestones, seconds after started
+        self._children: List[float] = []  # time spent in nested imports, per level
+        self._thread: int = threading.get_ident()
+        self._original_import = builtins.__import__
+
+    def start(self):
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if builtins.__import__ == self._import:
+            builtins.__import__ = self._original_import
+
+    def mark(self, label: str):
+        """Records that startup reached a milestone, e.g. the window being shown."""
+        self.marks.append((label, time.perf_counter() - self.started))
+
+    def report(self, file: Optional[TextIO] = None):
+        """Prints the milestones and the slowest imports to file (stderr by default)."""
+        if file is None and sys.stderr is None:  # windowed build
+            with open(os.path.join(data_dir(), REPORT_FILE), "w") as f:
+                self.report(f)
+            return
+        file = file or sys.stderr
+        for label, seconds in self.marks:
+            print(f"{seconds * 1000:9.1f} ms  {label}", file=file)
+        total = sum(own for name, cumulative, own, depth in self.imports)
+        print(
+            f"{len(self.imports)} modules imported in {total * 1000:.1f} ms", file=file
+        )
+        print("cumulative ms     self ms  module", file=file)
+        slowest = sorted(self.imports, key=lambda record: record[1], reverse=True)
+        for name, cumulative, own, depth in slowest[:TOP_IMPORTS]:
+            print(
+                f"{cumulative * 1000:13.1f} {own * 1000:11.1f}  {'  ' * depth}{name}",
+                file=file,
+            )
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = _resolve(name, globals, level)
+        if module is None or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        loaded = [] if module in sys.modules else [module]
+        # from package import submodule
+        submodules = [
+            f"{module}.{item}"
+            for item in fromlist or ()
+            if item != "*" and f"{module}.{item}" not in sys.modules
+        ]
+        if not loaded and not submodules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._children.append(0.0)
+        began = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - began
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            loaded += [
+                submodule for submodule in submodules if submodule in sys.modules
+            ]
+            if loaded:  # not just names imported from a module
+                self.imports.append(
+                    (
+                        ", ".join(loaded),
+                        cumulative,
+                        cumulative - children,
+                        len(self._children),
+                    )
+                )
+
+
+def _resolve(name: str, globals: Any, level: int) -> Optional[str]:
+    """The absolute name of the module an import statement refers to"""
+    if level == 0:
+        return name
+    try:
+        package = globals.get("__package__") or globals["__name__"]
+        return importlib.util.resolve_name("." * level + name, package)
+    except (AttributeError, KeyError, ImportError, ValueError):
+        return None
+
+
+def start_profiling(argv: List[str]) -> Optional[ImportProfiler]:
+    """Starts an ImportProfiler if argv asks for one. Call before importing Qt."""
+    if PROFILE_FLAG not in argv[1:]:
+        return None
+    profiler = ImportProfiler()
+    profiler.start()
+    return profiler
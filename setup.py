@@ -14,6 +14,7 @@ setup(
     install_requires=["pytube>=15.0.0", "PyQt6>=6.0.0"],
     python_requires=">=3.8",
     entry_points={
-        "gui_scripts": ["pytube-gui = pytube_gui:run"]
+        "gui_scripts": ["pytube-gui = pytube_gui:run"],
+        "console_scripts": ["pytube-gui-batch = pytube_gui.batch:main"],
     },
 )